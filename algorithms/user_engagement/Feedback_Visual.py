@@ -1,16 +1,29 @@
-import json, math, threading, time, os, sqlite3, random
-from contextlib import closing
-from typing import Dict, List, Tuple, Optional
+import json
+import os
+import random
+import sys
+import threading
+import time
 
-import pygame
 import paho.mqtt.client as mqtt
-from flask import Flask, request, jsonify
+import pygame
+from flask import Flask, jsonify, request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "visuals"))
+import telemetry_codec as codec
+from feedback_aggregate import FeedbackAggregate
+from pacing import FramePacer
+from renderer import Mode0Levels, Mode0Renderer, compile_palette
+from smoothing import Smoother
+from telemetry_state import TelemetryState
 
 # ================= USER CONFIG =================
 MQTT_HOST = "host-ip"
 MQTT_PORT = 1883
 
 TOPIC_DATA = "smartart/sensordata"
+TOPIC_DATA_BIN = TOPIC_DATA + codec.TOPIC_SUFFIX   # binary frames, see common/telemetry_codec.py
 TOPIC_MODE = "smartart/cmd/mode"
 
 HTTP_HOST = "0.0.0.0"
@@ -30,6 +43,12 @@ EPS_NEUTRAL = 0.20               # when no ratings yet
 PALETTE_CHECK_EVERY = 2.0        # how often to consider palette change (seconds)
 JITTER = 12                      # small random color jitter (+/-)
 
+# ---- Frame pacing (visuals/pacing.py) ----
+FPS_ACTIVE = 60                  # motion, sensor changes, palette transitions
+FPS_IDLE = 5                     # nobody around and nothing changing
+IDLE_AFTER_S = 120               # seconds without motion / sensor change before going idle
+IDLE_PAUSE = False               # True: freeze the animation while idle (no redraws at all)
+
 # Palettes (bg is blended with ambient light later; wave/circle used directly)
 PALETTES = [
     {"bg": (18,18,40),   "wave": (30,200,150), "circle": (140,90,255)},
@@ -41,49 +60,36 @@ PALETTES = [
 # ===============================================
 
 # ---- Shared state ----
-data_lock = threading.Lock()
-data: Dict[str, float] = {"temp": 25.0, "hum": 50.0, "light": 2000, "motion": 0}
-update_source = "mqtt"  # authoritative source for applying updates
-last_motion_flash = 0
+# network threads publish snapshots, the render loop reads them without locking (visuals/telemetry_state.py)
+state = TelemetryState(source="mqtt", smoother=Smoother())   # authoritative source for applying updates
 FLASH_MS = 350
 
 def set_update_source(src: str):   # switch between data sources (mqtt or http). used in mqtt message handeler
-    global update_source
-    s = str(src).strip().lower()
-    if s in ("mqtt", "http"):
-        update_source = s
-        print(f"[MODE] Source -> {update_source.upper()}")
+    if state.set_source(src):
+        print(f"[MODE] Source -> {state.source.upper()}")
     else:
         print(f"[MODE] Ignored invalid mode '{src}'")
 
 def get_update_source() -> str:
-    return update_source
+    return state.source
 
 # ================= MQTT =================
 def on_connect(client, userdata, flags, rc):
     print(f"[MQTT] Connected rc={rc}; subscribing")
-    client.subscribe([(TOPIC_DATA, 0), (TOPIC_MODE, 0)])
-
-def _apply_payload(payload: dict, origin: str):   # it takes any incoming telemetry (from MQTT or HTTP), 
-    global last_motion_flash                        # filters it, updates the shared sensor state, and—if motion==1—arms the flash timer.
-    if get_update_source() != origin:
-        if HTTP_DEBUG_LOG:
-            print(f"[{origin.upper()}] Ignored payload (active={get_update_source().upper()})")
-        return
-    accepted = {k: payload[k] for k in ("temp", "hum", "light", "motion") if k in payload}  # Builds a dict with only recognized keys (temp, hum, light, motion).
-    if not accepted:
-        return
-    with data_lock:
-        data.update(accepted)
-        try:
-            if int(float(data.get("motion", 0))) == 1:
-                last_motion_flash = pygame.time.get_ticks()
-        except Exception:
-            pass
+    client.subscribe([(TOPIC_DATA, 0), (TOPIC_DATA_BIN, 0), (TOPIC_MODE, 0)])
+
+def _apply_payload(payload: dict, origin: str):   # it takes any incoming telemetry (from MQTT or HTTP),
+    # filters it and publishes a new snapshot (motion==1 arms the flash timer); never blocks the render loop
+    if state.publish(payload, origin) is None and HTTP_DEBUG_LOG and get_update_source() != origin:
+        print(f"[{origin.upper()}] Ignored payload (active={get_update_source().upper()})")
 
 def on_message(client, userdata, msg):
     try:
         topic = msg.topic
+        if topic == TOPIC_DATA_BIN:
+            # only the newest sample of a frame matters for the display
+            _apply_payload(codec.decode_last(msg.payload), origin="mqtt")
+            return
         payload_str = msg.payload.decode("utf-8").strip()
         if topic == TOPIC_MODE:
             set_update_source(payload_str)
@@ -120,7 +126,10 @@ def health():
 @app.post("/ingest")
 def ingest():
     try:
-        payload = request.get_json(force=True, silent=False)
+        if codec.is_binary_content_type(request.content_type):
+            payload = codec.decode_last(request.get_data())
+        else:
+            payload = request.get_json(force=True, silent=False)
         if not isinstance(payload, dict):
             return jsonify({"ok": False, "err": "JSON object required"}), 400
         _apply_payload(payload, origin="http")
@@ -133,37 +142,9 @@ def run_http_server():
     app.run(host=HTTP_HOST, port=HTTP_PORT, debug=False, threaded=True, use_reloader=False)
 
 # ================= FEEDBACK / AVERAGE LOGGING =================
-def read_recent_feedback(db_path: str, window: int) -> Tuple[List[float], Optional[float], Optional[str]]:
-    """
-    Returns (ratings_list_newest_first, avg_or_None, error_msg_or_None).
-    Tries created_at ordering first; falls back to rowid if created_at is missing.
-    """
-    if not os.path.exists(db_path):
-        return [], None, f"DB file not found: {db_path}"
-    try:
-        with closing(sqlite3.connect(db_path)) as conn:
-            conn.row_factory = sqlite3.Row
-            has_tbl = conn.execute(
-                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='feedback'"
-            ).fetchone()
-            if not has_tbl:
-                return [], None, "Table 'feedback' not found"
-            # Prefer created_at, else rowid
-            try:
-                rows = conn.execute(
-                    "SELECT rating FROM feedback ORDER BY datetime(created_at) DESC LIMIT ?",
-                    (window,),
-                ).fetchall()
-            except sqlite3.OperationalError:
-                rows = conn.execute(
-                    "SELECT rating FROM feedback ORDER BY rowid DESC LIMIT ?",
-                    (window,),
-                ).fetchall()
-            ratings = [float(r["rating"]) for r in rows if r["rating"] is not None]
-            avg = (sum(ratings) / len(ratings)) if ratings else None
-            return ratings, avg, None
-    except Exception as ex:
-        return [], None, f"DB read error: {ex}"
+# Rolling average of the last FEEDBACK_WINDOW ratings, kept up to date by a background thread
+# that only reads new rows (feedback_aggregate.py); the frame loop just takes its snapshot.
+feedback = FeedbackAggregate(DB_PATH, FEEDBACK_WINDOW, poll_s=min(PALETTE_CHECK_EVERY, FEEDBACK_PRINT_EVERY or PALETTE_CHECK_EVERY))
 
 # ================= VISUALS (pygame) =================
 def clamp(v, lo, hi): return max(lo, min(hi, v))
@@ -178,7 +159,7 @@ def _jitter(rgb, spread=JITTER):
             _clamp8(g + random.randint(-spread, spread)),
             _clamp8(b + random.randint(-spread, spread)))
 
-def _choose_palette(current, eps) -> Tuple[dict, bool]:
+def _choose_palette(current, eps) -> tuple[dict, bool]:
     """ε-greedy: with prob eps pick a new palette; else keep current. Returns (palette, changed?)."""
     changed = False
     if current is None or random.random() < eps: #first time
@@ -196,8 +177,8 @@ def _choose_palette(current, eps) -> Tuple[dict, bool]:
     return pal, changed
 
 def main():
-    global last_motion_flash
     start_mqtt()
+    feedback.start()
     threading.Thread(target=run_http_server, daemon=True).start()
     print(f"[HTTP] Listening on http://{HTTP_HOST}:{HTTP_PORT}/ingest (and /update)")
     print("[INFO] Source follows MQTT topic 'smartart/cmd/mode' (mqtt/http)")
@@ -209,6 +190,9 @@ def main():
     pygame.display.set_caption("SmartArt — Mode 0 Only (with threshold & epsilon)")
     clock = pygame.time.Clock()
     font = pygame.font.SysFont(None, 20)
+    renderer = Mode0Renderer(screen, font)
+    pacer = FramePacer(FPS_ACTIVE, FPS_IDLE, IDLE_AFTER_S, pause_when_idle=IDLE_PAUSE)
+    levels = Mode0Levels()    # rings / amplitude / bg only change past a boundary (hysteresis)
 
     # feedback logging cadence
     last_fb_log = 0.0
@@ -216,6 +200,7 @@ def main():
     # palette / epsilon cadence
     last_pal_tick = 0.0
     current_palette = None  # dict with bg, wave, circle
+    compiled = compile_palette((18,18,40), (140,90,255), (30,200,150))   # lookup tables of current_palette
 
     t = 0
     running = True
@@ -224,6 +209,8 @@ def main():
         for e in pygame.event.get():
             if e.type == pygame.QUIT or (e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE):
                 running = False
+            elif e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
 
         # ---- Feedback logging & policy evaluation ----
         now = time.time()
@@ -231,14 +218,14 @@ def main():
         do_palette_tick = (now - last_pal_tick) >= PALETTE_CHECK_EVERY or current_palette is None
 
         if do_fb_log or do_palette_tick:
-            ratings, avg, err = read_recent_feedback(DB_PATH, FEEDBACK_WINDOW)
+            ratings, avg, err = feedback.snapshot()
             if err:
                 print(f"[FEEDBACK] {err}")
                 eps = EPS_NEUTRAL
                 mode = "NEUTRAL"
             else:
                 if ratings:
-                    print(f"[FEEDBACK] n={len(ratings)} last{FEEDBACK_WINDOW}={ratings}  avg={(sum(ratings)/len(ratings)):.3f}")
+                    print(f"[FEEDBACK] n={len(ratings)} last{FEEDBACK_WINDOW}={list(ratings)}  avg={(sum(ratings)/len(ratings)):.3f}")
                 else:
                     print("[FEEDBACK] No ratings yet")
                 if avg is None:
@@ -250,6 +237,10 @@ def main():
 
             if do_palette_tick:
                 current_palette, changed = _choose_palette(current_palette, eps)
+                # jittered every tick, so recompile here; the frame loop only indexes the tables
+                compiled = compile_palette(current_palette["bg"], current_palette["circle"], current_palette["wave"])
+                if changed:
+                    pacer.poke()
                 print(f"[POLICY] avg={('n/a' if avg is None else f'{avg:.2f}')}  THRESH={THRESH:.2f}  "
                       f"epsilon={eps:.2f}  mode={mode}  palette_changed={changed}")
                 last_pal_tick = now
@@ -258,64 +249,30 @@ def main():
                 last_fb_log = now
 
         # ---- Visuals ----
-        t += 1
-        with data_lock:
-            temp = float(data.get("temp", 25.0))
-            hum = float(data.get("hum", 50.0))
-            light = int(float(data.get("light", 2000)))
-            motion = int(float(data.get("motion", 0)))
-
-        # Background combines ambient light + palette base
-        light_norm = map01(light, 0, 4095)
-        env_bg = (int(light_norm*85), int(light_norm*128), int(light_norm*255))
-        base_bg = current_palette["bg"] if current_palette else (18,18,40)
-        # blend 65% palette, 35% ambient
-        bg_col = (
-            _clamp8(base_bg[0]*0.65 + env_bg[0]*0.35),
-            _clamp8(base_bg[1]*0.65 + env_bg[1]*0.35),
-            _clamp8(base_bg[2]*0.65 + env_bg[2]*0.35),
-        )
-        screen.fill(bg_col)
-
-        # Mode 0: rings (temperature) + waves (humidity)
-        rings = int(clamp(3 + (temp - 15) / 5, 1, 10))
-        base_circle = current_palette["circle"] if current_palette else (140,90,255)
-        for i in range(rings):
-            r = 40 + i * 26 + 12 * math.sin((t / 30) + i * 0.6)
-            col = (
-                _clamp8(base_circle[0] + i*8),
-                _clamp8(base_circle[1] + i*6),
-                _clamp8(base_circle[2] - i*6),
-            )
-            pygame.draw.circle(screen, col, (W // 2, H // 2), int(r), 2)
-
-        amp = int(8 + hum / 3)
-        step_y = 30
-        wave_color = current_palette["wave"] if current_palette else (30,200,150)
-        for y in range(120, H - 120, step_y):
-            pts = []
-            for x in range(0, W, 18):
-                yy = y + int(amp * math.sin((x + t * 2) / 80.0))
-                pts.append((x, yy))
-            pygame.draw.lines(screen, wave_color, False, pts, 2)
-
-        # Motion flash overlay
-        if pygame.time.get_ticks() - last_motion_flash < FLASH_MS:
-            overlay = pygame.Surface((W, H), pygame.SRCALPHA)
-            overlay.fill((255, 255, 255, 120))
-            screen.blit(overlay, (0, 0))
-
-        # HUD
+        if pacer.animate():
+            t += 1
+        temp, hum, light = state.interpolated()   # lock-free, smoothed and blended towards the newest sample
+        light = int(light)
+        motion = state.latest().motion
+        pacer.observe(temp, hum, light, motion)
+
+        # Background (ambient light + palette base, per light level), ring and wave colours
+        # all come from the compiled palette
+        flash = state.flash_active(FLASH_MS)
         hud = f"Mode0 | Source:{get_update_source().upper()} | TH={THRESH:.1f}"
-        screen.blit(font.render(hud, True, (255, 255, 255)), (10, 10))
+        scene = compiled.scene(t, temp, hum, light, flash, hud, levels=levels(temp, hum, light))
 
-        pygame.display.flip()
-        clock.tick(60)
+        # only the changed region reaches the display; an unchanged scene is skipped
+        rects = renderer.render(scene)
+        if rects:
+            pygame.display.update(rects)
+        pacer.tick(clock)
 
     try:
         m.loop_stop(); m.disconnect()
     except Exception:
         pass
+    feedback.stop()
     pygame.quit()
 
 if __name__ == "__main__":
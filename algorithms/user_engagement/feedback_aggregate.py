@@ -0,0 +1,124 @@
+import os
+import pathlib
+import sqlite3
+import threading
+from collections import deque
+
+# Rolling average of the most recent ratings, maintained incrementally from the bot's SQLite DB.
+# One read-only connection is kept open; each refresh only fetches rows with id > the largest id
+# already seen (primary-key range scan), and the window sum is updated as ratings enter/leave.
+# The result is published as one immutable tuple, so readers (the frame loop) never touch SQLite.
+# Ratings are ordered by id, i.e. insertion order, which is what created_at DEFAULT CURRENT_TIMESTAMP
+# records as well (at one-second resolution).
+
+Result = tuple[
+    tuple[float, ...], float | None, str | None
+]  # (ratings newest first, avg, error)
+
+
+class FeedbackAggregate:
+    def __init__(self, db_path: str, window: int = 20, poll_s: float = 2.0):
+        self.db_path = db_path
+        self.window = window
+        self.poll_s = poll_s
+        self._conn: sqlite3.Connection | None = None
+        self._ino = None
+        self._max_id = 0
+        self._win = deque(maxlen=window)
+        self._sum = 0.0
+        self._result: Result = ((), None, f"DB not read yet: {db_path}")
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---- reader, O(1) ----
+    def snapshot(self) -> Result:
+        return self._result
+
+    # ---- refresh (poll thread, or synchronously) ----
+    def _open(self):
+        self.close()
+        uri = pathlib.Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._ino = os.stat(self.db_path).st_ino
+        self._max_id, self._sum = 0, 0.0
+        self._win.clear()
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+
+    def _push(self, rating):
+        if rating is None:
+            return
+        if len(self._win) == self._win.maxlen:
+            self._sum -= self._win[0]
+        self._win.append(float(rating))
+        self._sum += float(rating)
+
+    def refresh(self) -> Result:
+        """Fetch ratings added since the last refresh and republish the window."""
+        try:
+            if not os.path.exists(self.db_path):
+                self.close()
+                self._result = ((), None, f"DB file not found: {self.db_path}")
+                return self._result
+            # first run / DB file replaced
+            if self._conn is None or os.stat(self.db_path).st_ino != self._ino:
+                self._open()
+            conn = self._conn
+            if not conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='feedback'"
+            ).fetchone():
+                self._result = ((), None, "Table 'feedback' not found")
+                return self._result
+            top = conn.execute("SELECT max(id) FROM feedback").fetchone()[0] or 0
+            if top < self._max_id:  # rows deleted / table recreated: start over
+                self._max_id, self._sum = 0, 0.0
+                self._win.clear()
+            if top > self._max_id:
+                if self._max_id == 0:
+                    rows = conn.execute(
+                        "SELECT id, rating FROM feedback ORDER BY id DESC LIMIT ?",
+                        (self.window,),
+                    ).fetchall()[::-1]
+                else:
+                    rows = conn.execute(
+                        "SELECT id, rating FROM feedback WHERE id > ? ORDER BY id",
+                        (self._max_id,),
+                    ).fetchall()
+                for _, rating in rows:
+                    self._push(rating)
+                self._max_id = top
+            n = len(self._win)
+            self._result = (
+                tuple(reversed(self._win)),
+                self._sum / n if n else None,
+                None,
+            )
+        except Exception as ex:
+            self.close()
+            self._result = ((), None, f"DB read error: {ex}")
+        return self._result
+
+    # ---- background polling ----
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.poll_s)
+        self.close()
+
+    def start(self) -> "FeedbackAggregate":
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-aggregate", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_s + 1.0)
@@ -1,5 +1,7 @@
-import random, sqlite3, os
-from typing import Tuple
+import os
+import random
+
+from feedback_aggregate import FeedbackAggregate
 
 DB_PATH = os.getenv("DB_PATH", "storage/feedback.db")
 
@@ -10,14 +12,16 @@ PALETTES = [
     {'bg': (10,50,40), 'fg': (250,240,200)},
 ]
 
+_aggregates: dict[int, FeedbackAggregate] = {}   # per window size; persistent connection, new rows only
+
 def get_recent_avg(n: int = 20) -> float:
-    if not os.path.exists(DB_PATH): return 3.0
-    with sqlite3.connect(DB_PATH) as conn:
-        cur = conn.execute("SELECT rating FROM feedback ORDER BY id DESC LIMIT ?", (n,))
-        vals = [r[0] for r in cur.fetchall()]
-        return sum(vals)/len(vals) if vals else 3.0
+    agg = _aggregates.get(n)
+    if agg is None:
+        agg = _aggregates[n] = FeedbackAggregate(DB_PATH, n)
+    _, avg, _ = agg.refresh()
+    return avg if avg is not None else 3.0
 
-def choose_palette(current: dict | None, eps: float = 0.2) -> Tuple[dict, bool]:
+def choose_palette(current: dict | None, eps: float = 0.2) -> tuple[dict, bool]:
     changed = False
     if current is None or random.random() < eps:
         base = random.choice(PALETTES)
@@ -1,33 +1,62 @@
 
 import asyncio
-import csv
-import io
 import logging
+import os
 import sqlite3
+import time
 from contextlib import closing
-from datetime import datetime
-from typing import Optional
+from datetime import UTC, datetime
 
+from feedback_db import FeedbackDB
+from feedback_export import FORMATS, export_feedback
 from telegram import (
-    Update,
-    InlineKeyboardMarkup,
     InlineKeyboardButton,
+    InlineKeyboardMarkup,
     InputFile,
+    Update,
 )
 from telegram.ext import (
     ApplicationBuilder,
-    CommandHandler,
     CallbackQueryHandler,
-    MessageHandler,
+    CommandHandler,
     ContextTypes,
-    filters,
     ConversationHandler,
+    MessageHandler,
+    filters,
 )
+from update_processor import PerUserUpdateProcessor
+from user_cache import TokenBucket, UserCache
+
 
 # ===================== CONFIG =====================
-BOT_TOKEN = "bot token"  # <-- replace with your real token
-OWNER_ID = 'your id'  # <-- replace with your own Telegram numeric user ID
-DB_PATH = "/feedback2.db"
+# Values below are defaults; the same names in the environment override them
+# (bench_bot.py uses this to point the bot at the local fake_telegram.py).
+def _env(name: str, default, cast=str):
+    v = os.getenv(name)
+    return default if v in (None, "") else cast(v)
+
+BOT_TOKEN = _env("TELEGRAM_BOT_TOKEN", "bot token")  # <-- replace with your real token
+OWNER_ID = _env("OWNER_ID", 'your id', int)  # <-- replace with your own Telegram numeric user ID
+DB_PATH = _env("DB_PATH", "/feedback2.db")
+API_BASE_URL = _env("API_BASE_URL", "https://api.telegram.org/bot")
+UPDATE_MODE = _env("UPDATE_MODE", "polling")   # "polling" or "webhook" (needs python-telegram-bot[webhooks])
+WEBHOOK_LISTEN = _env("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = _env("WEBHOOK_PORT", 8443, int)
+WEBHOOK_PATH = _env("WEBHOOK_PATH", "telegram")
+WEBHOOK_URL = _env("WEBHOOK_URL", "")          # public https URL Telegram posts to, e.g. https://bot.example.org/telegram
+WEBHOOK_SECRET = _env("WEBHOOK_SECRET", "")    # checked against X-Telegram-Bot-Api-Secret-Token
+CONCURRENT_UPDATES = _env("CONCURRENT_UPDATES", 64, int)  # updates handled at once, one at a time per user (update_processor.py); their DB writes share commits (feedback_db.py)
+COMMENT_TIMEOUT_S = 120  # a rating waits this long for its comment, then is saved without one
+FLUSH_EVERY_S = 1.0      # finished ratings are written in batches at most this far apart
+FLUSH_MAX = 200          # ...or as soon as this many are waiting
+SAVE_RETRIES = 10        # flushes a rating may fail on (DB locked, disk full) before it is dropped
+USER_CACHE_SIZE = 10000  # users whose profile / recent ratings are kept in memory (LRU)
+RATE_LIMIT_PER_S = _env("RATE_LIMIT_PER_S", 1.0, float)  # per-user requests per second for /start, /rate, rating taps, /myratings
+RATE_LIMIT_BURST = _env("RATE_LIMIT_BURST", 5, int)      # ...with bursts up to this many
+MY_RATINGS_LIMIT = 10
+
+# Only the update types some handler uses; Telegram then doesn't send (and we don't parse) the rest
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
 
 # Conversation states
 WAITING_COMMENT = 1
@@ -82,99 +111,322 @@ def _add_col_if_missing(conn, table: str, col: str, decl: str):
     if col not in cols:
         conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl};")
 
-def migrate_schema():
-    with closing(get_db_connection()) as conn, conn:
-        _add_col_if_missing(conn, "users", "username",   "TEXT")
-        _add_col_if_missing(conn, "users", "first_name", "TEXT")
-        _add_col_if_missing(conn, "users", "last_name",  "TEXT")
-        _add_col_if_missing(conn, "users", "updated_at", "DATETIME DEFAULT CURRENT_TIMESTAMP")
-        _add_col_if_missing(conn, "feedback", "username",   "TEXT")
-        _add_col_if_missing(conn, "feedback", "comment",    "TEXT")
-        _add_col_if_missing(conn, "feedback", "created_at", "DATETIME DEFAULT CURRENT_TIMESTAMP")
-
-# ===================== BOT DB OPS =====================
+def _migrate_v1(conn):
+    """Columns added after the first release."""
+    _add_col_if_missing(conn, "users", "username",   "TEXT")
+    _add_col_if_missing(conn, "users", "first_name", "TEXT")
+    _add_col_if_missing(conn, "users", "last_name",  "TEXT")
+    # SQLite refuses DEFAULT CURRENT_TIMESTAMP in ADD COLUMN; upsert_user sets updated_at itself,
+    # and feedback time is kept in created_ts (v2) for rows inserted after this
+    _add_col_if_missing(conn, "users", "updated_at", "DATETIME")
+    _add_col_if_missing(conn, "feedback", "username",   "TEXT")
+    _add_col_if_missing(conn, "feedback", "comment",    "TEXT")
+    _add_col_if_missing(conn, "feedback", "created_at", "DATETIME")
+
+ROLLUPS = {"feedback_rollup_minute": 60, "feedback_rollup_hour": 3600}
+
+def _migrate_v2(conn):
+    """
+    Epoch timestamps (created_ts), indexes, and per-minute / per-hour rollups per palette.
+    created_at stays for display and export; created_ts is what queries sort and filter on.
+    """
+    _add_col_if_missing(conn, "feedback", "created_ts", "INTEGER")
+    _add_col_if_missing(conn, "feedback", "palette", "TEXT")     # palette shown when rated, if known
+    conn.execute("UPDATE feedback SET created_ts = CAST(strftime('%s', created_at) AS INTEGER) "
+                 "WHERE created_ts IS NULL AND created_at IS NOT NULL;")
+    # ALTER TABLE can't add a column with a non-constant default: fill it on insert instead
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS feedback_created_ts AFTER INSERT ON feedback
+        WHEN NEW.created_ts IS NULL
+        BEGIN
+            UPDATE feedback SET created_ts = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = NEW.id;
+        END;
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_created_ts ON feedback(created_ts);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_user_ts ON feedback(user_id, created_ts);")
 
-def upsert_user(user_id: int, username: Optional[str], first_name: Optional[str], last_name: Optional[str]):
-    with closing(get_db_connection()) as conn, conn:
+    for table, secs in ROLLUPS.items():
         conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket  INTEGER NOT NULL,   -- epoch seconds, start of the bucket
+                palette TEXT    NOT NULL,   -- '' when unknown
+                n       INTEGER NOT NULL,
+                total   INTEGER NOT NULL,
+                PRIMARY KEY (bucket, palette)
+            ) WITHOUT ROWID;
             """
-            INSERT INTO users (user_id, username, first_name, last_name, updated_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(user_id) DO UPDATE SET
-                username=excluded.username,
-                first_name=excluded.first_name,
-                last_name=excluded.last_name,
-                updated_at=CURRENT_TIMESTAMP;
-            """,
-            (user_id, username, first_name, last_name),
         )
-
-
-def save_rating(user_id: int, username: Optional[str], rating: int, comment: Optional[str] = None):
-    with closing(get_db_connection()) as conn, conn:
+        # NEW.created_ts is NULL for plain inserts: use the same 'now' the trigger above stores
+        ts = "COALESCE(NEW.created_ts, CAST(strftime('%s', 'now') AS INTEGER))"
+        add = (f"INSERT INTO {table} (bucket, palette, n, total) "
+               f"VALUES ({ts} / {secs} * {secs}, IFNULL(NEW.palette, ''), 1, NEW.rating) "
+               f"ON CONFLICT(bucket, palette) DO UPDATE SET n = n + 1, total = total + excluded.total;")
+        sub = (f"UPDATE {table} SET n = n - 1, total = total - OLD.rating "
+               f"WHERE bucket = OLD.created_ts / {secs} * {secs} AND palette = IFNULL(OLD.palette, '');")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_ins AFTER INSERT ON feedback "
+                     f"WHEN NEW.rating IS NOT NULL BEGIN {add} END;")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_del AFTER DELETE ON feedback "
+                     f"WHEN OLD.rating IS NOT NULL BEGIN {sub} END;")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_upd_old AFTER UPDATE OF rating, palette, created_ts ON feedback "
+                     f"WHEN OLD.rating IS NOT NULL AND OLD.created_ts IS NOT NULL BEGIN {sub} END;")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_upd_new AFTER UPDATE OF rating, palette, created_ts ON feedback "
+                     f"WHEN NEW.rating IS NOT NULL AND OLD.created_ts IS NOT NULL BEGIN {add} END;")
+        conn.execute(f"DELETE FROM {table};")
         conn.execute(
+            f"""
+            INSERT INTO {table} (bucket, palette, n, total)
+            SELECT created_ts / {secs} * {secs}, IFNULL(palette, ''), COUNT(*), SUM(rating)
+            FROM feedback WHERE rating IS NOT NULL AND created_ts IS NOT NULL
+            GROUP BY 1, 2;
             """
-            INSERT INTO feedback (user_id, username, rating, comment)
-            VALUES (?, ?, ?, ?);
-            """,
-            (user_id, username, rating, comment),
         )
 
+def _migrate_v3(conn):
+    """Last exported id per exporter, for `/export new`."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS export_state (
+            name        TEXT PRIMARY KEY,
+            last_id     INTEGER NOT NULL,
+            exported_at INTEGER NOT NULL
+        );
+        """
+    )
 
-def fetch_user_ratings(user_id: int, limit: int = 10):
-    with closing(get_db_connection()) as conn, conn:
-        cur = conn.execute(
-            """
-            SELECT rating, IFNULL(comment, ''), created_at
-            FROM feedback
-            WHERE user_id = ?
-            ORDER BY datetime(created_at) DESC
-            LIMIT ?;
-            """,
-            (user_id, limit),
-        )
-        return cur.fetchall()
+# PRAGMA user_version records the last applied step; append new steps, never edit applied ones
+MIGRATIONS = {1: _migrate_v1, 2: _migrate_v2, 3: _migrate_v3}
 
+def migrate_schema():
+    with closing(get_db_connection()) as conn:
+        version = conn.execute("PRAGMA user_version;").fetchone()[0]
+        for v in sorted(MIGRATIONS):
+            if v <= version:
+                continue
+            try:
+                conn.execute("BEGIN;")
+                MIGRATIONS[v](conn)
+                conn.execute(f"PRAGMA user_version = {v};")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info("DB schema migrated to v%d", v)
+
+# ===================== BOT DB OPS =====================
+# Run on the DB thread (feedback_db.py) with its connection: `await db.write(save_ratings, rows)`.
+# Writes don't commit; the DB thread commits them in groups.
+
+db: FeedbackDB | None = None
+
+
+def upsert_user(conn, user_id: int, username: str | None, first_name: str | None, last_name: str | None):
+    conn.execute(
+        """
+        INSERT INTO users (user_id, username, first_name, last_name, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(user_id) DO UPDATE SET
+            username=excluded.username,
+            first_name=excluded.first_name,
+            last_name=excluded.last_name,
+            updated_at=CURRENT_TIMESTAMP;
+        """,
+        (user_id, username, first_name, last_name),
+    )
+
+
+def save_ratings(conn, rows: list[tuple]):
+    """rows: (user_id, username, rating, comment, created_at, created_ts), timestamps of the tap."""
+    conn.executemany(
+        """
+        INSERT INTO feedback (user_id, username, rating, comment, created_at, created_ts)
+        VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        rows,
+    )
 
-def export_all_feedback_csv() -> io.BytesIO:
-    with closing(get_db_connection()) as conn, conn:
-        cur = conn.execute(
-            """
-            SELECT id, user_id, username, rating, comment, created_at
-            FROM feedback
-            ORDER BY id ASC;
-            """
-        )
-        rows = cur.fetchall()
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["id", "user_id", "username", "rating", "comment", "created_at"])
-    for r in rows:
-        writer.writerow(r)
+def fetch_user_ratings(conn, user_id: int, limit: int = 10):
+    cur = conn.execute(
+        """
+        SELECT rating, IFNULL(comment, ''), created_at
+        FROM feedback
+        WHERE user_id = ?
+        ORDER BY created_ts DESC, id DESC
+        LIMIT ?;
+        """,
+        (user_id, limit),
+    )
+    return cur.fetchall()
+
+
+def fetch_window_stats(conn, seconds: int):
+    """[(palette, count, avg)] over the last `seconds`, from the rollups (one row per bucket and palette)."""
+    table = "feedback_rollup_minute" if seconds <= 2 * 3600 else "feedback_rollup_hour"
+    secs = ROLLUPS[table]
+    since = (int(datetime.now().timestamp()) - seconds) // secs * secs
+    cur = conn.execute(
+        f"""
+        SELECT palette, SUM(n), SUM(total) FROM {table}
+        WHERE bucket >= ?
+        GROUP BY palette HAVING SUM(n) > 0
+        ORDER BY palette;
+        """,
+        (since,),
+    )
+    return [(p, n, total / n) for p, n, total in cur.fetchall()]
+
+
+def last_export_id(conn, name: str) -> int:
+    row = conn.execute("SELECT last_id FROM export_state WHERE name = ?;", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def mark_exported(conn, name: str, last_id: int):
+    conn.execute(
+        """
+        INSERT INTO export_state (name, last_id, exported_at) VALUES (?, ?, CAST(strftime('%s', 'now') AS INTEGER))
+        ON CONFLICT(name) DO UPDATE SET last_id=excluded.last_id, exported_at=excluded.exported_at;
+        """,
+        (name, last_id),
+    )
 
-    bio = io.BytesIO(output.getvalue().encode("utf-8"))
-    bio.name = f"feedback_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return bio
+# ===================== PENDING RATINGS =====================
+
+class RatingBuffer:
+    """
+    One row per rating: a tapped rating is held per user until its comment, /skip, the next
+    rating or COMMENT_TIMEOUT_S, then queued; queued rows are written in one batch per flush.
+    When the batch fails, rows are written one by one: rows the DB refuses (integrity errors)
+    are logged and dropped, other failures are retried up to SAVE_RETRIES flushes.
+    Lives on the event loop, so no locking.
+    """
+
+    def __init__(self):
+        self.pending: dict[int, tuple[str | None, int, float, float]] = {}   # user -> (username, rating, tapped_at, deadline)
+        self.ready: list[tuple] = []
+        self.failures: dict[tuple, int] = {}    # row -> failed flushes so far
+        self.dropped = 0
+        self._last_flush = time.monotonic()
+        self.task: asyncio.Task | None = None
+
+    def hold(self, user_id: int, username: str | None, rating: int):
+        self.finalize(user_id)                  # an earlier rating still waiting for its comment
+        self.pending[user_id] = (username, rating, time.time(), time.monotonic() + COMMENT_TIMEOUT_S)
+
+    def finalize(self, user_id: int, comment: str | None = None) -> int | None:
+        p = self.pending.pop(user_id, None)
+        if p is None:
+            return None
+        username, rating, tapped_at, _ = p
+        created_at = datetime.fromtimestamp(tapped_at, UTC).strftime("%Y-%m-%d %H:%M:%S")
+        self.ready.append((user_id, username, rating, comment, created_at, int(tapped_at)))
+        return rating
+
+    def expire(self):
+        now = time.monotonic()
+        for user_id in [u for u, p in self.pending.items() if p[3] <= now]:
+            self.finalize(user_id)
+
+    async def flush(self):
+        rows, self.ready = self.ready, []
+        self._last_flush = time.monotonic()
+        if not rows:
+            return
+        try:
+            await db.write(save_ratings, rows)
+        except Exception as ex:
+            logger.warning("Saving %d ratings failed, retrying one by one: %s", len(rows), ex)
+            rows = await self._save_each(rows)
+        for user_id in {r[0] for r in rows}:
+            users.invalidate_recent(user_id)
+
+    async def _save_each(self, rows: list[tuple]) -> list[tuple]:
+        # one write job (savepoint) per row: a row the DB refuses can't hold back the others
+        results = await asyncio.gather(*(db.write(save_ratings, [r]) for r in rows), return_exceptions=True)
+        saved, retry, err = [], [], None
+        for row, res in zip(rows, results):
+            if not isinstance(res, Exception):
+                saved.append(row)
+                self.failures.pop(row, None)
+            elif isinstance(res, sqlite3.IntegrityError) or self.failures.get(row, 0) + 1 >= SAVE_RETRIES:       # will never fit: don't retry
+                self._drop(row, res)
+            else:
+                self.failures[row] = self.failures.get(row, 0) + 1
+                retry.append(row)
+                err = res
+        if retry:
+            logger.error("Saving %d ratings failed, will retry: %s", len(retry), err)
+            self.ready[:0] = retry
+        return saved
+
+    def _drop(self, row: tuple, ex: Exception):
+        self.failures.pop(row, None)
+        self.dropped += 1
+        logger.error("Dropping rating %d of user %s from %s, it can't be saved: %s", row[2], row[0], row[4], ex)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(min(1.0, FLUSH_EVERY_S))
+            self.expire()
+            if len(self.ready) >= FLUSH_MAX or time.monotonic() - self._last_flush >= FLUSH_EVERY_S:
+                await self.flush()
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        for user_id in list(self.pending):
+            self.finalize(user_id)
+        await self.flush()
+
+
+ratings = RatingBuffer()
+
+# ===================== USER CACHE / RATE LIMIT =====================
+# Both on the event loop (user_cache.py): profiles already in `users` and recent ratings are
+# served from memory, and each user gets a token bucket so button-mashing can't become DB work.
+
+users = UserCache(USER_CACHE_SIZE)
+limiter = TokenBucket(RATE_LIMIT_PER_S, RATE_LIMIT_BURST, USER_CACHE_SIZE)
+
+async def remember_user(user):
+    """Upsert the user only when username / name differ from what was last written."""
+    profile = (user.username, user.first_name, user.last_name)
+    if users.profile_changed(user.id, profile):
+        await db.write(upsert_user, user.id, *profile)
+        users.remember_profile(user.id, profile)
+
+async def throttled(update: Update) -> bool:
+    if limiter.allow(update.effective_user.id):
+        return False
+    if update.callback_query is not None:
+        await update.callback_query.answer("Too fast, please wait a moment.")
+    else:
+        await update.message.reply_text("Too many requests, please wait a moment.")
+    return True
 
 # ===================== UI HELPERS =====================
 
 def rating_keyboard() -> InlineKeyboardMarkup:
-    buttons = [[InlineKeyboardButton(text=str(n), callback_data=f"rate:{n}") for n in range(0, 6)]]
+    buttons = [[InlineKeyboardButton(text=str(n), callback_data=f"rate:{n}") for n in range(6)]]
     return InlineKeyboardMarkup(buttons)
 
 # ===================== HANDLERS =====================
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    upsert_user(user.id, user.username, user.first_name, user.last_name)
+    if await throttled(update):
+        return
+    await remember_user(update.effective_user)
     msg = (
         "👋 Ciao! Use /rate to rate the visual style from 0 to 5.\n"
         "After choosing a rating, you may add an optional comment or /skip.\n\n"
         "Commands:\n"
         "• /rate — start a rating flow\n"
         "• /myratings — see your recent ratings\n"
-        "• /export — owner only, download all feedback as CSV\n"
+        "• /export [csv|csv.gz|parquet] [new|7d|24h|YYYY-MM-DD[..YYYY-MM-DD]] — owner only, download feedback\n"
+        "• /stats — owner only, average rating over the last hour / day\n"
     )
     await update.message.reply_text(msg)
 
@@ -182,13 +434,16 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await start(update, context)
 
 async def rate_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    upsert_user(user.id, user.username, user.first_name, user.last_name)
+    if await throttled(update):
+        return None
+    await remember_user(update.effective_user)
     await update.message.reply_text("Tap a rating (0–5):", reply_markup=rating_keyboard())
     return WAITING_COMMENT
 
 async def on_button_rate(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
+    if await throttled(update):
+        return None                             # stay in the current state
     await query.answer()
     try:
         _, rating_str = query.data.split(":", 1)
@@ -197,8 +452,8 @@ async def on_button_rate(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("Oops, malformed data.")
         return ConversationHandler.END
     user = update.effective_user
-    save_rating(user.id, user.username, rating)
-    confirm = f"✅ Saved rating {rating}/5.\nYou can now send an optional short comment (under 200 chars), or /skip."
+    ratings.hold(user.id, user.username, rating)
+    confirm = f"✅ Got your rating {rating}/5.\nYou can now send an optional short comment (under 200 chars), or /skip."
     try:
         await query.edit_message_text(text=f"Your rating: {rating}/5")
     except Exception:
@@ -217,19 +472,29 @@ async def on_comment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Please keep the comment under 200 characters, or /skip.")
         return WAITING_COMMENT
     user = update.effective_user
-    save_rating(user.id, user.username, rating, comment=text)
-    await update.message.reply_text("📝 Comment saved. Thanks!")
     context.user_data.pop("current_rating", None)
+    if ratings.finalize(user.id, text) is None:
+        await update.message.reply_text("Your rating was already recorded without a comment. Use /rate to rate again.")
+        return ConversationHandler.END
+    await update.message.reply_text("📝 Got your comment. Thanks!")
     return ConversationHandler.END
 
 async def skip_comment(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.pop("current_rating", None)
+    ratings.finalize(update.effective_user.id)
     await update.message.reply_text("No comment recorded. Thanks for your rating!")
     return ConversationHandler.END
 
 async def my_ratings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await throttled(update):
+        return
     user = update.effective_user
-    rows = fetch_user_ratings(user.id, limit=10)
+    await ratings.flush()                       # include ratings finished since the last flush
+    rows = users.recent(user.id, MY_RATINGS_LIMIT)
+    if rows is None:
+        gen = users.gen
+        rows = await db.read(fetch_user_ratings, user.id, MY_RATINGS_LIMIT)
+        users.remember_recent(user.id, MY_RATINGS_LIMIT, rows, gen)
     if not rows:
         await update.message.reply_text("You have no ratings yet. Use /rate to start.")
         return
@@ -239,22 +504,90 @@ async def my_ratings(update: Update, context: ContextTypes.DEFAULT_TYPE):
         lines.append(f"• {when} — ⭐ {r}/5" + (f", \"{short_c}\"" if short_c else ""))
     await update.message.reply_text("\n".join(lines))
 
-async def export_csv(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def _utc_day(d: str) -> int:
+    return int(datetime.strptime(d, "%Y-%m-%d").replace(tzinfo=UTC).timestamp())
+
+def parse_export_args(args) -> tuple[str, int | None, int | None, bool]:
+    """/export arguments -> (format, since_ts, until_ts, only new rows). Dates are UTC."""
+    fmt, since, until, new = "csv", None, None, False
+    for a in args:
+        a = a.strip().lower()
+        if a in FORMATS or a == "gz":
+            fmt = "csv.gz" if a == "gz" else a
+        elif a == "new":
+            new = True
+        elif a[:-1].isdigit() and a[-1] in "dh":
+            since = int(time.time()) - int(a[:-1]) * (86400 if a[-1] == "d" else 3600)
+        else:
+            lo, _, hi = a.partition("..")
+            try:
+                since = _utc_day(lo)
+                until = _utc_day(hi) + 86400 if hi else since + 86400
+            except ValueError:
+                raise ValueError(f"Unknown export option '{a}'")
+    return fmt, since, until, new
+
+async def export_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != OWNER_ID:
         await update.message.reply_text("Only the owner can export.")
         return
-    bio = export_all_feedback_csv()
-    await update.message.reply_document(document=InputFile(bio), caption="All feedback (CSV)")
+    try:
+        fmt, since, until, new = parse_export_args(context.args or [])
+    except ValueError as ex:
+        await update.message.reply_text(f"{ex}. Usage: /export [csv|csv.gz|parquet] [new|7d|24h|YYYY-MM-DD[..YYYY-MM-DD]]")
+        return
+    await ratings.flush()
+    after_id = await db.read(last_export_id, "owner") if new else None
+    try:
+        out, name, n, last_id = await asyncio.to_thread(export_feedback, DB_PATH, fmt, since, until, after_id)
+    except RuntimeError as ex:
+        await update.message.reply_text(str(ex))
+        return
+    with out:
+        if n == 0:
+            await update.message.reply_text("Nothing to export.")
+            return
+        # hand over the spooled file itself (closed by `with out`); python-telegram-bot still reads
+        # the upload into memory when it builds the request, csv.gz / parquet keep that small
+        out.seek(0)
+        await update.message.reply_document(document=InputFile(out, filename=name),
+                                            caption=f"{n} feedback rows ({fmt})" + (" since last export" if new else ""))
+    if since is None and until is None:         # everything up to last_id has now been exported
+        await db.write(mark_exported, "owner", last_id)
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        await update.message.reply_text("Only the owner can see stats.")
+        return
+    lines = []
+    for label, seconds in (("Last hour", 3600), ("Last 24h", 86400)):
+        rows = await db.read(fetch_window_stats, seconds)
+        n = sum(r[1] for r in rows)
+        avg = sum(r[1] * r[2] for r in rows) / n if n else None
+        lines.append(f"{label}: " + (f"⭐ {avg:.2f} from {n} ratings" if n else "no ratings"))
+        lines += [f"  • {p}: ⭐ {a:.2f} ({c})" for p, c, a in rows if p]
+    await update.message.reply_text("\n".join(lines))
 
 async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Unknown command. Try /start.")
 
 # ===================== MAIN =====================
 
+async def _start_ratings(app):
+    ratings.task = asyncio.create_task(ratings.run())
+
+async def _close_db(app):
+    await ratings.close()
+    db.close()
+
 def main():
+    global db
     ensure_db()
     migrate_schema()
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    db = FeedbackDB(DB_PATH).start()
+    app = (ApplicationBuilder().token(BOT_TOKEN).base_url(API_BASE_URL)
+           .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES))
+           .post_init(_start_ratings).post_shutdown(_close_db).build())
     conv = ConversationHandler(
         entry_points=[CommandHandler("rate", rate_cmd), CallbackQueryHandler(on_button_rate, pattern=r"^rate:.*")],
         states={WAITING_COMMENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, on_comment), CommandHandler("skip", skip_comment)]},
@@ -264,11 +597,21 @@ def main():
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_cmd))
     app.add_handler(CommandHandler("myratings", my_ratings))
-    app.add_handler(CommandHandler("export", export_csv))
+    app.add_handler(CommandHandler("export", export_cmd))
+    app.add_handler(CommandHandler("stats", stats))
     app.add_handler(conv)
     app.add_handler(MessageHandler(filters.COMMAND, unknown))
-    logger.info("Bot is starting…")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if UPDATE_MODE == "webhook":
+        if not WEBHOOK_URL:
+            raise SystemExit("UPDATE_MODE=webhook needs WEBHOOK_URL")
+        logger.info("Bot is starting (webhook on %s:%d/%s)…", WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH)
+        # Telegram pushes each update as it happens; the handler only enqueues it and answers 200
+        app.run_webhook(listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, url_path=WEBHOOK_PATH, webhook_url=WEBHOOK_URL,
+                        secret_token=WEBHOOK_SECRET or None, allowed_updates=ALLOWED_UPDATES,
+                        max_connections=CONCURRENT_UPDATES)
+    else:
+        logger.info("Bot is starting (polling)…")
+        app.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fake_telegram import FakeTelegram
+
+# Load test for the feedback bot, fully offline: Telegrambot.py runs as a subprocess pointed at
+# a local FakeTelegram (API_BASE_URL), and simulated users each go through
+#   /rate -> tap a rating -> comment -> /myratings
+# one update at a time, waiting for the bot's replies. Reports updates/s, p50/p99 time to the
+# first bot API call for an update ("first") and to its last one ("done"), and bot CPU per update.
+#   python bench_bot.py --mode webhook --users 50 --duration 15
+#   python bench_bot.py --mode polling --users 50 --noise 0.3    # 30% extra edited_message updates
+# --noise sends update types no handler uses; with the bot's allowed_updates they never leave Telegram.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# (update kind, text / callback data, bot API calls the handler makes)
+SCRIPT = [
+    ("message", "/rate", 1),
+    ("callback_query", "rate:{r}", 3),
+    ("message", "nice colours", 1),
+    ("message", "/myratings", 1),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _listening(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+
+def _proc_cpu_s(pid: int):
+    # utime + stime of the bot process (Linux /proc); None elsewhere
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _percentile(vals, p: float) -> float:
+    if not vals:
+        return float("nan")
+    s = sorted(vals)
+    return s[min(len(s) - 1, round(p / 100.0 * (len(s) - 1)))]
+
+
+# ================= USERS =================
+class Users:
+    def __init__(self, fake: FakeTelegram, n: int, noise: float):
+        self.fake, self.n, self.noise = fake, n, noise
+        self.updates = 0
+        self.errors = 0
+        self.first_ms: list = []
+        self.done_ms: list = []
+        self._ids = iter(range(1, 1 << 62))
+        self._lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def _update(self, uid: int, kind: str, text: str) -> dict:
+        user = {
+            "id": uid,
+            "is_bot": False,
+            "first_name": f"User {uid}",
+            "username": f"user{uid}",
+        }
+        chat = {"id": uid, "type": "private"}
+        uid_ = self._next_id()
+        if kind == "callback_query":
+            msg = {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": chat,
+                "text": "Tap a rating (0–5):",
+            }
+            return {
+                "update_id": uid_,
+                kind: {
+                    "id": f"cb{uid_}",
+                    "from": user,
+                    "chat_instance": str(uid),
+                    "data": text,
+                    "message": msg,
+                },
+            }
+        msg = {
+            "message_id": uid_,
+            "date": int(time.time()),
+            "chat": chat,
+            "from": user,
+            "text": text,
+        }
+        if text.startswith("/"):
+            msg["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+            ]
+        return {"update_id": uid_, kind: msg}
+
+    def run(self, duration: float):
+        stop_at = time.monotonic() + duration
+        ts = [
+            threading.Thread(target=self._user, args=(10_000 + i, stop_at), daemon=True)
+            for i in range(self.n)
+        ]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+
+    def _user(self, uid: int, stop_at: float):
+        rnd = random.Random(uid)
+        first, done, updates, errors = [], [], 0, 0
+        while time.monotonic() < stop_at:
+            for kind, text, calls in SCRIPT:
+                t0 = time.perf_counter()
+                try:
+                    if rnd.random() < self.noise:  # no reply expected either way
+                        self.fake.deliver(self._update(uid, "edited_message", "edited"))
+                        t0 = time.perf_counter()
+                    self.fake.deliver(
+                        self._update(uid, kind, text.format(r=rnd.randint(0, 5)))
+                    )
+                    got = self.fake.wait_calls(uid, calls)
+                except Exception:
+                    errors += 1
+                    break
+                first.append((got[0][1] - t0) * 1000.0)
+                done.append((got[-1][1] - t0) * 1000.0)
+                updates += 1
+        with self._lock:
+            self.updates += updates
+            self.errors += errors
+            self.first_ms += first
+            self.done_ms += done
+
+
+# ================= HARNESS =================
+def start_bot(args, fake: FakeTelegram, tmp: str):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        TELEGRAM_BOT_TOKEN="123456:bench",
+        OWNER_ID="1",
+        API_BASE_URL=fake.url + "/bot",
+        DB_PATH=os.path.join(tmp, "feedback.db"),
+        UPDATE_MODE=args.mode,
+        WEBHOOK_LISTEN="127.0.0.1",
+        WEBHOOK_PORT=str(port),
+        WEBHOOK_URL=f"http://127.0.0.1:{port}/telegram",
+        WEBHOOK_SECRET="bench",
+        CONCURRENT_UPDATES=str(args.concurrent),
+        RATE_LIMIT_PER_S="1e9",
+        PYTHONUNBUFFERED="1",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "Telegrambot.py"],
+        cwd=HERE,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"bot exited with code {proc.returncode}")
+        # setWebhook can come before the bot's webhook server listens: wait for both
+        if (
+            fake.webhook_url and _listening(port)
+            if args.mode == "webhook"
+            else fake.api_calls.get("getUpdates")
+        ):
+            return proc
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("bot did not come up")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mode", choices=("webhook", "polling"), default="webhook")
+    ap.add_argument(
+        "--users",
+        type=int,
+        default=50,
+        help="simulated users, each one update at a time",
+    )
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--concurrent", type=int, default=64, help="bot CONCURRENT_UPDATES")
+    ap.add_argument(
+        "--noise",
+        type=float,
+        default=0.0,
+        help="chance of an extra unhandled update before each one",
+    )
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    fake = FakeTelegram().start()
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = start_bot(args, fake, tmp)
+        try:
+            users = Users(fake, args.users, args.noise)
+            cpu0, t0 = _proc_cpu_s(proc.pid), time.perf_counter()
+            users.run(args.duration)
+            t1, cpu1 = time.perf_counter(), _proc_cpu_s(proc.pid)
+        finally:
+            proc.send_signal(signal.SIGINT)
+            try:
+                proc.wait(15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            fake.stop()
+
+    cpu_us = (
+        (cpu1 - cpu0) / users.updates * 1e6
+        if cpu0 is not None and cpu1 is not None and users.updates
+        else None
+    )
+    res = {
+        "mode": args.mode,
+        "users": args.users,
+        "updates": users.updates,
+        "errors": users.errors,
+        "updates_per_s": users.updates / (t1 - t0),
+        "first_p50_ms": _percentile(users.first_ms, 50),
+        "first_p99_ms": _percentile(users.first_ms, 99),
+        "done_p50_ms": _percentile(users.done_ms, 50),
+        "done_p99_ms": _percentile(users.done_ms, 99),
+        "filtered": fake.filtered,
+        "allowed_updates": fake.allowed,
+        "cpu_us_per_update": cpu_us,
+        "api_calls": fake.api_calls,
+    }
+    if args.json:
+        print(json.dumps(res, indent=2))
+        return
+    cpu = f"{cpu_us:.0f}" if cpu_us is not None else "n/a"
+    print(
+        f"mode={args.mode} users={args.users} duration={args.duration}s concurrent={args.concurrent} "
+        f"allowed_updates={fake.allowed}"
+    )
+    print(
+        f"updates {users.updates} ({users.errors} errors), {res['updates_per_s']:.0f}/s, "
+        f"filtered by allowed_updates {fake.filtered}"
+    )
+    print(
+        f"first reply p50 {res['first_p50_ms']:.1f} ms  p99 {res['first_p99_ms']:.1f} ms | "
+        f"handler done p50 {res['done_p50_ms']:.1f} ms  p99 {res['done_p99_ms']:.1f} ms | cpu {cpu} us/update"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Telegram Bot API, for load testing the bot without Telegram:
+#   bot -> fake   POST /bot<token>/<method> (getMe, setWebhook, getUpdates, sendMessage, ...);
+#                 every call is recorded per chat with its arrival time
+#   fake -> bot   deliver(update): filtered by the bot's allowed_updates like Telegram does, then
+#                 POSTed to the registered webhook, or queued for getUpdates when polling
+# Point the bot at it with API_BASE_URL=<fake.url>/bot (see bench_bot.py).
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "FakeBot",
+    "username": "fake_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False,
+}
+
+
+def _params(headers, body: bytes) -> dict:
+    # python-telegram-bot sends form fields (multipart when uploading), non-strings JSON-encoded
+    ctype = headers.get("Content-Type", "")
+    if ctype.startswith("application/json"):
+        return json.loads(body or b"{}")
+    if ctype.startswith("multipart/"):
+        msg = BytesParser().parsebytes(
+            b"Content-Type: " + ctype.encode() + b"\r\n\r\n" + body
+        )
+        raw = {
+            p.get_param("name", header="content-disposition"): p.get_payload(
+                decode=True
+            )
+            for p in msg.get_payload()
+            if not p.get_filename()
+        }
+        raw = {k: v.decode() for k, v in raw.items()}
+    else:
+        raw = dict(urllib.parse.parse_qsl(body.decode()))
+    out = {}
+    for k, v in raw.items():
+        try:
+            out[k] = json.loads(v)
+        except ValueError:
+            out[k] = v
+    return out
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the bot opens many connections at once; a short backlog means 1 s SYN retries
+
+
+class FakeTelegram:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.webhook_url: str | None = None
+        self.secret: str | None = None
+        self.allowed: list[str] | None = (
+            None  # None = Telegram's default (all but a few)
+        )
+        self.delivered = 0
+        self.filtered = 0  # updates not sent because of allowed_updates
+        self.api_calls: dict[str, int] = {}
+        self._calls: dict[int, list[tuple]] = {}  # chat id -> [(method, perf_counter)]
+        self._callbacks: dict[str, int] = {}  # callback_query id -> chat id
+        self._updates: list[dict] = []  # for getUpdates
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._msg_id = 0
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                method = self.path.rsplit("/", 1)[-1]
+                result = outer._call(method, _params(self.headers, body))
+                data = json.dumps({"ok": True, "result": result}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self.server = _Server((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    # ---- Bot API ----
+    def _message(self, chat_id, text=None) -> dict:
+        with self._cond:
+            self._msg_id += 1
+            mid = self._msg_id
+        return {
+            "message_id": mid,
+            "date": int(time.time()),
+            "from": BOT_USER,
+            "chat": {"id": int(chat_id), "type": "private"},
+            "text": text or "",
+        }
+
+    def _call(self, method: str, p: dict):
+        now = time.perf_counter()
+        chat = p.get("chat_id")
+        if method == "answerCallbackQuery":
+            chat = self._callbacks.pop(p.get("callback_query_id"), None)
+        with self._cond:
+            self.api_calls[method] = self.api_calls.get(method, 0) + 1
+            if chat is not None:
+                self._calls.setdefault(int(chat), []).append((method, now))
+                self._cond.notify_all()
+        if method == "getMe":
+            return BOT_USER
+        if method == "setWebhook":
+            self.webhook_url, self.secret = p.get("url"), p.get("secret_token")
+            self.allowed = p.get("allowed_updates")
+            return True
+        if method == "deleteWebhook":
+            self.webhook_url = None
+            return True
+        if method == "getWebhookInfo":
+            return {
+                "url": self.webhook_url or "",
+                "has_custom_certificate": False,
+                "pending_update_count": 0,
+            }
+        if method == "getUpdates":
+            return self._get_updates(p)
+        if method in ("sendMessage", "editMessageText", "sendDocument"):
+            return self._message(chat, p.get("text") or p.get("caption"))
+        return True
+
+    def _get_updates(self, p: dict) -> list[dict]:
+        if "allowed_updates" in p:
+            self.allowed = p["allowed_updates"]
+        offset, timeout = int(p.get("offset") or 0), float(p.get("timeout") or 0)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while not self._updates and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            return self._updates[: int(p.get("limit") or 100)]
+
+    # ---- delivery ----
+    def deliver(self, update: dict) -> bool:
+        """Send an update to the bot the way Telegram would; False if allowed_updates drops it."""
+        kind = next(k for k in update if k != "update_id")
+        if self.allowed and kind not in self.allowed:
+            self.filtered += 1
+            return False
+        if kind == "callback_query":
+            self._callbacks[update[kind]["id"]] = update[kind]["from"]["id"]
+        if self.webhook_url:
+            self._post(update)
+        else:
+            with self._cond:
+                self._updates.append(update)
+                self._cond.notify_all()
+        self.delivered += 1
+        return True
+
+    def _post(self, update: dict):
+        u = urllib.parse.urlsplit(self.webhook_url)
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = self.secret
+        body = json.dumps(update)
+        for attempt in (0, 1):
+            # one keep-alive connection per sending thread
+            conn = getattr(self._local, "conn", None)
+            fresh = conn is None
+            if fresh:
+                conn = self._local.conn = http.client.HTTPConnection(
+                    u.hostname, u.port, timeout=30
+                )
+            try:
+                conn.request("POST", u.path, body=body, headers=headers)
+                r = conn.getresponse()
+                r.read()
+                break
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                if fresh or attempt:  # only a reused connection may have gone stale
+                    raise
+        if r.status >= 300:
+            raise RuntimeError(f"webhook HTTP {r.status}")
+
+    def wait_calls(self, chat_id: int, n: int, timeout: float = 10.0) -> list[tuple]:
+        """Block until the bot has made n calls for this chat; returns and forgets them."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._calls.get(chat_id, ())) < n:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise TimeoutError(
+                        f"chat {chat_id}: {len(self._calls.get(chat_id, ()))}/{n} bot calls"
+                    )
+                self._cond.wait(left)
+            calls = self._calls[chat_id]
+            got, self._calls[chat_id] = calls[:n], calls[n:]
+            return got
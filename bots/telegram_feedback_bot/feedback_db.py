@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# SQLite access for the bot, off the event loop.
+# One thread owns one long-lived connection (WAL, so readers don't block the writer and commits
+# only append to the log). Handlers submit functions `fn(conn, *args)` and await the result.
+# Writes are group-committed: everything queued while the previous commit ran goes into the
+# next transaction, one fsync for the whole burst, each job in its own savepoint so a failing
+# write only fails its own caller. Statements are reused from the connection's statement cache
+# (the SQL strings are constants), so each is prepared once.
+
+_STOP = object()
+
+
+class FeedbackDB:
+    def __init__(self, path: str, max_batch: int = 256, cached_statements: int = 64):
+        self.path = path
+        self.max_batch = max_batch
+        self.cached_statements = cached_statements
+        self._q: queue.Queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-db", daemon=True
+        )
+        self.commits = 0
+        self.writes = 0
+
+    # ---- event-loop side ----
+    def start(self) -> "FeedbackDB":
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def close(self):
+        if self._thread.is_alive():
+            self._q.put(_STOP)
+            self._thread.join()
+
+    def _submit(self, write: bool, fn: Callable, args) -> Future:
+        fut: Future = Future()
+        self._q.put((write, fn, args, fut))
+        return fut
+
+    async def read(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self._submit(False, fn, args))
+
+    async def write(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self._submit(True, fn, args))
+
+    # ---- DB thread ----
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, isolation_level=None, cached_statements=self.cached_statements
+        )
+        conn.execute("PRAGMA journal_mode = WAL;")
+        # WAL: durable at checkpoints, never corrupt
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        # other processes (visuals, exports) may hold locks
+        conn.execute("PRAGMA busy_timeout = 5000;")
+        return conn
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except BaseException as ex:
+            self._error = ex
+            self._ready.set()
+            return
+        self._ready.set()
+        stop = False
+        while not stop:
+            jobs = [self._q.get()]
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in jobs:
+                stop = True
+                jobs = [j for j in jobs if j is not _STOP]
+            writes = [j for j in jobs if j[0]]
+            if writes:
+                self._commit(conn, writes)
+            # reads after the commit, so they see every write queued before them
+            for write, fn, args, fut in jobs:
+                if write or not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    fut.set_result(fn(conn, *args))
+                except BaseException as ex:
+                    fut.set_exception(ex)
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, writes):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            for _, fn, args, fut in writes:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT job;")
+                try:
+                    results.append((fut, fn(conn, *args), None))
+                    conn.execute("RELEASE job;")
+                except Exception as ex:
+                    conn.execute("ROLLBACK TO job;")
+                    conn.execute("RELEASE job;")
+                    results.append((fut, None, ex))
+            conn.execute("COMMIT;")
+        except Exception as ex:
+            logger.error("Group commit of %d writes failed: %s", len(writes), ex)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            for _, _, _, fut in writes:
+                if fut.running():
+                    fut.set_exception(ex)
+            return
+        self.commits += 1
+        self.writes += len(results)
+        for fut, res, ex in results:
+            if ex is None:
+                fut.set_result(res)
+            else:
+                fut.set_exception(ex)
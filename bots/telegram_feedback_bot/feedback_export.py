@@ -0,0 +1,138 @@
+import csv
+import gzip
+import io
+import os
+import pathlib
+import sqlite3
+import tempfile
+from datetime import datetime
+
+try:
+    import pyarrow as pa  # optional: Parquet output
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Streaming export of the feedback table. Rows come from a fetchmany cursor on a separate
+# read-only connection (WAL: the bot keeps writing meanwhile) and go straight into a spooled
+# temporary file, in memory while small and on disk beyond SPOOL_MAX, so memory use is one
+# batch whatever the table size. Run it in a worker thread (asyncio.to_thread), not the loop.
+
+COLUMNS = [
+    "id",
+    "user_id",
+    "username",
+    "rating",
+    "comment",
+    "created_at",
+    "created_ts",
+    "palette",
+]
+FORMATS = ("csv", "csv.gz", "parquet")
+BATCH = 1000
+SPOOL_MAX = 8 * 1024 * 1024
+
+
+def _query(since_ts: int | None, until_ts: int | None, after_id: int | None):
+    where, args = [], []
+    if after_id is not None:
+        where.append("id > ?")
+        args.append(after_id)
+    if since_ts is not None:
+        where.append("created_ts >= ?")
+        args.append(since_ts)
+    if until_ts is not None:
+        where.append("created_ts < ?")
+        args.append(until_ts)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM feedback"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY id ASC;", args
+
+
+def _write_csv(cur, out, compress: bool) -> tuple[int, int]:
+    raw = gzip.GzipFile(fileobj=out, mode="wb", mtime=0) if compress else out
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(COLUMNS)
+    n, last_id = 0, 0
+    while True:
+        rows = cur.fetchmany(BATCH)
+        if not rows:
+            break
+        writer.writerows(rows)
+        n += len(rows)
+        last_id = rows[-1][0]
+    text.flush()
+    text.detach()  # leave `out` open
+    if compress:
+        raw.close()  # writes the gzip trailer; GzipFile doesn't close fileobj
+    return n, last_id
+
+
+def _write_parquet(cur, out) -> tuple[int, int]:
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("username", pa.string()),
+            ("rating", pa.int8()),
+            ("comment", pa.string()),
+            ("created_at", pa.string()),
+            ("created_ts", pa.int64()),
+            ("palette", pa.string()),
+        ]
+    )
+    n, last_id = 0, 0
+    with pq.ParquetWriter(out, schema, compression="zstd") as writer:
+        while True:
+            rows = cur.fetchmany(BATCH)
+            if not rows:
+                break
+            cols = list(zip(*rows))
+            # one row group per batch
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [pa.array(c, type=f.type) for c, f in zip(cols, schema)],
+                    schema=schema,
+                )
+            )
+            n += len(rows)
+            last_id = rows[-1][0]
+    return n, last_id
+
+
+def export_feedback(
+    db_path: str,
+    fmt: str = "csv",
+    since_ts: int | None = None,
+    until_ts: int | None = None,
+    after_id: int | None = None,
+):
+    """
+    Returns (file rewound to 0, filename, rows, last id). created_ts bounds are epoch seconds
+    [since_ts, until_ts); after_id exports only rows added after a previous export.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    uri = pathlib.Path(os.path.abspath(db_path)).as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    # returned to the caller, who closes it
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX, mode="w+b")  # noqa: SIM115
+    try:
+        sql, args = _query(since_ts, until_ts, after_id)
+        cur = conn.execute(sql, args)
+        if fmt == "parquet":
+            n, last_id = _write_parquet(cur, out)
+        else:
+            n, last_id = _write_csv(cur, out, compress=fmt == "csv.gz")
+    except BaseException:
+        out.close()
+        raise
+    finally:
+        conn.close()
+    out.seek(0)
+    name = f"feedback_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return out, name, n, last_id
@@ -0,0 +1,50 @@
+import asyncio
+from collections.abc import Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Concurrent updates without racing the conversation: updates of one user run one at a time
+# and in arrival order, so the ConversationHandler state and RatingBuffer.pending see
+# /rate -> tap -> comment in sequence; different users still run in parallel, up to
+# max_concurrent_updates (waiting updates hold a slot, the per-user rate limit keeps that small).
+
+
+def _key(update: object) -> int | None:
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return update.effective_chat.id if update.effective_chat is not None else None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    __slots__ = ("_locks",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # user/chat id -> [lock, updates holding or waiting for it]
+        self._locks: dict[int, list] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        key = _key(update)
+        if key is None:
+            await coroutine
+            return
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:  # asyncio.Lock wakes waiters first come, first served
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
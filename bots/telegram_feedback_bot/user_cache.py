@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+
+# Per-user state kept in memory by the bot, both bounded LRU and used only from the event loop.
+#   UserCache    profile last written to `users` (skip upserts that change nothing) and the
+#                user's recent ratings for /myratings (dropped when the user's ratings are written)
+#   TokenBucket  per-user request budget, so button-mashing can't turn into DB work
+
+Profile = tuple[str | None, str | None, str | None]  # username, first_name, last_name
+
+
+class UserCache:
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        # user_id -> [profile, (limit, rows)]
+        self._d: OrderedDict[int, list] = OrderedDict()
+        self.gen = 0  # bumped on every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, user_id: int, create: bool = False) -> list | None:
+        e = self._d.get(user_id)
+        if e is not None:
+            self._d.move_to_end(user_id)
+        elif create:
+            e = self._d[user_id] = [None, None]
+            if len(self._d) > self.max_users:
+                self._d.popitem(last=False)
+        return e
+
+    def profile_changed(self, user_id: int, profile: Profile) -> bool:
+        e = self._entry(user_id)
+        return e is None or e[0] != profile
+
+    def remember_profile(self, user_id: int, profile: Profile):
+        self._entry(user_id, create=True)[0] = profile
+
+    def recent(self, user_id: int, limit: int) -> list[tuple] | None:
+        e = self._entry(user_id)
+        if e is not None and e[1] is not None and e[1][0] == limit:
+            self.hits += 1
+            return e[1][1]
+        self.misses += 1
+        return None
+
+    def remember_recent(self, user_id: int, limit: int, rows: list[tuple], gen: int):
+        """`gen`: self.gen when the read was issued; a write landing meanwhile makes rows stale."""
+        if gen == self.gen:
+            self._entry(user_id, create=True)[1] = (limit, rows)
+
+    def invalidate_recent(self, user_id: int):
+        self.gen += 1
+        e = self._d.get(user_id)
+        if e is not None:
+            e[1] = None
+
+
+class TokenBucket:
+    """`rate` requests per second per user, bursts up to `burst`."""
+
+    def __init__(self, rate: float = 1.0, burst: int = 5, max_users: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        # user_id -> (tokens, at)
+        self._b: OrderedDict[int, tuple[float, float]] = OrderedDict()
+        self.limited = 0
+
+    def allow(self, user_id: int, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        tokens, at = self._b.pop(user_id, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - at) * self.rate)
+        ok = tokens >= 1.0
+        self._b[user_id] = (tokens - 1.0 if ok else tokens, now)
+        if len(self._b) > self.max_users:
+            # least recently seen: a fresh bucket is full anyway
+            self._b.popitem(last=False)
+        if not ok:
+            self.limited += 1
+        return ok
@@ -0,0 +1,139 @@
+# Compact binary telemetry frames (alternative to the JSON payload).
+#
+# Frame layout, little-endian, version 1:
+#     header   "SA" | version u8 | flags u8 | count u16 | id_len u8 | device_id (id_len bytes, utf-8)
+#     sample   ts_ms i64 | temp i16 (centi-degC) | hum u16 (centi-%) | light u16 | motion u8   x count
+#
+# 15 bytes per sample instead of ~90 bytes of JSON, and one frame can carry many samples.
+# Negotiated by MQTT topic suffix (TOPIC_SUFFIX) or HTTP Content-Type (CONTENT_TYPE).
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the bulk column decoder
+    np = None
+
+MAGIC = b"SA"
+VERSION = 1
+TOPIC_SUFFIX = "/bin"
+CONTENT_TYPE = "application/x-smartart-telemetry"
+
+HEADER = struct.Struct("<2sBBHB")
+SAMPLE = struct.Struct("<qhHHB")
+MAX_SAMPLES = 0xFFFF
+
+if np is not None:
+    SAMPLE_DTYPE = np.dtype(
+        [
+            ("ts_ms", "<i8"),
+            ("temp", "<i2"),
+            ("hum", "<u2"),
+            ("light", "<u2"),
+            ("motion", "u1"),
+        ]
+    )
+    assert SAMPLE_DTYPE.itemsize == SAMPLE.size
+
+
+def is_binary_topic(topic: str) -> bool:
+    return topic.endswith(TOPIC_SUFFIX)
+
+
+def is_binary_content_type(content_type: str) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in (
+        CONTENT_TYPE,
+        "application/octet-stream",
+    )
+
+
+def looks_binary(buf: bytes) -> bool:
+    return buf[:2] == MAGIC
+
+
+# ================= ENCODE =================
+def encode_frame(device_id: str, samples: list[dict]) -> bytes:
+    """samples: dicts with temp, hum, light, motion and optional ts_ms (0 = no timestamp)."""
+    if len(samples) > MAX_SAMPLES:
+        raise ValueError(f"at most {MAX_SAMPLES} samples per frame")
+    dev = device_id.encode("utf-8")
+    if len(dev) > 255:
+        raise ValueError("device_id longer than 255 bytes")
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(samples), len(dev)), dev]
+    for s in samples:
+        parts.append(
+            SAMPLE.pack(
+                int(s.get("ts_ms") or 0),
+                round(float(s["temp"]) * 100),
+                round(float(s["hum"]) * 100),
+                int(s["light"]),
+                int(s["motion"]),
+            )
+        )
+    return b"".join(parts)
+
+
+# ================= DECODE =================
+def _header(buf: bytes) -> tuple[str, int, int]:
+    if len(buf) < HEADER.size:
+        raise ValueError("frame shorter than header")
+    magic, version, _flags, count, id_len = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError("bad frame magic")
+    if version != VERSION:
+        raise ValueError(f"unsupported frame version {version}")
+    off = HEADER.size + id_len
+    if len(buf) != off + count * SAMPLE.size:
+        raise ValueError(f"frame length {len(buf)} does not match {count} samples")
+    return buf[HEADER.size : off].decode("utf-8"), count, off
+
+
+def frame_device(buf: bytes) -> str:
+    """device_id from the header only (routing a frame without unpacking its samples)."""
+    return _header(buf)[0]
+
+
+def decode_frame(buf: bytes) -> list[dict]:
+    """Frame -> list of sample dicts shaped like the JSON payload (device_id, ts_ms, temp, hum, light, motion)."""
+    # _header raises when the count disagrees with the length
+    device, _, off = _header(buf)
+    out = []
+    for ts_ms, temp, hum, light, motion in SAMPLE.iter_unpack(memoryview(buf)[off:]):
+        rec = {
+            "device_id": device,
+            "temp": temp / 100.0,
+            "hum": hum / 100.0,
+            "light": light,
+            "motion": motion,
+        }
+        if ts_ms:
+            rec["ts_ms"] = ts_ms
+        out.append(rec)
+    return out
+
+
+def decode_last(buf: bytes) -> dict:
+    """Only the newest sample of a frame (what a display needs)."""
+    device, count, off = _header(buf)
+    if not count:
+        return {}
+    ts_ms, temp, hum, light, motion = SAMPLE.unpack_from(
+        buf, off + (count - 1) * SAMPLE.size
+    )
+    rec = {
+        "device_id": device,
+        "temp": temp / 100.0,
+        "hum": hum / 100.0,
+        "light": light,
+        "motion": motion,
+    }
+    if ts_ms:
+        rec["ts_ms"] = ts_ms
+    return rec
+
+
+def decode_frame_columns(buf: bytes):
+    """Frame -> (device_id, NumPy structured array view over the samples); no per-sample Python work."""
+    if np is None:
+        raise RuntimeError("numpy is required for column decoding")
+    device, count, off = _header(buf)
+    return device, np.frombuffer(buf, dtype=SAMPLE_DTYPE, count=count, offset=off)
@@ -43,6 +43,11 @@ CommMode commMode = MODE_MQTT;  // default
 
 // HTTP endpoint
 const char* http_url = "http://10.21.127.203:8080/ingest";   //HTTP endpoint
+const char* http_bulk_url = "http://10.21.127.203:8080/ingest/bulk";   // batched samples (JSON array)
+#define HTTP_BATCH_N 10   // samples per bulk POST (1 = old one-request-per-sample behaviour)
+String httpBatch[HTTP_BATCH_N];
+int httpBatchLen = 0;
+HTTPClient httpBulk;      // kept open between posts (keep-alive)
 
 // Runtime config
 unsigned long sampleDelayMs = 2000; //time between complete sensor scans
@@ -82,6 +87,30 @@ bool sendViaHTTP(const String& json) {
   return (code >= 200 && code < 300);
 }
 
+// Buffer samples and POST them as one JSON array; on failure the batch is kept and retried
+// with the next sample (oldest entry dropped once the buffer is full).
+bool sendViaHTTPBatched(const String& json) {
+  if (HTTP_BATCH_N <= 1) return sendViaHTTP(json);
+  if (httpBatchLen == HTTP_BATCH_N) {
+    for (int i = 1; i < HTTP_BATCH_N; i++) httpBatch[i-1] = httpBatch[i];
+    httpBatchLen--;
+  }
+  httpBatch[httpBatchLen++] = json;
+  if (httpBatchLen < HTTP_BATCH_N) return true;
+
+  String body = "[";
+  for (int i = 0; i < httpBatchLen; i++) { if (i) body += ","; body += httpBatch[i]; }
+  body += "]";
+  httpBulk.setReuse(true);
+  if (!httpBulk.connected()) httpBulk.begin(http_bulk_url);
+  httpBulk.addHeader("Content-Type", "application/json");
+  int code = httpBulk.POST((uint8_t*)body.c_str(), body.length());
+  bool ok = (code >= 200 && code < 300);
+  if (ok) httpBatchLen = 0;
+  else httpBulk.end();   // drop the connection, reopen on the next attempt
+  return ok;
+}
+
 
 // message handler
 void onCmd(char* topic, byte* payload, unsigned int length) {
@@ -204,7 +233,7 @@ void loop() {
   bool ok = false;
   switch (commMode) {
     case MODE_MQTT: ok = sendViaMQTT(payload); break;
-    case MODE_HTTP: ok = sendViaHTTP(payload); break;
+    case MODE_HTTP: ok = sendViaHTTPBatched(payload); break;
   }
   Serial.println(ok ? "Telemetry sent" : "Telemetry send failed");
 }
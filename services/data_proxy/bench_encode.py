@@ -0,0 +1,85 @@
+import argparse
+import random
+import time
+
+import columnar
+from influxdb_client import Point, WritePrecision
+from ingest import to_line
+
+# Microbenchmark: per-sample Point objects (the old write_measurement) vs per-record
+# to_line vs the NumPy columnar encoder, on the same synthetic batch.
+#   python bench_encode.py --sizes 1000 10000 100000
+
+
+def make_samples(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    base = 1_700_000_000_000
+    return [
+        {
+            "device_id": f"esp32-smartart-{rnd.randint(1, 300):03d}",
+            "ts_ms": base + i * 10 if i % 2 else rnd.randint(0, 10_000_000),
+            "temp": round(rnd.uniform(15, 35), 1),
+            "hum": round(rnd.uniform(20, 90), 1),
+            "light": rnd.randint(0, 4095),
+            "motion": rnd.randint(0, 1),
+        }
+        for i in range(n)
+    ]
+
+
+def point_path(samples):
+    out = []
+    for s in samples:
+        p = (
+            Point("smartart")
+            .tag("device_id", str(s["device_id"]))
+            .field("temp", float(s["temp"]))
+            .field("hum", float(s["hum"]))
+            .field("light", int(s["light"]))
+            .field("motion", int(s["motion"]))
+        )
+        ts = int(s["ts_ms"])
+        if ts >= 1_600_000_000_000:
+            p = p.time(ts * 1_000_000, write_precision=WritePrecision.NS)
+        out.append(p.to_line_protocol())
+    return out
+
+
+def line_path(samples):
+    return [to_line(s) for s in samples]
+
+
+def columnar_path(samples):
+    return columnar.encode_records_columnar(samples)[0]
+
+
+def bench(fn, samples, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(samples)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    print(f"{'n':>8} {'path':>10} {'best s':>9} {'us/sample':>10} {'speedup':>8}")
+    for n in args.sizes:
+        samples = make_samples(n)
+        base = None
+        for name, fn in (
+            ("point", point_path),
+            ("to_line", line_path),
+            ("columnar", columnar_path),
+        ):
+            t = bench(fn, samples, args.repeat)
+            base = base or t
+            print(f"{n:>8} {name:>10} {t:>9.4f} {t / n * 1e6:>10.2f} {base / t:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
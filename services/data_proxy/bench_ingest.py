@@ -0,0 +1,361 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+from standins import FakeBroker, FakeInflux
+
+# End-to-end ingest benchmark: a simulated ESP32 fleet publishes over MQTT and/or POSTs to
+# /ingest, a proxy (data_proxy.py or data_proxy_async.py) runs as a subprocess pointed at a
+# local FakeBroker + FakeInflux, and we report samples/s, p50/p99 ingest-to-write latency and
+# proxy CPU per sample. Nothing leaves the machine.
+#   python bench_ingest.py --proxy threaded --transport both --devices 300 --rate 1 --duration 20
+#   python bench_ingest.py --proxy async --transport mqtt --rate 0      # rate 0 = as fast as possible
+#   python bench_ingest.py --proxy supervisor --workers 4 --shard shared # MQTT v5 $share subscriptions
+# Samples carry the send time as an epoch ts_ms, so latency = Influx arrival - send (ms resolution).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROXIES = {
+    "threaded": "data_proxy.py",
+    "async": "data_proxy_async.py",
+    "supervisor": "supervisor.py",
+}
+TOPIC = "smartart/sensordata"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_cpu_s(pid: int):
+    # utime + stime of the proxy process and its children (supervisor workers), Linux /proc; None elsewhere
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(c) for c in f.read().split()]
+    except (OSError, ValueError, IndexError):
+        return None
+    return cpu + sum(_proc_cpu_s(c) or 0.0 for c in children)
+
+
+def _sample(device: str, rnd: random.Random) -> dict:
+    return {
+        "device_id": device,
+        "ts_ms": time.time_ns() // 1_000_000,
+        "temp": round(rnd.uniform(18, 30), 1),
+        "hum": round(rnd.uniform(30, 70), 1),
+        "light": rnd.randint(0, 4095),
+        "motion": int(rnd.random() < 0.1),
+    }
+
+
+def _percentile(vals, p: float) -> float:
+    if not vals:
+        return float("nan")
+    s = sorted(vals)
+    return s[min(len(s) - 1, round(p / 100.0 * (len(s) - 1)))]
+
+
+# ================= FLEET =================
+class Fleet:
+    """Devices split over `threads` connections; each device sends `rate` samples/s (0 = flat out)."""
+
+    def __init__(
+        self,
+        transport: str,
+        devices: int,
+        rate: float,
+        threads: int,
+        bulk: int,
+        broker_port: int,
+        http_port: int,
+    ):
+        self.transport, self.rate, self.bulk = transport, rate, max(1, bulk)
+        self.broker_port, self.http_port = broker_port, http_port
+        ids = [f"esp32-sim-{i:04d}" for i in range(devices)]
+        n = max(1, min(threads, devices))
+        self.groups = [ids[i::n] for i in range(n)]
+        self.sent = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def run(self, duration: float):
+        stop_at = time.monotonic() + duration
+        ts = [
+            threading.Thread(target=self._worker, args=(g, stop_at, i), daemon=True)
+            for i, g in enumerate(self.groups)
+        ]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+
+    def _worker(self, devices, stop_at: float, seed: int):
+        rnd = random.Random(seed)
+        send = self._mqtt_sender() if self.transport == "mqtt" else self._http_sender()
+        period = 1.0 / (self.rate * len(devices)) if self.rate > 0 else 0.0
+        nxt, i, sent, errors, pending = time.monotonic(), 0, 0, 0, []
+        while time.monotonic() < stop_at:
+            pending.append(_sample(devices[i % len(devices)], rnd))
+            i += 1
+            if len(pending) >= self.bulk:
+                try:
+                    send(pending)
+                    sent += len(pending)
+                except Exception:
+                    errors += len(pending)
+                pending = []
+            if period:
+                nxt += period
+                delay = nxt - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        with self._lock:
+            self.sent += sent
+            self.errors += errors
+
+    def _mqtt_sender(self):
+        c = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        c.connect("127.0.0.1", self.broker_port, 30)
+        c.loop_start()
+
+        def send(samples):
+            for s in samples:
+                c.publish(TOPIC, json.dumps(s))
+
+        return send
+
+    def _http_sender(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.http_port, timeout=30)
+
+        def send(samples):
+            if len(samples) == 1:
+                path, body = "/ingest", json.dumps(samples[0])
+            else:
+                path, body = "/ingest/bulk", json.dumps(samples)
+            conn.request(
+                "POST", path, body=body, headers={"Content-Type": "application/json"}
+            )
+            r = conn.getresponse()
+            r.read()
+            if r.status >= 300:
+                raise RuntimeError(f"HTTP {r.status}")
+
+        return send
+
+
+# ================= HARNESS =================
+def start_proxy(
+    kind: str,
+    influx: FakeInflux,
+    broker: FakeBroker,
+    http_port: int,
+    spool: bool,
+    spool_dir: str,
+    workers: int = 2,
+    shard: str = "shared",
+):
+    env = dict(
+        os.environ,
+        MQTT_HOST="127.0.0.1",
+        MQTT_PORT=str(broker.port),
+        INFLUX_URL=influx.url,
+        INFLUX_TOKEN="bench",
+        HTTP_PORT=str(http_port),
+        SPOOL_ENABLED="1" if spool else "0",
+        SPOOL_DIR=os.path.join(spool_dir, "spool"),
+        SPILL_DIR=os.path.join(spool_dir, "spill"),
+        WORKERS=str(workers),
+        SHARD_MODE=shard,
+        SUPERVISOR_PORT=str(_free_port()),
+        PYTHONUNBUFFERED="1",
+    )
+    # the supervisor is up once every worker has subscribed
+    subscribers = workers if kind == "supervisor" else 1
+    proc = subprocess.Popen(
+        [sys.executable, PROXIES[kind]],
+        cwd=HERE,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"proxy exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", http_port), timeout=0.5):
+                pass
+            if (
+                len(broker._subs)
+                + max((len(m) for m in broker._shared.values()), default=0)
+                >= subscribers
+            ):
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("proxy did not come up")
+
+
+def run_transport(
+    args, transport: str, proc, influx: FakeInflux, broker: FakeBroker, http_port: int
+) -> dict:
+    influx.reset()
+    fleet = Fleet(
+        transport,
+        args.devices,
+        args.rate,
+        args.threads,
+        args.bulk if transport == "http" else 1,
+        broker.port,
+        http_port,
+    )
+    cpu0, t0 = _proc_cpu_s(proc.pid), time.perf_counter()
+    fleet.run(args.duration)
+    sent_at = time.perf_counter()
+    deadline = sent_at + args.drain_timeout
+    while influx.lines < fleet.sent and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    t1, cpu1 = time.perf_counter(), _proc_cpu_s(proc.pid)
+    lat = list(influx.latencies_ms)
+    written = influx.lines
+    cpu_us = (
+        (cpu1 - cpu0) / written * 1e6
+        if cpu0 is not None and cpu1 is not None and written
+        else None
+    )
+    return {
+        "transport": transport,
+        "sent": fleet.sent,
+        "send_errors": fleet.errors,
+        "written": written,
+        "influx_requests": influx.requests,
+        "send_rate": fleet.sent / (sent_at - t0),
+        "write_rate": written / (t1 - t0),
+        "p50_ms": _percentile(lat, 50),
+        "p99_ms": _percentile(lat, 99),
+        "cpu_us_per_sample": cpu_us,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--proxy", choices=sorted(PROXIES), default="threaded")
+    ap.add_argument("--transport", choices=("mqtt", "http", "both"), default="both")
+    ap.add_argument("--devices", type=int, default=300)
+    ap.add_argument(
+        "--rate",
+        type=float,
+        default=1.0,
+        help="samples/s per device, 0 = as fast as possible",
+    )
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--threads", type=int, default=8, help="publisher connections")
+    ap.add_argument(
+        "--bulk",
+        type=int,
+        default=1,
+        help="HTTP: samples per POST (>1 uses /ingest/bulk)",
+    )
+    ap.add_argument(
+        "--influx-delay",
+        type=float,
+        default=0.0,
+        help="simulated Influx round-trip (s)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="--proxy supervisor: ingest worker processes",
+    )
+    ap.add_argument(
+        "--shard",
+        choices=("shared", "hash"),
+        default="shared",
+        help="--proxy supervisor: $share subscriptions (MQTT v5) or crc32(device_id) sharding",
+    )
+    ap.add_argument(
+        "--no-spool",
+        action="store_true",
+        help="use the in-memory batch writer instead of the spool",
+    )
+    ap.add_argument("--drain-timeout", type=float, default=15.0)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    influx = FakeInflux(delay_s=args.influx_delay).start()
+    broker = FakeBroker().start()
+    http_port = _free_port()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = start_proxy(
+            args.proxy,
+            influx,
+            broker,
+            http_port,
+            not args.no_spool,
+            tmp,
+            args.workers,
+            args.shard,
+        )
+        try:
+            for transport in (
+                ("mqtt", "http") if args.transport == "both" else (args.transport,)
+            ):
+                results.append(
+                    run_transport(args, transport, proc, influx, broker, http_port)
+                )
+        finally:
+            proc.send_signal(signal.SIGINT)
+            try:
+                proc.wait(15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            influx.stop()
+            broker.stop()
+
+    if args.json:
+        print(
+            json.dumps(
+                {"proxy": args.proxy, "spool": not args.no_spool, "results": results},
+                indent=2,
+            )
+        )
+        return
+    print(
+        f"proxy={args.proxy} spool={not args.no_spool} devices={args.devices} rate={args.rate}/s "
+        f"duration={args.duration}s influx_delay={args.influx_delay}s"
+    )
+    print(
+        f"{'path':>6} {'sent':>8} {'written':>8} {'send/s':>9} {'write/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'cpu us/sample':>14}"
+    )
+    for r in results:
+        cpu = (
+            f"{r['cpu_us_per_sample']:.1f}"
+            if r["cpu_us_per_sample"] is not None
+            else "n/a"
+        )
+        print(
+            f"{r['transport']:>6} {r['sent']:>8} {r['written']:>8} {r['send_rate']:>9.0f} {r['write_rate']:>9.0f} "
+            f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {cpu:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+from config import codec
+from influx_writer import _escape_tag
+
+# Columnar encoding for batches (bulk HTTP bodies, binary frames): samples become NumPy
+# columns, validation / coercion / timestamp classification run once per column, and line
+# protocol is emitted in a single pass. Produces the same lines as ingest.to_line.
+
+MEASUREMENT = "smartart"
+EPOCH_MS_MIN = (
+    1_600_000_000_000  # same threshold as to_line: below this ts_ms is uptime
+)
+COLUMNAR_MIN_BATCH = 64  # smaller batches are cheaper on the per-record path
+
+
+def _num(v):
+    # float column value; anything missing or non-numeric becomes NaN and is rejected by the mask
+    if type(v) is float or type(v) is int:
+        return v
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _ts(v):
+    # like to_line: only numeric ts_ms counts, anything else means "no timestamp"
+    return v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+
+
+def encode_columns(
+    devices, ts_ms, temp, hum, light, motion, now_ns: int | None = None, clock=None
+) -> tuple[list[str], np.ndarray]:
+    """
+    Column arrays -> (lines for the valid rows, boolean mask of rejected rows).
+    `ts_ms` may hold NaN / 0 where the sample has no timestamp; uptime values are mapped
+    through `clock` (dedup.UptimeClock) when given, like to_line does.
+    """
+    temp = np.asarray(temp, dtype=np.float64)
+    hum = np.asarray(hum, dtype=np.float64)
+    light = np.asarray(light, dtype=np.float64)
+    motion = np.asarray(motion, dtype=np.float64)
+    ts = np.asarray(ts_ms, dtype=np.float64)
+    bad = ~(
+        np.isfinite(temp) & np.isfinite(hum) & np.isfinite(light) & np.isfinite(motion)
+    )
+
+    # epoch-vs-uptime for the whole batch; int64 math so ms -> ns keeps full precision
+    epoch = np.nan_to_num(ts, nan=0.0) >= EPOCH_MS_MIN
+    now_ns = time.time_ns() if now_ns is None else now_ns
+    ts_ns = np.where(
+        epoch, np.where(epoch, ts, 0).astype(np.int64) * 1_000_000, np.int64(now_ns)
+    )
+
+    good = np.flatnonzero(~bad)
+    tags = {d: f"{MEASUREMENT},device_id={_escape_tag(d)} " for d in set(devices)}
+    dev = devices if isinstance(devices, list) else list(devices)
+    if clock is not None:
+        # to_line truncates ts_ms to int before mapping; same here, one offset lookup per device
+        uptime = ~epoch & (np.nan_to_num(ts, nan=0.0) >= 1) & ~bad
+        if uptime.any():
+            up_ms = np.where(uptime, ts, 0).astype(np.int64)
+            rows = np.flatnonzero(uptime)
+            if len(tags) == 1:
+                groups = {dev[rows[0]]: rows}
+            else:
+                groups = {}
+                for i in rows.tolist():
+                    groups.setdefault(dev[i], []).append(i)
+            now_ms = now_ns // 1_000_000
+            for d, idx in groups.items():
+                idx = np.asarray(idx)
+                off = clock.offset(d, int(up_ms[idx].max()), now_ms)
+                ts_ns[idx] = (up_ms[idx] + off) * 1_000_000
+    lines = [
+        f"{tags[dev[i]]}temp={t!r},hum={h!r},light={l}i,motion={m}i {n}"
+        for i, t, h, l, m, n in zip(
+            good.tolist(),
+            temp[good].tolist(),
+            hum[good].tolist(),
+            np.trunc(light[good]).astype(np.int64).tolist(),
+            np.trunc(motion[good]).astype(np.int64).tolist(),
+            ts_ns[good].tolist(),
+        )
+    ]
+    return lines, bad
+
+
+def _column(records: list, key: str, conv) -> np.ndarray:
+    vals = [r.get(key) for r in records]
+    try:
+        return np.array(vals, dtype=np.float64)  # None -> NaN, numeric strings parse
+    except (TypeError, ValueError):
+        return np.array([conv(v) for v in vals], dtype=np.float64)
+
+
+def encode_records_columnar(records: list, clock=None):
+    """Same contract as ingest.encode_records: (lines, [{"index": i, "error": msg}, ...])."""
+    errors = []
+    if not all(type(r) is dict for r in records):
+        for i, rec in enumerate(records):
+            if isinstance(rec, Exception):
+                errors.append({"index": i, "error": str(rec)})
+            elif not isinstance(rec, dict):
+                errors.append({"index": i, "error": "sample must be a JSON object"})
+        records = [r if isinstance(r, dict) else {} for r in records]
+
+    devices = [str(r.get("device_id", "unknown")) for r in records]
+    ts = [_ts(r.get("ts_ms")) for r in records]
+    lines, bad = encode_columns(
+        devices,
+        ts,
+        *(_column(records, k, _num) for k in ("temp", "hum", "light", "motion")),
+        clock=clock,
+    )
+
+    seen = {e["index"] for e in errors}
+    for i in np.flatnonzero(bad).tolist():
+        if i not in seen:
+            rec = records[i]
+            missing = [k for k in ("temp", "hum", "light", "motion") if k not in rec]
+            errors.append(
+                {
+                    "index": i,
+                    "error": (
+                        f"missing {missing[0]}"
+                        if missing
+                        else "non-numeric or non-finite field"
+                    ),
+                }
+            )
+    errors.sort(key=lambda e: e["index"])
+    return lines, errors
+
+
+def encode_frame_columnar(frame: bytes, clock=None) -> list[str]:
+    """Binary telemetry frame -> lines, straight from the NumPy view of the frame (no dicts)."""
+    device, s = codec.decode_frame_columns(frame)
+    ts = s["ts_ms"].astype(np.float64)
+    ts[ts == 0] = np.nan
+    lines, _ = encode_columns(
+        [device] * len(s),
+        ts,
+        s["temp"] / 100.0,
+        s["hum"] / 100.0,
+        s["light"],
+        s["motion"],
+        clock=clock,
+    )
+    return lines
@@ -0,0 +1,89 @@
+import os
+import sys
+
+# shared helpers (binary telemetry codec) live in <repo>/common
+COMMON_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common")
+)
+if COMMON_DIR not in sys.path:
+    sys.path.insert(0, COMMON_DIR)
+import telemetry_codec as codec
+
+
+# Values below are defaults; the names in .env.example override them from the environment
+# (used by bench_ingest.py to point a proxy at local stand-ins).
+def _env(name: str, default, cast=str):
+    v = os.getenv(name)
+    return default if v in (None, "") else cast(v)
+
+
+def _flag(v: str) -> bool:
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+
+MQTT_HOST = _env("MQTT_HOST", "10.82.74.203")
+MQTT_PORT = _env("MQTT_PORT", 1883, int)
+
+INFLUX_URL = _env("INFLUX_URL", "https://us-east-1-1.aws.cloud2.influxdata.com")
+INFLUX_ORG = _env("INFLUX_ORG", _env("ORG", "UNIBO"))
+INFLUX_BUCKET = _env("INFLUX_BUCKET", "ArtWall")
+INFLUX_TOKEN = _env(
+    "INFLUX_TOKEN",
+    "w2UKi_6EcvG_E0o55JkWiFFWXsfZlIMWE-2VHB04GyWZ3UVq1GQ7QKORpvyErWjgnFfH1L2bb-Q3lPNQe_e2CA==",
+)
+
+HTTP_HOST = "0.0.0.0"
+HTTP_PORT = _env("HTTP_PORT", 8080, int)
+
+TOPIC_DATA = "smartart/sensordata"
+# binary frames (common/telemetry_codec.py)
+TOPIC_DATA_BIN = TOPIC_DATA + codec.TOPIC_SUFFIX
+TOPIC_RATE = "smartart/cmd/sampling_rate"
+TOPIC_MOTION = "smartart/cmd/motion_alert"
+
+# ---- Batched writes ----
+BATCH_SIZE = 500  # lines per Influx write
+FLUSH_INTERVAL_S = 1.0  # max time a sample waits before it is flushed
+QUEUE_MAX = 20000  # bounded queue between ingest and the flusher
+BACKPRESSURE = "block"  # block | drop_oldest | spill
+PUT_TIMEOUT_S = 2.0  # "block": how long a producer waits for room before dropping
+BULK_MAX_BYTES = 16 << 20  # cap on a (decompressed) /ingest/bulk body
+SPILL_DIR = _env("SPILL_DIR", "spill")  # "spill": overflow goes to a Spool here
+
+# ---- Write-ahead spool ----
+# accepted samples go to disk first, a replay worker drains to Influx
+SPOOL_ENABLED = _env("SPOOL_ENABLED", True, _flag)
+SPOOL_DIR = _env("SPOOL_DIR", "spool")
+SPOOL_SEGMENT_BYTES = 8 << 20  # rotate segments at 8 MiB
+SPOOL_MAX_BYTES = 512 << 20  # disk budget; oldest segments are dropped beyond this
+SPOOL_FSYNC = False  # fsync every append (safer on power loss, slower on SD cards)
+REPLAY_BATCH = 5000  # lines per Influx write when draining the spool
+
+# ---- asyncio mode (data_proxy_async.py) ----
+INFLUX_POOL_SIZE = 8  # pooled keep-alive HTTPS connections to Influx
+SHUTDOWN_DRAIN_S = 10.0  # how long shutdown may spend flushing in-flight batches
+
+# ---- supervisor mode (supervisor.py) ----
+WORKERS = _env("WORKERS", 0, int)  # ingest worker processes (0 = one per CPU core)
+# shared: MQTT v5 $share/<group>/ subscriptions | hash: crc32(device_id) % WORKERS
+SHARD_MODE = _env("SHARD_MODE", "shared")
+SHARE_GROUP = "smartart-ingest"
+# aggregated /stats and /health of all workers
+SUPERVISOR_PORT = _env("SUPERVISOR_PORT", 8081, int)
+STATS_INTERVAL_S = 5.0  # how often workers report to the supervisor
+
+# ---- observability ----
+LOG_INTERVAL_S = 5.0  # hot-path log lines (per-sample ingest, write errors) print at most this often per kind
+
+# ---- ordering / dedup (dedup.py) ----
+UPTIME_TO_WALL = (
+    True  # map ESP32 millis() timestamps to wall clock via a per-device offset
+)
+CLOCK_MAX_LAG_MS = 10_000  # re-anchor a device whose newest sample maps further than this into the past (reboot)
+DEDUP_KEYS = (
+    100_000  # recently written lines remembered to drop exact re-sends (0 = off)
+)
+REORDER_WINDOW_S = (
+    0.5  # hold lines this long and release them in timestamp order (0 = off)
+)
+REORDER_MAX_LINES = 50_000  # past this the oldest held lines are released early
@@ -1,81 +1,195 @@
 
-import json, time, threading
-from flask import Flask, request, jsonify
-from paho.mqtt.client import Client as MqttClient
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
-
-MQTT_HOST   = "10.82.74.203"     
-MQTT_PORT   = 1883
-
-INFLUX_URL  = "https://us-east-1-1.aws.cloud2.influxdata.com"
-INFLUX_ORG  = "UNIBO"
-INFLUX_BUCKET = "ArtWall"
-INFLUX_TOKEN  = "w2UKi_6EcvG_E0o55JkWiFFWXsfZlIMWE-2VHB04GyWZ3UVq1GQ7QKORpvyErWjgnFfH1L2bb-Q3lPNQe_e2CA=="   
+import json
+import threading
+import time
 
-HTTP_HOST   = "0.0.0.0"
-HTTP_PORT   = 8080
+from config import (
+    BACKPRESSURE,
+    BATCH_SIZE,
+    BULK_MAX_BYTES,
+    DEDUP_KEYS,
+    FLUSH_INTERVAL_S,
+    HTTP_HOST,
+    HTTP_PORT,
+    INFLUX_BUCKET,
+    INFLUX_ORG,
+    INFLUX_TOKEN,
+    INFLUX_URL,
+    LOG_INTERVAL_S,
+    MQTT_HOST,
+    MQTT_PORT,
+    PUT_TIMEOUT_S,
+    QUEUE_MAX,
+    REORDER_MAX_LINES,
+    REORDER_WINDOW_S,
+    REPLAY_BATCH,
+    SPILL_DIR,
+    SPOOL_DIR,
+    SPOOL_ENABLED,
+    SPOOL_FSYNC,
+    SPOOL_MAX_BYTES,
+    SPOOL_SEGMENT_BYTES,
+    TOPIC_DATA,
+    TOPIC_DATA_BIN,
+    TOPIC_MOTION,
+    TOPIC_RATE,
+    codec,
+)
+from dedup import Deduper, ReorderBuffer
+from flask import Flask, Response, jsonify, request
+from influx_writer import BatchWriter
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+from ingest import decode_and_encode, encode_records, to_line
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import (
+    DROPPED,
+    DUPLICATES,
+    MQTT_CONNECTS,
+    MQTT_RECONNECTS,
+    QUEUE_DEPTH,
+    REGISTRY,
+    REORDER_HELD,
+    SPOOL_PENDING,
+    TRANSPORTS,
+    RateLimitedLog,
+    timed_sink,
+)
+from paho.mqtt.client import Client as MqttClient
+from spool import Spool, SpoolReplayer
 
-TOPIC_DATA   = "smartart/sensordata"
-TOPIC_RATE   = "smartart/cmd/sampling_rate"
-TOPIC_MOTION = "smartart/cmd/motion_alert"
+log = RateLimitedLog(LOG_INTERVAL_S)
 
 # ==== Influx ====
 influx = InfluxDBClient(url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG, timeout=30000)
 write_api = influx.write_api(write_options=SYNCHRONOUS)
 
+@timed_sink
+def _influx_sink(lines):
+    # one HTTPS round-trip per batch instead of per sample
+    write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=lines, write_precision=WritePrecision.NS)
+
+spool = replayer = writer = None
+if SPOOL_ENABLED:
+    spool = Spool(SPOOL_DIR, segment_bytes=SPOOL_SEGMENT_BYTES, max_bytes=SPOOL_MAX_BYTES, fsync=SPOOL_FSYNC)
+    replayer = SpoolReplayer(spool, _influx_sink, batch_size=REPLAY_BATCH)
+else:
+    writer = BatchWriter(_influx_sink, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL_S,
+                         max_queue=QUEUE_MAX, backpressure=BACKPRESSURE,
+                         spill=Spool(SPILL_DIR) if BACKPRESSURE == "spill" else None,
+                         put_timeout=PUT_TIMEOUT_S)
+
+if spool is not None:
+    SPOOL_PENDING.fn = spool.pending_bytes
+else:
+    QUEUE_DEPTH.fn = lambda: writer.stats()["queue_depth"]
+
+deduper = Deduper(DEDUP_KEYS) if DEDUP_KEYS else None
+reorder = ReorderBuffer(REORDER_WINDOW_S, REORDER_MAX_LINES) if REORDER_WINDOW_S > 0 else None
+if reorder is not None:
+    REORDER_HELD.fn = lambda: len(reorder)
+
+def _write_lines(lines) -> int:
+    if spool is not None:
+        return spool.append(lines)
+    return writer.put_many(lines)
+
+def enqueue_lines(lines) -> int:
+    """
+    Hand encoded lines to the write path; returns how many were accepted.
+    Re-sent duplicates count as accepted (the device got its answer), lines held by the
+    reorder window count as accepted and are written by release_reordered(). The deduper only
+    remembers lines once they are accepted, so a device can re-send what was refused.
+    """
+    n = len(lines)
+    if deduper is not None:
+        lines = deduper.fresh(lines)
+        if len(lines) < n:
+            DUPLICATES.inc(n - len(lines))
+    if reorder is not None:
+        if deduper is not None:
+            deduper.remember(lines)
+        lines = reorder.push(lines)
+        return n - len(lines) + (_write_lines(lines) if lines else 0)
+    accepted = _write_lines(lines) if lines else 0
+    if deduper is not None:
+        deduper.remember(lines[:accepted])      # accepted lines are a prefix; the rest may be re-sent
+    return n - len(lines) + accepted
+
+def release_reordered(everything: bool = False):
+    lines = reorder.pop_due(everything=everything)
+    if lines:
+        accepted = _write_lines(lines)
+        if accepted < len(lines):
+            DROPPED.labels(transport="reorder").inc(len(lines) - accepted)   # source no longer known
+            log.log("[ERR]", "write queue full after reorder", dropped=len(lines) - accepted)
+
+def start_reorder():
+    while True:
+        time.sleep(REORDER_WINDOW_S / 2)
+        release_reordered()
+
 def write_measurement(payload: dict):
-    for k in ["temp","hum","light","motion"]:
-        if k not in payload:
-            raise ValueError(f"missing {k}")
-        
-
-    device = str(payload.get("device_id", "unknown"))
-    ts_ms = payload.get("ts_ms", None)
-
-    # Decide whether ts_ms is a real epoch (ms) or just millis since boot.
-    use_custom_time = False
-    if isinstance(ts_ms, (int, float)):
-        ts_ms = int(ts_ms)
-        # Real epoch in ms is around 1_600_000_000_000+ since 2020.
-        if ts_ms >= 1_600_000_000_000:   # looks like a real UTC epoch in ms Sept 2020
-            ts_ns = ts_ms * 1_000_000    # InfluxDB requires nanoseconds for custom timestamps. ms -> ns
-            use_custom_time = True       # override InfluxDB’s “server time”
-
-    p = (                                                       # InfluxDB Point object
-        Point("smartart")
-        .tag("device_id", device)
-        .field("temp", float(payload["temp"]))
-        .field("hum", float(payload["hum"]))
-        .field("light", int(payload["light"]))
-        .field("motion", int(payload["motion"]))
-    )
-
-    if use_custom_time:
-        p = p.time(ts_ns, write_precision=WritePrecision.NS)
-        # else: no .time() → Influx uses server "now"
-
-    write_api.write(bucket=INFLUX_BUCKET, org=INFLUX_ORG, record=p)
+    # validate + encode on the caller's thread, the network write happens in the background
+    if not enqueue_lines([to_line(payload)]):
+        raise RuntimeError("write queue full, sample dropped")
+
+def write_measurements(records: list):
+    """
+    Validate/encode a batch in one pass and enqueue the good ones together.
+    Returns (accepted_count, [{"index": i, "error": msg}, ...]) for the rejected records.
+    """
+    lines, errors = encode_records(records)
+    return enqueue_encoded(lines, errors)
+
+def enqueue_encoded(lines: list, errors: list):
+    accepted = enqueue_lines(lines) if lines else 0
+    if accepted < len(lines):
+        errors.append({"index": None, "error": f"write queue full, {len(lines) - accepted} samples dropped"})
+    return accepted, errors
 
 
 # ==== MQTT ====
 mqtt = MqttClient()
 
 def on_connect(client, userdata, flags, rc):
+    MQTT_CONNECTS.inc()
     print(f"[MQTT] Connected rc={rc}")
-    client.subscribe(TOPIC_DATA)
-    print(f"[MQTT] Subscribed {TOPIC_DATA}")
+    client.subscribe([(TOPIC_DATA, 0), (TOPIC_DATA_BIN, 0)])
+    print(f"[MQTT] Subscribed {TOPIC_DATA}, {TOPIC_DATA_BIN}")
+
+def on_disconnect(client, userdata, rc):
+    if rc != 0:   # unexpected: loop_forever reconnects on its own
+        MQTT_RECONNECTS.inc()
+        print(f"[MQTT] connection lost rc={rc}, reconnecting")
 
 def on_message(client, userdata, msg):
     if msg.topic == TOPIC_DATA:
-        try:
-            data = json.loads(msg.payload.decode("utf-8"))
-            write_measurement(data)
-            print(f"[MQTT] -> Influx: {data}")
-        except Exception as e:
-            print(f"[ERR] write failed: {e}")
+        m = TRANSPORTS["mqtt"]
+    elif msg.topic == TOPIC_DATA_BIN:
+        m = TRANSPORTS["mqtt_bin"]
+    else:
+        return
+    t0 = time.perf_counter()
+    try:
+        if m is TRANSPORTS["mqtt"]:
+            received, lines, errors = 1, [to_line(json.loads(msg.payload))], []
+        else:
+            received, lines, errors = decode_and_encode(msg.payload, codec.CONTENT_TYPE)
+    except Exception as e:
+        m.failed(time.perf_counter() - t0)
+        log.log("[ERR]", "mqtt decode failed", topic=msg.topic, error=e)
+        return
+    decode_s = time.perf_counter() - t0
+    accepted, errors = enqueue_encoded(lines, errors)
+    m.record(received, len(lines), accepted, decode_s)
+    if errors:
+        log.log("[ERR]", "mqtt write failed", topic=msg.topic, accepted=accepted, received=received, error=errors[0]["error"])
+    else:
+        log.log("[MQTT]", "-> Influx", topic=msg.topic, samples=accepted)
 
 mqtt.on_connect = on_connect
+mqtt.on_disconnect = on_disconnect
 mqtt.on_message = on_message
 
 def start_mqtt():
@@ -84,6 +198,7 @@ def start_mqtt():
             mqtt.connect(MQTT_HOST, MQTT_PORT, keepalive=30)
             mqtt.loop_forever()
         except Exception as e:
+            MQTT_RECONNECTS.inc()
             print(f"[MQTT] reconnect in 3s: {e}")
             time.sleep(3)
 
@@ -95,14 +210,56 @@ def set_motion_alert(thr:int):      mqtt.publish(TOPIC_MOTION, str(thr))
 app = Flask(__name__)
 @app.route("/ingest", methods=["POST"])
 def ingest():
+    if codec.is_binary_content_type(request.content_type):
+        return ingest_bulk()
+    m = TRANSPORTS["http"]
+    t0 = time.perf_counter()
     try:
-        payload = request.get_json(force=True)
-        write_measurement(payload)
-        print(f"[HTTP] -> Influx: {payload}")
-        return jsonify({"ok": True}), 200
+        line = to_line(request.get_json(force=True))
     except Exception as e:
-        print(f"[HTTP][ERR] {e}")
+        m.failed(time.perf_counter() - t0)
+        log.log("[HTTP][ERR]", "invalid sample", error=e)
         return jsonify({"ok": False, "error": str(e)}), 400
+    decode_s = time.perf_counter() - t0
+    accepted = enqueue_lines([line])
+    m.record(1, 1, accepted, decode_s)
+    if not accepted:
+        log.log("[HTTP][ERR]", "write queue full, sample dropped")
+        return jsonify({"ok": False, "error": "write queue full, sample dropped"}), 400
+    log.log("[HTTP]", "-> Influx", samples=1)
+    return jsonify({"ok": True}), 200
+
+@app.route("/ingest/bulk", methods=["POST"])
+def ingest_bulk():
+    m = TRANSPORTS["http_bulk"]
+    if (request.content_length or 0) > BULK_MAX_BYTES:
+        return jsonify({"ok": False, "error": "body too large"}), 413
+    body = request.get_data(cache=False)
+    t0 = time.perf_counter()
+    try:
+        received, lines, errors = decode_and_encode(body, request.content_type or "",
+                                                    request.headers.get("Content-Encoding", ""))
+    except Exception as e:
+        m.failed(time.perf_counter() - t0)
+        log.log("[HTTP][ERR]", "bulk decode failed", error=e)
+        return jsonify({"ok": False, "error": str(e)}), 400
+    decode_s = time.perf_counter() - t0
+    accepted, errors = enqueue_encoded(lines, errors)
+    m.record(received, len(lines), accepted, decode_s)
+    log.log("[HTTP]", "bulk -> Influx", accepted=accepted, received=received)
+    status = 200 if accepted or not received else 400
+    return jsonify({"ok": not errors, "received": received, "accepted": accepted,
+                    "errors": errors}), status
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    if spool is not None:
+        return jsonify({"spool": spool.stats(), "replay": replayer.stats()})
+    return jsonify(writer.stats())
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
 
 def start_http():
     app.run(host=HTTP_HOST, port=HTTP_PORT, debug=False)
@@ -111,6 +268,15 @@ if __name__ == "__main__":
     print(f"Proxy: MQTT={MQTT_HOST}:{MQTT_PORT}  Influx={INFLUX_URL}  Bucket={INFLUX_BUCKET}  HTTP=:{HTTP_PORT}")
     t1 = threading.Thread(target=start_mqtt, daemon=True); t1.start()
     t2 = threading.Thread(target=start_http, daemon=True); t2.start()
+    if reorder is not None:
+        threading.Thread(target=start_reorder, daemon=True).start()
     try:
         while True: time.sleep(3600)
     except KeyboardInterrupt: pass
+    finally:
+        if reorder is not None:
+            release_reordered(everything=True)
+        if replayer is not None:
+            replayer.close(); spool.close()
+        else:
+            writer.close()
@@ -0,0 +1,502 @@
+import asyncio
+import json
+import os
+import signal
+import time
+import zlib
+
+import aiohttp
+import aiomqtt
+from aiohttp import web
+from config import (
+    BACKPRESSURE,
+    BATCH_SIZE,
+    BULK_MAX_BYTES,
+    DEDUP_KEYS,
+    FLUSH_INTERVAL_S,
+    HTTP_HOST,
+    HTTP_PORT,
+    INFLUX_BUCKET,
+    INFLUX_ORG,
+    INFLUX_POOL_SIZE,
+    INFLUX_TOKEN,
+    INFLUX_URL,
+    LOG_INTERVAL_S,
+    MQTT_HOST,
+    MQTT_PORT,
+    PUT_TIMEOUT_S,
+    QUEUE_MAX,
+    REORDER_MAX_LINES,
+    REORDER_WINDOW_S,
+    REPLAY_BATCH,
+    SHARD_MODE,
+    SHARE_GROUP,
+    SHUTDOWN_DRAIN_S,
+    SPOOL_DIR,
+    SPOOL_ENABLED,
+    SPOOL_FSYNC,
+    SPOOL_MAX_BYTES,
+    SPOOL_SEGMENT_BYTES,
+    STATS_INTERVAL_S,
+    SUPERVISOR_PORT,
+    TOPIC_DATA,
+    TOPIC_DATA_BIN,
+    codec,
+)
+from dedup import Deduper, ReorderBuffer
+from influx_writer import AsyncBatchWriter, InfluxWriteError
+from ingest import decode_and_encode, encode_records, peek_device
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import (
+    DROPPED,
+    DUPLICATES,
+    MQTT_CONNECTS,
+    MQTT_RECONNECTS,
+    QUEUE_DEPTH,
+    REGISTRY,
+    REORDER_HELD,
+    SPOOL_PENDING,
+    TRANSPORTS,
+    RateLimitedLog,
+    timed_async_sink,
+)
+from spool import Spool, bisect_write_async
+
+# Single-event-loop variant of data_proxy.py: MQTT consumption (aiomqtt), HTTP ingest (aiohttp)
+# and Influx writes (pooled keep-alive aiohttp session) all share one loop, no threads.
+# Same routes, topics, spool and batching settings as the threaded proxy (config.py).
+
+spool = None
+writer = None
+replay_stats = {"written": 0, "flushes": 0, "flush_errors": 0, "quarantined": 0}
+ingest_stats = {
+    "mqtt_messages": 0,
+    "http_requests": 0,
+    "samples": 0,
+    "rejected": 0,
+    "mqtt_skipped": 0,
+}
+log = RateLimitedLog(LOG_INTERVAL_S)
+
+# worker identity when started by supervisor.py (one process = one shard)
+worker_id = 0
+n_workers = 1
+
+
+def owns(device_id: str) -> bool:
+    """SHARD_MODE "hash": this worker handles a device iff crc32(device_id) % n_workers == worker_id."""
+    return (
+        n_workers == 1 or zlib.crc32(device_id.encode("utf-8")) % n_workers == worker_id
+    )
+
+
+# ==== Influx ====
+def make_influx_sink(session: aiohttp.ClientSession):
+    url = f"{INFLUX_URL.rstrip('/')}/api/v2/write"
+    params = {"org": INFLUX_ORG, "bucket": INFLUX_BUCKET, "precision": "ns"}
+    headers = {
+        "Authorization": f"Token {INFLUX_TOKEN}",
+        "Content-Type": "text/plain; charset=utf-8",
+    }
+
+    async def sink(lines):
+        async with session.post(
+            url, params=params, headers=headers, data="\n".join(lines).encode("utf-8")
+        ) as r:
+            if r.status >= 300:
+                raise InfluxWriteError(r.status, await r.text())
+
+    return sink
+
+
+async def replay_spool(sink, stop: asyncio.Event):
+    """Drain the spool to Influx; file reads go to a worker thread, the POST stays on the loop."""
+    backoff = 1.0
+    while True:
+        lines, cursor = await asyncio.to_thread(spool.read, REPLAY_BATCH)
+        if not lines:
+            if stop.is_set():
+                return
+            try:
+                await asyncio.wait_for(stop.wait(), 0.5)
+            except TimeoutError:
+                pass
+            continue
+        try:
+            bad = await bisect_write_async(sink, lines)
+        except Exception as e:
+            spool.rewind()
+            replay_stats["flush_errors"] += 1
+            print(
+                f"[SPOOL][ERR] replay of {len(lines)} lines failed, retry in {backoff:.1f}s: {e}"
+            )
+            if stop.is_set():
+                return  # shutting down: the lines stay on disk for the next start
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+        # Influx refused these lines for good (bad line protocol): keep them out of replay
+        if bad:
+            await asyncio.to_thread(spool.quarantine, bad)
+            replay_stats["quarantined"] += len(bad)
+            print(
+                f"[SPOOL][ERR] Influx rejected {len(bad)} of {len(lines)} lines, quarantined: {bad[0][:200]}"
+            )
+        spool.ack(cursor, len(lines))
+        replay_stats["written"] += len(lines) - len(bad)
+        replay_stats["flushes"] += 1
+        backoff = 1.0
+
+
+deduper = Deduper(DEDUP_KEYS) if DEDUP_KEYS else None
+reorder = (
+    ReorderBuffer(REORDER_WINDOW_S, REORDER_MAX_LINES) if REORDER_WINDOW_S > 0 else None
+)
+if reorder is not None:
+    REORDER_HELD.fn = lambda: len(reorder)
+
+
+async def _write_lines(lines) -> int:
+    if spool is not None:
+        return spool.append(lines)  # buffered local append, no network wait
+    return await writer.put_many(lines)
+
+
+async def enqueue_lines(lines) -> int:
+    """Same contract as data_proxy.enqueue_lines: duplicates and held lines count as accepted."""
+    n = len(lines)
+    if deduper is not None:
+        lines = deduper.fresh(lines)
+        if len(lines) < n:
+            DUPLICATES.inc(n - len(lines))
+    if reorder is not None:
+        if deduper is not None:
+            deduper.remember(lines)
+        lines = reorder.push(lines)
+        return n - len(lines) + (await _write_lines(lines) if lines else 0)
+    accepted = await _write_lines(lines) if lines else 0
+    if deduper is not None:
+        # accepted lines are a prefix; the rest may be re-sent
+        deduper.remember(lines[:accepted])
+    return n - len(lines) + accepted
+
+
+async def release_reordered(everything: bool = False):
+    lines = reorder.pop_due(everything=everything)
+    if lines:
+        accepted = await _write_lines(lines)
+        if accepted < len(lines):
+            # source no longer known
+            DROPPED.labels(transport="reorder").inc(len(lines) - accepted)
+            log.log(
+                "[ERR]", "write queue full after reorder", dropped=len(lines) - accepted
+            )
+
+
+async def reorder_loop():
+    while True:
+        await asyncio.sleep(REORDER_WINDOW_S / 2)
+        await release_reordered()
+
+
+async def write_measurements(records: list):
+    lines, errors = encode_records(records)
+    return await enqueue_encoded(len(records), lines, errors)
+
+
+async def enqueue_encoded(received: int, lines: list, errors: list):
+    accepted = await enqueue_lines(lines) if lines else 0
+    ingest_stats["samples"] += accepted
+    ingest_stats["rejected"] += received - accepted
+    if accepted < len(lines):
+        errors.append(
+            {
+                "index": None,
+                "error": f"write queue full, {len(lines) - accepted} samples dropped",
+            }
+        )
+    return accepted, errors
+
+
+# ==== MQTT ====
+async def handle_message(topic: str, payload: bytes):
+    ingest_stats["mqtt_messages"] += 1
+    if topic == TOPIC_DATA:
+        m = TRANSPORTS["mqtt"]
+    elif topic == TOPIC_DATA_BIN:
+        m = TRANSPORTS["mqtt_bin"]
+    else:
+        return
+    t0 = time.perf_counter()
+    try:
+        if SHARD_MODE == "hash" and n_workers > 1:
+            # every worker sees every message: route on the device id (JSON prefix scan / frame
+            # header) before decoding, so each worker only pays to decode its own share
+            device = (
+                peek_device(payload)
+                if topic == TOPIC_DATA
+                else codec.frame_device(payload)
+            )
+            if device is not None and not owns(device):
+                ingest_stats["mqtt_skipped"] += 1
+                return
+        records = (
+            [json.loads(payload)]
+            if topic == TOPIC_DATA
+            else codec.decode_frame(payload)
+        )
+        if SHARD_MODE == "hash" and n_workers > 1:  # ids peek_device couldn't read
+            records = [
+                r
+                for r in records
+                if not isinstance(r, dict) or owns(str(r.get("device_id", "unknown")))
+            ]
+            if not records:
+                ingest_stats["mqtt_skipped"] += 1
+                return
+        lines, errors = encode_records(records)
+    except Exception as e:
+        m.failed(time.perf_counter() - t0)
+        log.log("[ERR]", "mqtt decode failed", topic=topic, error=e)
+        return
+    decode_s = time.perf_counter() - t0
+    accepted, errors = await enqueue_encoded(len(records), lines, errors)
+    m.record(len(records), len(lines), accepted, decode_s)
+    if errors:
+        log.log(
+            "[ERR]",
+            "mqtt write failed",
+            topic=topic,
+            accepted=accepted,
+            received=len(records),
+            error=errors[0]["error"],
+        )
+
+
+def mqtt_topics():
+    topics = [TOPIC_DATA, TOPIC_DATA_BIN]
+    if n_workers > 1 and SHARD_MODE == "shared":
+        # MQTT v5 shared subscription: the broker hands each message to one group member
+        topics = [f"$share/{SHARE_GROUP}/{t}" for t in topics]
+    return topics
+
+
+async def mqtt_loop():
+    shared = n_workers > 1 and SHARD_MODE == "shared"
+    protocol = aiomqtt.ProtocolVersion.V5 if shared else aiomqtt.ProtocolVersion.V311
+    topics = mqtt_topics()
+    while True:
+        try:
+            async with aiomqtt.Client(
+                MQTT_HOST,
+                MQTT_PORT,
+                keepalive=30,
+                protocol=protocol,
+                identifier=f"smartart-proxy-{os.getpid()}-{worker_id}",
+            ) as client:
+                MQTT_CONNECTS.inc()
+                print(f"[MQTT] Connected {MQTT_HOST}:{MQTT_PORT}")
+                await client.subscribe([(t, 0) for t in topics])
+                print(f"[MQTT] Subscribed {', '.join(topics)}")
+                async for msg in client.messages:
+                    await handle_message(msg.topic.value, msg.payload)
+        except aiomqtt.MqttError as e:
+            MQTT_RECONNECTS.inc()
+            print(f"[MQTT] reconnect in 3s: {e}")
+            await asyncio.sleep(3)
+
+
+# ==== HTTP ingest ====
+async def ingest(request: web.Request):
+    ingest_stats["http_requests"] += 1
+    if codec.is_binary_content_type(request.content_type):
+        return await ingest_bulk(request)
+    m = TRANSPORTS["http"]
+    body = await request.read()
+    t0 = time.perf_counter()
+    try:
+        lines, errors = encode_records([json.loads(body)])
+    except Exception as e:
+        lines, errors = [], [{"index": 0, "error": str(e)}]
+    decode_s = time.perf_counter() - t0
+    accepted, errors = await enqueue_encoded(1, lines, errors)
+    m.record(1, len(lines), accepted, decode_s)
+    if errors:
+        log.log("[HTTP][ERR]", "rejected sample", error=errors[0]["error"])
+        return web.json_response({"ok": False, "error": errors[0]["error"]}, status=400)
+    return web.json_response({"ok": True})
+
+
+async def ingest_bulk(request: web.Request):
+    if request.path.endswith("/bulk"):
+        ingest_stats["http_requests"] += 1
+    m = TRANSPORTS["http_bulk"]
+    body = await request.read()
+    t0 = time.perf_counter()
+    try:
+        received, lines, errors = decode_and_encode(
+            body,
+            request.headers.get("Content-Type", ""),
+            request.headers.get("Content-Encoding", ""),
+        )
+    except Exception as e:
+        m.failed(time.perf_counter() - t0)
+        log.log("[HTTP][ERR]", "bulk decode failed", error=e)
+        return web.json_response({"ok": False, "error": str(e)}, status=400)
+    decode_s = time.perf_counter() - t0
+    accepted, errors = await enqueue_encoded(received, lines, errors)
+    m.record(received, len(lines), accepted, decode_s)
+    status = 200 if accepted or not received else 400
+    return web.json_response(
+        {
+            "ok": not errors,
+            "received": received,
+            "accepted": accepted,
+            "errors": errors,
+        },
+        status=status,
+    )
+
+
+def collect_stats() -> dict:
+    s = {"worker": worker_id, "pid": os.getpid(), "ingest": dict(ingest_stats)}
+    if spool is not None:
+        s.update({"spool": spool.stats(), "replay": dict(replay_stats)})
+    else:
+        s["writer"] = writer.stats()
+    return s
+
+
+async def stats(request: web.Request):
+    return web.json_response(collect_stats())
+
+
+async def metrics(request: web.Request):
+    # under supervisor.py the shared port lands on any one worker: scrape the supervisor, which
+    # merges the metrics every worker sends with its stats report
+    if n_workers > 1:
+        return web.Response(
+            status=404, text=f"per-worker metrics: scrape :{SUPERVISOR_PORT}/metrics\n"
+        )
+    return web.Response(
+        text=REGISTRY.render(), headers={"Content-Type": METRICS_CONTENT_TYPE}
+    )
+
+
+async def report_loop(report, stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            report(collect_stats(), REGISTRY.dump())
+        except Exception as e:
+            print(f"[STATS] report failed: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), STATS_INTERVAL_S)
+        except TimeoutError:
+            pass
+
+
+def make_app() -> web.Application:
+    app = web.Application(client_max_size=BULK_MAX_BYTES)
+    app.add_routes(
+        [
+            web.post("/ingest", ingest),
+            web.post("/ingest/bulk", ingest_bulk),
+            web.get("/stats", stats),
+            web.get("/metrics", metrics),
+        ]
+    )
+    return app
+
+
+# ==== main ====
+async def main(worker: int = 0, workers: int = 1, report=None):
+    """`worker`/`workers`/`report` are set by supervisor.py; standalone runs use the defaults."""
+    global spool, writer, worker_id, n_workers
+    worker_id, n_workers = worker, workers
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows: Ctrl+C raises KeyboardInterrupt instead
+            pass
+
+    connector = aiohttp.TCPConnector(limit=INFLUX_POOL_SIZE, keepalive_timeout=60)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=aiohttp.ClientTimeout(total=30)
+    ) as session:
+        sink = timed_async_sink(make_influx_sink(session))
+        replay_task = None
+        if SPOOL_ENABLED:
+            spool_dir = (
+                SPOOL_DIR
+                if n_workers == 1
+                else os.path.join(SPOOL_DIR, f"w{worker_id}")
+            )
+            spool = Spool(
+                spool_dir,
+                segment_bytes=SPOOL_SEGMENT_BYTES,
+                max_bytes=SPOOL_MAX_BYTES,
+                fsync=SPOOL_FSYNC,
+            )
+            replay_task = asyncio.create_task(replay_spool(sink, stop))
+            SPOOL_PENDING.fn = spool.pending_bytes
+        else:
+            writer = AsyncBatchWriter(
+                sink,
+                batch_size=BATCH_SIZE,
+                flush_interval=FLUSH_INTERVAL_S,
+                max_queue=QUEUE_MAX,
+                backpressure=(
+                    "drop_oldest" if BACKPRESSURE == "drop_oldest" else "block"
+                ),
+                put_timeout=PUT_TIMEOUT_S,
+            )
+            writer.start()
+            QUEUE_DEPTH.fn = lambda: writer.stats()["queue_depth"]
+
+        runner = web.AppRunner(make_app(), access_log=None)
+        await runner.setup()
+        # workers share the port; the kernel spreads connections across them (SO_REUSEPORT)
+        await web.TCPSite(
+            runner, HTTP_HOST, HTTP_PORT, backlog=4096, reuse_port=n_workers > 1
+        ).start()
+        mqtt_task = asyncio.create_task(mqtt_loop())
+        reorder_task = (
+            asyncio.create_task(reorder_loop()) if reorder is not None else None
+        )
+        report_task = asyncio.create_task(report_loop(report, stop)) if report else None
+        print(
+            f"Proxy (asyncio, worker {worker_id + 1}/{n_workers}): MQTT={MQTT_HOST}:{MQTT_PORT}  Influx={INFLUX_URL}  "
+            f"Bucket={INFLUX_BUCKET}  HTTP=:{HTTP_PORT}"
+        )
+
+        await stop.wait()
+        # graceful shutdown: stop intake first, then drain what was already accepted
+        print("[MAIN] shutting down, draining in-flight batches")
+        mqtt_task.cancel()
+        if report_task is not None:
+            report_task.cancel()
+        await runner.cleanup()
+        if reorder_task is not None:
+            reorder_task.cancel()
+            await release_reordered(everything=True)
+        if writer is not None:
+            await writer.close(SHUTDOWN_DRAIN_S)
+        if replay_task is not None:
+            try:
+                await asyncio.wait_for(replay_task, SHUTDOWN_DRAIN_S)
+            except TimeoutError:
+                print(
+                    f"[SPOOL] {spool.pending_bytes()} bytes left on disk for the next start"
+                )
+            spool.close()
+        if report:
+            report(collect_stats(), REGISTRY.dump())
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,143 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Per-device ordering stage between encoding and the write path:
+#   UptimeClock   - ESP32s without NTP send ts_ms = millis(); map it to wall clock with a
+#                   per-device offset anchored on the first sample instead of stamping the
+#                   proxy's receive time (retries / late samples keep their real order)
+#   Deduper       - drops exact duplicate lines (HTTP retries, QoS 1 redeliveries) using a
+#                   bounded ring of recently accepted lines
+#   ReorderBuffer - holds lines for a short window and releases them in timestamp order
+
+
+# ================= UPTIME -> WALL CLOCK =================
+class UptimeClock:
+    """
+    offset_ms = receive time - uptime of the first sample seen from a device; later samples
+    map to offset + uptime, so a retried sample gets the same timestamp as the original.
+    Re-anchors when the newest sample would land more than `max_ahead_ms` in the future (the
+    first one arrived late, or clock drift) or more than `max_lag_ms` in the past (reboot).
+    Samples older than the newest one are late deliveries and keep the current offset.
+    """
+
+    def __init__(
+        self,
+        max_devices: int = 10000,
+        max_ahead_ms: int = 1000,
+        max_lag_ms: int = 10_000,
+    ):
+        self.max_devices = max_devices
+        self.max_ahead_ms = max_ahead_ms
+        self.max_lag_ms = max_lag_ms
+        self.reanchors = 0
+        # device -> [offset_ms, newest uptime]
+        self._dev: OrderedDict[str, list[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def offset(self, device: str, newest_ms: int, now_ms: int | None = None) -> int:
+        """Offset for a batch from `device` whose largest uptime is `newest_ms`."""
+        now_ms = time.time_ns() // 1_000_000 if now_ms is None else now_ms
+        with self._lock:
+            st = self._dev.get(device)
+            if st is None:
+                st = self._dev[device] = [now_ms - newest_ms, newest_ms]
+                if len(self._dev) > self.max_devices:
+                    self._dev.popitem(last=False)
+                return st[0]
+            self._dev.move_to_end(device)
+            if newest_ms > st[1] or newest_ms < st[1] - self.max_lag_ms:
+                wall = st[0] + newest_ms
+                if wall > now_ms + self.max_ahead_ms or wall < now_ms - self.max_lag_ms:
+                    st[0] = now_ms - newest_ms
+                    self.reanchors += 1
+                st[1] = newest_ms
+            return st[0]
+
+    def to_wall_ms(self, device: str, uptime_ms: int, now_ms: int | None = None) -> int:
+        return self.offset(device, uptime_ms, now_ms) + uptime_ms
+
+
+# ================= DUPLICATES =================
+class Deduper:
+    """
+    Drops lines identical to one of the last `capacity` accepted lines. Exact match on the
+    whole line (series + fields + timestamp), so only true re-sends are dropped; lines are
+    remembered by hash to keep the ring small.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self.dropped = 0
+        self._ring: deque = deque()
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def fresh(self, lines: list[str]) -> list[str]:
+        """Lines not seen before (nor earlier in `lines`); nothing is recorded until remember()."""
+        out, batch = [], set()
+        with self._lock:
+            seen = self._seen
+            for ln in lines:
+                h = hash(ln)
+                if h in seen or h in batch:
+                    self.dropped += 1
+                    continue
+                batch.add(h)
+                out.append(ln)
+        return out
+
+    def remember(self, lines: list[str]):
+        """Record lines the write path accepted, so a re-send of a rejected line still goes through."""
+        with self._lock:
+            seen, ring = self._seen, self._ring
+            for ln in lines:
+                h = hash(ln)
+                if h in seen:
+                    continue
+                seen.add(h)
+                ring.append(h)
+                if len(ring) > self.capacity:
+                    seen.discard(ring.popleft())
+
+
+# ================= REORDER =================
+class ReorderBuffer:
+    """
+    Holds lines up to `window_s` and releases them sorted by timestamp. A line is due once
+    its timestamp (capped at arrival time, so a device clock running ahead can't pin it)
+    is older than now - window. Beyond `max_lines` the oldest lines are released early.
+    """
+
+    def __init__(self, window_s: float = 0.5, max_lines: int = 50_000):
+        self.window_ns = int(window_s * 1e9)
+        self.max_lines = max_lines
+        self._heap: list = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, lines: list[str], now_ns: int | None = None) -> list[str]:
+        """Buffer `lines`; returns the lines pushed out by the size cap (write them now)."""
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        with self._lock:
+            for ln in lines:
+                ts = ln[ln.rfind(" ") + 1 :]
+                key = min(int(ts), now_ns) if ts.isdigit() else now_ns
+                self._seq += 1
+                heapq.heappush(self._heap, (key, self._seq, ln))
+            over = len(self._heap) - self.max_lines
+            return (
+                [heapq.heappop(self._heap)[2] for _ in range(over)] if over > 0 else []
+            )
+
+    def pop_due(self, now_ns: int | None = None, everything: bool = False) -> list[str]:
+        cutoff = (time.time_ns() if now_ns is None else now_ns) - self.window_ns
+        out = []
+        with self._lock:
+            while self._heap and (everything or self._heap[0][0] <= cutoff):
+                out.append(heapq.heappop(self._heap)[2])
+        return out
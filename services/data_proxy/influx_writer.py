@@ -0,0 +1,465 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+
+from spool import Spool, bisect_write, bisect_write_async
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "spill")
+
+
+class InfluxWriteError(RuntimeError):
+    """Non-2xx answer to a write; `status` lets spool.rejected_by_sink tell bad data from outages."""
+
+    def __init__(self, status: int, body: str = ""):
+        super().__init__(f"influx write HTTP {status}: {body[:200]}")
+        self.status = status
+
+
+# ================= LINE PROTOCOL =================
+def _escape_tag(v: str) -> str:
+    return (
+        v.replace("\\", "\\\\")
+        .replace(",", "\\,")
+        .replace("=", "\\=")
+        .replace(" ", "\\ ")
+    )
+
+
+def _float_field(v) -> str:
+    f = float(v)
+    if not math.isfinite(f):
+        raise ValueError(f"non-finite value {v!r}")
+    return repr(f)
+
+
+def encode_line(
+    measurement: str, device: str, temp, hum, light, motion, ts_ns: int | None = None
+) -> str:
+    """One telemetry sample -> one line of Influx line protocol (same shape the old Point produced)."""
+    line = (
+        f"{measurement},device_id={_escape_tag(device)} "
+        f"temp={_float_field(temp)},hum={_float_field(hum)},"
+        f"light={int(light)}i,motion={int(motion)}i"
+    )
+    if ts_ns is not None:
+        line += f" {int(ts_ns)}"
+    return line
+
+
+# ================= BATCH WRITER =================
+def _count_rejected(counters: dict[str, int], bad: list[str], total: int):
+    counters["rejected"] += len(bad)
+    print(
+        f"[WRITER][ERR] Influx rejected {len(bad)} of {total} lines, dropped: {bad[0][:200]}"
+    )
+
+
+class BatchWriter:
+    """
+    Bounded queue of line-protocol strings drained by one background flusher thread.
+    A batch is sent to `sink(lines)` when `batch_size` lines are waiting or `flush_interval`
+    seconds have passed, whichever comes first. When the queue is full, `backpressure` decides:
+      block       -> producer waits (up to `put_timeout` seconds per put_many call, then the rest is dropped)
+      drop_oldest -> the oldest queued line is discarded
+      spill       -> the line is appended to the `spill` Spool and sent once the queue has room
+    Failed batches are retried, except lines Influx rejects as bad data (spool.REJECT_STATUSES),
+    which are isolated by bisection and counted as "rejected".
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[list[str]], None],
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 20000,
+        backpressure: str = "block",
+        spill: Spool | None = None,
+        put_timeout: float | None = None,
+        retry_delay: float = 2.0,
+    ):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"backpressure must be one of {BACKPRESSURE_POLICIES}")
+        if backpressure == "spill" and spill is None:
+            raise ValueError("spill backpressure needs a spill Spool")
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_queue = max(self.batch_size, int(max_queue))
+        self.backpressure = backpressure
+        self.spill = spill
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+
+        self._q: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._flush_req = False
+        self._inflight = 0
+
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "rejected": 0,
+        }
+        self._lat_last_ms = 0.0
+        self._lat_sum_ms = 0.0
+        self._lat_max_ms = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name="influx-flusher", daemon=True
+        )
+        self._thread.start()
+
+    # ---- producers ----
+    def put(self, line: str) -> bool:
+        return self.put_many([line]) == 1
+
+    def put_many(self, lines: list[str]) -> int:
+        """Queue lines; returns how many were accepted (queued or spilled)."""
+        accepted = 0
+        spill: list[str] = []
+        deadline = (
+            None if self.put_timeout is None else time.monotonic() + self.put_timeout
+        )
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("writer is closed")
+            for i, line in enumerate(lines):
+                if len(self._q) >= self.max_queue:
+                    if self.backpressure == "drop_oldest":
+                        self._q.popleft()
+                        self._counters["dropped"] += 1
+                    elif self.backpressure == "spill":
+                        spill.append(line)
+                        continue
+                    else:
+                        self._cond.notify_all()
+                        left = (
+                            None
+                            if deadline is None
+                            else max(0.0, deadline - time.monotonic())
+                        )
+                        if (
+                            not self._cond.wait_for(
+                                lambda: len(self._q) < self.max_queue or self._closed,
+                                timeout=left,
+                            )
+                            or self._closed
+                        ):
+                            # put_timeout is for the whole call; once it runs out the rest is dropped
+                            # too, so accepted lines are a prefix
+                            self._counters["dropped"] += len(lines) - i
+                            break
+                self._q.append(line)
+                accepted += 1
+            self._counters["enqueued"] += accepted
+            if len(self._q) >= self.batch_size:
+                self._cond.notify_all()
+        if spill:
+            self._spill_write(spill)
+            accepted += len(spill)
+        return accepted
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Ask the flusher to send everything queued now; waits until the queue is empty."""
+        with self._cond:
+            self._flush_req = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._q
+                and not self._inflight
+                and not self._spill_pending(),
+                timeout=timeout,
+            )
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting lines, drain what is queued and stop the flusher."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    # ---- spill ----
+    def _spill_write(self, lines: list[str]):
+        self.spill.append(lines)
+        with self._cond:
+            self._counters["spilled"] += len(lines)
+
+    def _spill_pending(self) -> bool:
+        return self.spill is not None and self.spill.pending_bytes() > 0
+
+    # ---- flusher ----
+    def _run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                while (
+                    len(self._q) < self.batch_size
+                    and not self._closed
+                    and not self._flush_req
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                n = min(self.batch_size, len(self._q))
+                batch = [self._q.popleft() for _ in range(n)]
+                if not self._q and not self._spill_pending():
+                    self._flush_req = False
+                room = self.max_queue - len(self._q)
+                stopping = self._closed
+                self._inflight = len(batch)
+                self._cond.notify_all()  # wake producers blocked on a full queue
+
+            if batch:
+                self._send(batch, stopping)
+            if self.spill is not None and room >= self.batch_size:
+                self._send_spilled(stopping)
+
+            with self._cond:
+                self._inflight = 0
+                self._cond.notify_all()
+                if stopping and not self._q:
+                    return  # anything still spilled is on disk and goes out after the next start
+            deadline = time.monotonic() + self.flush_interval
+
+    def _send(self, batch: list[str], stopping: bool):
+        t0 = time.perf_counter()
+        try:
+            bad = bisect_write(self.sink, batch)
+        except Exception as e:
+            with self._cond:
+                self._counters["flush_errors"] += 1
+            print(f"[WRITER][ERR] flush of {len(batch)} lines failed: {e}")
+            if stopping:
+                with self._cond:
+                    self._counters["dropped"] += len(batch)
+                return
+            time.sleep(self.retry_delay)
+            self._requeue(batch)
+            return
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._cond:
+            if bad:
+                _count_rejected(self._counters, bad, len(batch))
+            self._counters["written"] += len(batch) - len(bad)
+            self._counters["flushes"] += 1
+            self._lat_last_ms = ms
+            self._lat_sum_ms += ms
+            self._lat_max_ms = max(self._lat_max_ms, ms)
+
+    def _send_spilled(self, stopping: bool):
+        # spilled lines go out in their own batch so the spool cursor is acked exactly once
+        lines, cursor = self.spill.read(self.batch_size)
+        if not lines:
+            return
+        try:
+            bad = bisect_write(self.sink, lines)
+        except Exception as e:
+            self.spill.rewind()
+            with self._cond:
+                self._counters["flush_errors"] += 1
+            print(f"[WRITER][ERR] replay of {len(lines)} spilled lines failed: {e}")
+            if not stopping:
+                time.sleep(self.retry_delay)
+            return
+        if bad:
+            self.spill.quarantine(bad)
+        self.spill.ack(cursor, len(lines))
+        with self._cond:
+            if bad:
+                _count_rejected(self._counters, bad, len(lines))
+            self._counters["written"] += len(lines) - len(bad)
+            self._counters["flushes"] += 1
+
+    def _requeue(self, batch: list[str]):
+        """Put a failed batch back at the head of the queue (or into the spill when full)."""
+        with self._cond:
+            room = self.max_queue - len(self._q)
+            head, rest = batch[:room], batch[room:]
+            self._q.extendleft(reversed(head))
+        if rest:
+            if self.spill is not None:
+                self._spill_write(rest)
+            else:
+                with self._cond:
+                    self._counters["dropped"] += len(rest)
+
+    # ---- observability ----
+    def stats(self) -> dict[str, float]:
+        with self._cond:
+            s = dict(self._counters)
+            s["queue_depth"] = len(self._q)
+            s["queue_max"] = self.max_queue
+            s["spill_pending_bytes"] = (
+                self.spill.pending_bytes() if self.spill is not None else 0
+            )
+            s["flush_latency_last_ms"] = round(self._lat_last_ms, 3)
+            s["flush_latency_avg_ms"] = (
+                round(self._lat_sum_ms / s["flushes"], 3) if s["flushes"] else 0.0
+            )
+            s["flush_latency_max_ms"] = round(self._lat_max_ms, 3)
+            return s
+
+
+# ================= ASYNC BATCH WRITER =================
+class AsyncBatchWriter:
+    """
+    asyncio twin of BatchWriter for the single-event-loop proxy (data_proxy_async.py).
+    `sink` is a coroutine function taking a list of lines. Backpressure is "block"
+    (await room, up to `put_timeout`) or "drop_oldest". close() drains what is queued.
+    """
+
+    def __init__(
+        self,
+        sink,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 20000,
+        backpressure: str = "block",
+        put_timeout: float | None = None,
+        retry_delay: float = 2.0,
+    ):
+        if backpressure not in ("block", "drop_oldest"):
+            raise ValueError("async backpressure must be 'block' or 'drop_oldest'")
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_queue = max(self.batch_size, int(max_queue))
+        self.backpressure = backpressure
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+        self._q: deque = deque()
+        self._cond = None
+        self._task = None
+        self._closed = False
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "rejected": 0,
+        }
+        self._lat_last_ms = 0.0
+        self._lat_sum_ms = 0.0
+        self._lat_max_ms = 0.0
+
+    def start(self):
+        self._cond = asyncio.Condition()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put_many(self, lines: list[str]) -> int:
+        accepted = 0
+        deadline = (
+            None if self.put_timeout is None else time.monotonic() + self.put_timeout
+        )
+        async with self._cond:
+            if self._closed:
+                raise RuntimeError("writer is closed")
+            for i, line in enumerate(lines):
+                if len(self._q) >= self.max_queue:
+                    if self.backpressure == "drop_oldest":
+                        self._q.popleft()
+                        self._counters["dropped"] += 1
+                    else:
+                        self._cond.notify_all()
+                        try:
+                            await asyncio.wait_for(
+                                self._cond.wait_for(
+                                    lambda: len(self._q) < self.max_queue
+                                    or self._closed
+                                ),
+                                (
+                                    None
+                                    if deadline is None
+                                    else max(0.0, deadline - time.monotonic())
+                                ),
+                            )
+                        except TimeoutError:
+                            pass
+                        if len(self._q) >= self.max_queue or self._closed:
+                            # see BatchWriter.put_many
+                            self._counters["dropped"] += len(lines) - i
+                            break
+                self._q.append(line)
+                accepted += 1
+            self._counters["enqueued"] += accepted
+            if len(self._q) >= self.batch_size:
+                self._cond.notify_all()
+        return accepted
+
+    async def close(self, timeout: float = 10.0):
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except TimeoutError:
+            self._task.cancel()
+            print(f"[WRITER] shutdown timed out, {len(self._q)} lines not written")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            deadline = loop.time() + self.flush_interval
+            async with self._cond:
+                while len(self._q) < self.batch_size and not self._closed:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except TimeoutError:
+                        break
+                batch = [
+                    self._q.popleft() for _ in range(min(self.batch_size, len(self._q)))
+                ]
+                stopping = self._closed
+                self._cond.notify_all()
+            if batch:
+                await self._send(batch, stopping)
+            if stopping and not self._q:
+                return
+
+    async def _send(self, batch: list[str], stopping: bool):
+        t0 = time.perf_counter()
+        try:
+            bad = await bisect_write_async(self.sink, batch)
+        except Exception as e:
+            self._counters["flush_errors"] += 1
+            print(f"[WRITER][ERR] flush of {len(batch)} lines failed: {e}")
+            if stopping:
+                self._counters["dropped"] += len(batch)
+                return
+            await asyncio.sleep(self.retry_delay)
+            # may overshoot max_queue by one batch; producers wait
+            self._q.extendleft(reversed(batch))
+            return
+        ms = (time.perf_counter() - t0) * 1000.0
+        if bad:
+            _count_rejected(self._counters, bad, len(batch))
+        self._counters["written"] += len(batch) - len(bad)
+        self._counters["flushes"] += 1
+        self._lat_last_ms = ms
+        self._lat_sum_ms += ms
+        self._lat_max_ms = max(self._lat_max_ms, ms)
+
+    def stats(self) -> dict[str, float]:
+        s = dict(self._counters)
+        s["queue_depth"] = len(self._q)
+        s["queue_max"] = self.max_queue
+        s["flush_latency_last_ms"] = round(self._lat_last_ms, 3)
+        s["flush_latency_avg_ms"] = (
+            round(self._lat_sum_ms / s["flushes"], 3) if s["flushes"] else 0.0
+        )
+        s["flush_latency_max_ms"] = round(self._lat_max_ms, 3)
+        return s
@@ -0,0 +1,170 @@
+import json
+import re
+import time
+import zlib
+
+from config import BULK_MAX_BYTES, CLOCK_MAX_LAG_MS, UPTIME_TO_WALL, codec
+from dedup import UptimeClock
+from influx_writer import encode_line
+
+try:
+    import columnar  # NumPy batch encoder, optional
+except ImportError:
+    columnar = None
+
+# Transport-independent part of ingest: payload validation, line-protocol encoding and
+# bulk body decoding. Shared by the threaded (data_proxy.py) and asyncio (data_proxy_async.py) proxies.
+
+# per-device millis() -> wall clock offsets, shared by to_line and the columnar encoder
+clock = UptimeClock(max_lag_ms=CLOCK_MAX_LAG_MS) if UPTIME_TO_WALL else None
+
+
+def to_line(payload: dict, offsets: dict | None = None) -> str:
+    """`offsets`: device -> uptime offset for the whole batch (see _anchor), else looked up per sample."""
+    if not isinstance(payload, dict):
+        raise TypeError("sample must be a JSON object")
+    for k in ["temp", "hum", "light", "motion"]:
+        if k not in payload:
+            raise ValueError(f"missing {k}")
+
+    device = str(payload.get("device_id", "unknown"))
+    ts_ms = payload.get("ts_ms", None)
+
+    # Decide whether ts_ms is a real epoch (ms) or just millis since boot.
+    # Writes are batched/spooled, so Influx's own "now" would be the flush or replay time;
+    # uptime samples are mapped to wall clock per device (dedup.UptimeClock), samples
+    # without any timestamp get the proxy's receive time.
+    ts_ns = time.time_ns()
+    if isinstance(ts_ms, (int, float)):
+        ts_ms = int(ts_ms)
+        # Real epoch in ms is around 1_600_000_000_000+ since 2020.
+        if ts_ms >= 1_600_000_000_000:  # looks like a real UTC epoch in ms Sept 2020
+            # InfluxDB requires nanoseconds for custom timestamps. ms -> ns
+            ts_ns = ts_ms * 1_000_000
+        elif ts_ms > 0 and offsets is not None and device in offsets:
+            ts_ns = (offsets[device] + ts_ms) * 1_000_000
+        elif ts_ms > 0 and clock is not None:
+            ts_ns = clock.to_wall_ms(device, ts_ms, ts_ns // 1_000_000) * 1_000_000
+
+    return encode_line(
+        "smartart",
+        device,
+        payload["temp"],
+        payload["hum"],
+        payload["light"],
+        payload["motion"],
+        ts_ns,
+    )
+
+
+_DEVICE_KEY = b'"device_id"'
+_DEVICE_RE = re.compile(rb'"device_id"\s*:\s*"([^"\\]*)"')
+
+
+def peek_device(payload: bytes) -> str | None:
+    """
+    device_id of a JSON sample without decoding it (shard routing), "unknown" when there is none
+    (what to_line would use). None when it can't be read cheaply (escaped characters, key seen
+    twice, non-string id): decode the payload then.
+    """
+    n = payload.count(_DEVICE_KEY)
+    if n == 0:
+        return "unknown"
+    m = _DEVICE_RE.search(payload) if n == 1 else None
+    if m is None:
+        return None
+    try:
+        return m.group(1).decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _anchor(records: list) -> dict:
+    # one offset per device per batch, anchored on its newest uptime sample like the columnar
+    # path; looked up sample by sample, a batch spanning more than max_lag_ms would re-anchor
+    # on every sample and collapse onto one timestamp
+    newest = {}
+    for rec in records:
+        if isinstance(rec, dict):
+            ts_ms = rec.get("ts_ms")
+            if isinstance(ts_ms, (int, float)) and 1 <= ts_ms < 1_600_000_000_000:
+                d = str(rec.get("device_id", "unknown"))
+                newest[d] = max(newest.get(d, 0), int(ts_ms))
+    now_ms = time.time_ns() // 1_000_000
+    return {d: clock.offset(d, up, now_ms) for d, up in newest.items()}
+
+
+def encode_records(records: list):
+    """
+    Validate/encode a batch in one pass.
+    Returns (lines, [{"index": i, "error": msg}, ...]) for the rejected records.
+    """
+    if columnar is not None and len(records) >= columnar.COLUMNAR_MIN_BATCH:
+        return columnar.encode_records_columnar(records, clock)
+    offsets = _anchor(records) if clock is not None and len(records) > 1 else None
+    lines, errors = [], []
+    for i, rec in enumerate(records):
+        if isinstance(rec, Exception):  # NDJSON line that did not parse
+            errors.append({"index": i, "error": str(rec)})
+            continue
+        try:
+            lines.append(to_line(rec, offsets))
+        except (ValueError, TypeError, OverflowError) as e:
+            errors.append({"index": i, "error": str(e)})
+    return lines, errors
+
+
+def _gunzip(body: bytes, limit: int) -> bytes:
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = d.decompress(body, limit)
+    if d.unconsumed_tail:
+        raise ValueError(f"decompressed body larger than {limit} bytes")
+    return out
+
+
+def decode_bulk(
+    body: bytes, content_type: str = "", content_encoding: str = ""
+) -> list:
+    """
+    Body -> list of records. Accepts a JSON array, a single JSON object, NDJSON
+    (one object per line) or a binary telemetry frame, optionally gzip-compressed.
+    A bad NDJSON line becomes an Exception entry so the caller can report its index
+    without failing the whole batch.
+    """
+    if (
+        "gzip" in content_encoding.lower()
+        or "gzip" in content_type.lower()
+        or body[:2] == b"\x1f\x8b"
+    ):
+        body = _gunzip(body, BULK_MAX_BYTES)
+    if codec.is_binary_content_type(content_type) or codec.looks_binary(body):
+        return codec.decode_frame(body)
+    text = body.decode("utf-8")
+    if "ndjson" not in content_type.lower() and "jsonlines" not in content_type.lower():
+        head = text.lstrip()[:1]
+        if head == "[":
+            return json.loads(text)
+        if head == "{":
+            try:
+                return [json.loads(text)]
+            except ValueError:
+                pass  # "Extra data": more than one object -> NDJSON
+    records = []
+    for ln in text.splitlines():
+        if not ln.strip():
+            continue
+        try:
+            records.append(json.loads(ln))
+        except ValueError as e:
+            records.append(e)
+    return records
+
+
+def decode_and_encode(body: bytes, content_type: str = "", content_encoding: str = ""):
+    """Bulk body -> (record_count, lines, errors); binary frames skip the per-sample dicts."""
+    if columnar is not None and not content_encoding and codec.looks_binary(body):
+        lines = columnar.encode_frame_columnar(body, clock)
+        return len(lines), lines, []
+    records = decode_bulk(body, content_type, content_encoding)
+    lines, errors = encode_records(records)
+    return len(records), lines, errors
@@ -0,0 +1,479 @@
+import bisect
+import threading
+import time
+from collections.abc import Callable, Sequence
+
+# Minimal Prometheus-style metrics (text exposition format 0.0.4) for the proxies' /metrics
+# endpoint, plus a rate-limited logger that replaces per-message prints on the hot path.
+# Hot paths resolve their label children once (`c = counter.labels(transport="mqtt")`) and
+# then only pay for a lock + add per update.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; decode of one message is ~10-100 us, an Influx Cloud write ~50-500 ms
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return (
+        repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+    )
+
+
+def _label_str(names: Sequence[str], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# ================= METRIC TYPES =================
+class _Metric:
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        new_child: Callable[[], object],
+    ):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._new_child = new_child
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # unlabelled series show up as 0 before first use
+            self._children[()] = self._new_child()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # unlabelled metrics are used directly: counter.inc(), hist.observe(v)
+        return self.labels()
+
+    def dump(self) -> list:
+        """[[label values, value], ...], plain data for another process (see Registry.merge)."""
+        return [
+            [list(key), child.dump()] for key, child in list(self._children.items())
+        ]
+
+    def render(self, dumped: list | None = None) -> list[str]:
+        children = self._children
+        if dumped is not None:
+            children = {}
+            for key, v in dumped:
+                children[tuple(key)] = child = self._new_child()
+                child.load(v)
+            if not self.labelnames:
+                children.setdefault((), self._new_child())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(children.items()):
+            out.extend(self._render_child(key, child))
+        return out
+
+
+class _Value:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n: float = 1):
+        with self._lock:
+            self.value += n
+
+    def set(self, v: float):
+        self.value = v
+
+    def dump(self) -> float:
+        return self.value
+
+    def load(self, v: float):
+        self.value = v
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames, _Value)
+
+    def inc(self, n: float = 1):
+        self._default().inc(n)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_label_str(self.labelnames, key)} {_fmt(child.value)}"]
+
+
+class Gauge(_Metric):
+    """Set directly, or give `fn` to sample the value at scrape time (queue depth etc.)."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        fn: Callable[[], float] | None = None,
+    ):
+        self.fn = fn
+        super().__init__(name, help, labelnames, _Value)
+
+    def set(self, v: float):
+        self._default().set(v)
+
+    def _sample(self):
+        if self.fn is not None:
+            try:
+                self._default().set(self.fn())
+            except Exception:
+                pass
+
+    def dump(self) -> list:
+        self._sample()
+        return super().dump()
+
+    def render(self, dumped: list | None = None) -> list[str]:
+        if dumped is None:
+            self._sample()
+        return super().render(dumped)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_label_str(self.labelnames, key)} {_fmt(child.value)}"]
+
+
+class _HistogramValue:
+    __slots__ = ("_lock", "bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, v: float):
+        i = bisect.bisect_left(self.bounds, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+
+    def time(self):
+        return _Timer(self)
+
+    def dump(self) -> list:
+        with self._lock:
+            return [list(self.counts), self.sum]
+
+    def load(self, v: list):
+        self.counts, self.sum = list(v[0]), v[1]
+
+
+class _Timer:
+    __slots__ = ("_h", "_t0")
+
+    def __init__(self, h: _HistogramValue):
+        self._h = h
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._h.observe(time.perf_counter() - self._t0)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, lambda: _HistogramValue(self.buckets))
+
+    def observe(self, v: float):
+        self._default().observe(v)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, key, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        out, acc = [], 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            acc += n
+            le = 'le="' + _fmt(bound) + '"'
+            out.append(
+                f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {acc}"
+            )
+        labels = _label_str(self.labelnames, key)
+        out.append(f"{self.name}_sum{labels} {_fmt(total)}")
+        out.append(f"{self.name}_count{labels} {acc}")
+        return out
+
+
+# ================= REGISTRY =================
+def _add(a, b):
+    if isinstance(a, list):  # histogram: [bucket counts, sum]
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1]]
+    return a + b
+
+
+class Registry:
+    """
+    Metrics of this process. Under supervisor.py each worker sends `dump()` with its stats
+    report and the supervisor serves `render(merge(dumps))`, one endpoint for the whole fleet.
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def _add(self, m: _Metric):
+        self._metrics.append(m)
+        return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(
+        self, name: str, help: str, labelnames: Sequence[str] = (), fn=None
+    ) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, fn))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets=LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def dump(self) -> dict[str, list]:
+        return {m.name: m.dump() for m in self._metrics}
+
+    def merge(self, dumps, cumulative_only: bool = False) -> dict[str, list]:
+        """
+        Sum dumps series by series (counters, gauges and histogram buckets all add up across
+        workers). `cumulative_only` leaves gauges out: what a dead worker had counted.
+        """
+        kinds = {m.name: m.kind for m in self._metrics}
+        acc: dict[str, dict[tuple, object]] = {}
+        for d in dumps:
+            for name, rows in (d or {}).items():
+                if name not in kinds or (cumulative_only and kinds[name] == "gauge"):
+                    continue
+                series = acc.setdefault(name, {})
+                for key, v in rows:
+                    key = tuple(key)
+                    series[key] = _add(series[key], v) if key in series else v
+        return {
+            name: [[list(k), v] for k, v in series.items()]
+            for name, series in acc.items()
+        }
+
+    def render(self, dumped: dict[str, list] | None = None) -> str:
+        """This process's metrics, or the given (merged) dump rendered with the same definitions."""
+        out: list[str] = []
+        for m in self._metrics:
+            out.extend(m.render(None if dumped is None else dumped.get(m.name, [])))
+        return "\n".join(out) + "\n"
+
+
+# ================= LOGGING =================
+def _logval(v) -> str:
+    v = str(v)
+    return '"' + v.replace('"', "'") + '"' if " " in v or not v else v
+
+
+class RateLimitedLog:
+    """
+    print()-style logging for hot paths: each key logs at most once per `interval` seconds,
+    the next line it is allowed to print carries how many were suppressed in between.
+    Lines are "[TAG] event k=v k=v" so they stay greppable: log.log("[MQTT]", "-> Influx", samples=n).
+    """
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._next: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def log(self, tag: str, event: str, **fields):
+        key = f"{tag}|{event}"
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next.get(key, 0.0):
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return
+            self._next[key] = now + self.interval
+            skipped = self._suppressed.pop(key, 0)
+        kv = " ".join(f"{k}={_logval(v)}" for k, v in fields.items())
+        more = f" (+{skipped} suppressed)" if skipped else ""
+        print(f"{tag} {event}{' ' + kv if kv else ''}{more}")
+
+
+# ================= PROXY METRICS =================
+# Shared by data_proxy.py and data_proxy_async.py; each proxy binds the queue gauges to its
+# own writer/spool at startup (QUEUE_DEPTH.fn = ...).
+REGISTRY = Registry()
+MESSAGES = REGISTRY.counter(
+    "smartart_messages_total", "Ingest messages/requests received", ["transport"]
+)
+SAMPLES = REGISTRY.counter(
+    "smartart_samples_received_total",
+    "Samples received (decoded or not)",
+    ["transport"],
+)
+ACCEPTED = REGISTRY.counter(
+    "smartart_samples_accepted_total", "Samples handed to the write path", ["transport"]
+)
+INVALID = REGISTRY.counter(
+    "smartart_validation_failures_total",
+    "Samples or messages rejected by decode/validation",
+    ["transport"],
+)
+DROPPED = REGISTRY.counter(
+    "smartart_samples_dropped_total",
+    "Valid samples dropped because the write queue was full",
+    ["transport"],
+)
+DECODE = REGISTRY.histogram(
+    "smartart_decode_seconds",
+    "Payload decode + validate + line-protocol encode time",
+    ["transport"],
+)
+MQTT_CONNECTS = REGISTRY.counter(
+    "smartart_mqtt_connects_total", "Successful MQTT (re)connects"
+)
+MQTT_RECONNECTS = REGISTRY.counter(
+    "smartart_mqtt_reconnects_total",
+    "MQTT connection losses / failed connects followed by a retry",
+)
+INFLUX_WRITE = REGISTRY.histogram(
+    "smartart_influx_write_seconds", "Influx write round-trip per batch"
+)
+INFLUX_ERRORS = REGISTRY.counter(
+    "smartart_influx_write_errors_total", "Failed Influx batch writes (retried)"
+)
+BATCH_LINES = REGISTRY.histogram(
+    "smartart_influx_batch_lines", "Lines per Influx write", buckets=SIZE_BUCKETS
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "smartart_write_queue_depth", "Lines waiting in the in-memory batch writer"
+)
+SPOOL_PENDING = REGISTRY.gauge(
+    "smartart_spool_pending_bytes", "Spooled bytes not yet written to Influx"
+)
+DUPLICATES = REGISTRY.counter(
+    "smartart_duplicates_dropped_total",
+    "Exact re-sent lines dropped before the write path",
+)
+REORDER_HELD = REGISTRY.gauge(
+    "smartart_reorder_buffered_lines", "Lines held in the reorder window"
+)
+
+
+class TransportMetrics:
+    """Label children for one transport, resolved once so the hot path skips the lookup."""
+
+    def __init__(self, transport: str):
+        self.messages = MESSAGES.labels(transport=transport)
+        self.samples = SAMPLES.labels(transport=transport)
+        self.accepted = ACCEPTED.labels(transport=transport)
+        self.invalid = INVALID.labels(transport=transport)
+        self.dropped = DROPPED.labels(transport=transport)
+        self.decode = DECODE.labels(transport=transport)
+
+    def record(self, received: int, encoded: int, accepted: int, decode_s: float):
+        self.messages.inc()
+        self.samples.inc(received)
+        self.decode.observe(decode_s)
+        if accepted:
+            self.accepted.inc(accepted)
+        if encoded < received:
+            self.invalid.inc(received - encoded)
+        if accepted < encoded:
+            self.dropped.inc(encoded - accepted)
+
+    def failed(self, decode_s: float):
+        """Whole message unreadable (bad JSON, bad frame, ...)."""
+        self.messages.inc()
+        self.samples.inc()
+        self.invalid.inc()
+        self.decode.observe(decode_s)
+
+
+TRANSPORTS = {t: TransportMetrics(t) for t in ("mqtt", "mqtt_bin", "http", "http_bulk")}
+
+
+def timed_sink(sink):
+    """Wrap a blocking `sink(lines)` with write-latency, batch-size and error metrics."""
+
+    def wrapped(lines):
+        t0 = time.perf_counter()
+        try:
+            sink(lines)
+        except Exception:
+            INFLUX_ERRORS.inc()
+            raise
+        INFLUX_WRITE.observe(time.perf_counter() - t0)
+        BATCH_LINES.observe(len(lines))
+
+    return wrapped
+
+
+def timed_async_sink(sink):
+    """Same as timed_sink for a coroutine sink (data_proxy_async.py)."""
+
+    async def wrapped(lines):
+        t0 = time.perf_counter()
+        try:
+            await sink(lines)
+        except Exception:
+            INFLUX_ERRORS.inc()
+            raise
+        INFLUX_WRITE.observe(time.perf_counter() - t0)
+        BATCH_LINES.observe(len(lines))
+
+    return wrapped
@@ -0,0 +1,379 @@
+import os
+import threading
+import time
+from collections.abc import Callable
+
+SEG_PREFIX = "seg-"
+SEG_SUFFIX = ".lp"
+ACK_FILE = "ack"
+QUARANTINE_FILE = "quarantine.lp"
+
+Cursor = tuple[int, int]  # (segment id, byte offset inside that segment)
+
+# ================= REJECTED LINES =================
+# HTTP statuses where Influx refused the data itself (bad line, body too large, field type
+# conflict): retrying the same lines can never succeed. Auth / missing bucket (401/403/404),
+# 429 and 5xx are retried, since dropping everything on a config error would be worse.
+REJECT_STATUSES = (400, 413, 422)
+
+
+def rejected_by_sink(e: Exception) -> bool:
+    # influxdb_client's ApiException and influx_writer.InfluxWriteError both carry .status
+    return getattr(e, "status", None) in REJECT_STATUSES
+
+
+def bisect_write(sink: Callable[[list[str]], None], lines: list[str]) -> list[str]:
+    """
+    sink(lines), splitting a batch the sink rejects until the bad lines are isolated; returns
+    them (the rest is written). Other errors propagate, re-writing a half already stored is
+    harmless (same series + timestamp overwrites).
+    """
+    try:
+        sink(lines)
+        return []
+    except Exception as e:
+        if not rejected_by_sink(e):
+            raise
+        if len(lines) == 1:
+            return list(lines)
+    mid = len(lines) // 2
+    return bisect_write(sink, lines[:mid]) + bisect_write(sink, lines[mid:])
+
+
+async def bisect_write_async(sink, lines: list[str]) -> list[str]:
+    """bisect_write for a coroutine sink (data_proxy_async.py)."""
+    try:
+        await sink(lines)
+        return []
+    except Exception as e:
+        if not rejected_by_sink(e):
+            raise
+        if len(lines) == 1:
+            return list(lines)
+    mid = len(lines) // 2
+    return await bisect_write_async(sink, lines[:mid]) + await bisect_write_async(
+        sink, lines[mid:]
+    )
+
+
+# ================= SPOOL =================
+class Spool:
+    """
+    Append-only, segment-rotated write-ahead log of line-protocol strings.
+    Producers `append()` (a local file write, never the network); a reader takes batches with
+    `read()` and confirms them with `ack(cursor)`. Fully acknowledged segments are deleted.
+    The ack cursor is persisted, so after a restart replay resumes from the last acknowledged line
+    (at-least-once). When the directory grows past `max_bytes` the oldest segments are dropped.
+    A tail left unterminated by a crash mid-append is cut on open; lines the sink rejects for
+    good go to `quarantine()` (a separate file, not replayed).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 8 << 20,
+        max_bytes: int = 512 << 20,
+        fsync: bool = False,
+    ):
+        self.directory = directory
+        self.segment_bytes = int(segment_bytes)
+        self.max_bytes = max(int(max_bytes), self.segment_bytes)
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sizes: dict[int, int] = {}
+        for name in os.listdir(directory):
+            if name.startswith(SEG_PREFIX) and name.endswith(SEG_SUFFIX):
+                seg = int(name[len(SEG_PREFIX) : -len(SEG_SUFFIX)])
+                self._sizes[seg] = os.path.getsize(self._path(seg))
+        if not self._sizes:
+            self._sizes[1] = 0
+        self._active_id = max(self._sizes)
+        self._sizes[self._active_id] = self._truncate_torn(self._active_id)
+        # append handle stays open; closed by _rotate() / close()
+        self._active = open(self._path(self._active_id), "ab")  # noqa: SIM115
+
+        self._ack = self._load_ack()
+        self._read = self._ack
+        self._counters = {
+            "appended": 0,
+            "acked": 0,
+            "dropped_segments": 0,
+            "dropped_bytes": 0,
+            "quarantined": 0,
+        }
+
+    # ---- files ----
+    def _path(self, seg: int) -> str:
+        return os.path.join(self.directory, f"{SEG_PREFIX}{seg:08d}{SEG_SUFFIX}")
+
+    def _truncate_torn(self, seg: int) -> int:
+        # only the active segment can end mid-line; cut back to its last newline so the next
+        # append doesn't get glued onto the partial line. Returns the new size.
+        size = self._sizes.get(seg, 0)
+        keep, end = 0, size
+        with open(self._path(seg), "r+b" if size else "ab") as f:
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                i = f.read(end - start).rfind(b"\n")
+                if i >= 0:
+                    keep = start + i + 1
+                    break
+                end = start
+            if keep < size:
+                f.truncate(keep)
+                print(
+                    f"[SPOOL] segment {seg}: cut {size - keep} bytes of unterminated tail"
+                )
+        return keep
+
+    def _load_ack(self) -> Cursor:
+        first = min(self._sizes)
+        try:
+            with open(
+                os.path.join(self.directory, ACK_FILE), "r", encoding="utf-8"
+            ) as f:
+                seg, off = (int(x) for x in f.read().split())
+        except (OSError, ValueError):
+            return first, 0
+        if seg not in self._sizes:
+            return min((s for s in self._sizes if s > seg), default=first), 0
+        return seg, min(off, self._sizes[seg])
+
+    def _store_ack(self):
+        tmp = os.path.join(self.directory, ACK_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(f"{self._ack[0]} {self._ack[1]}")
+        os.replace(tmp, os.path.join(self.directory, ACK_FILE))
+
+    def _rotate(self):
+        self._active.close()
+        self._active_id += 1
+        self._sizes[self._active_id] = 0
+        # append handle stays open; closed by _rotate() / close()
+        self._active = open(self._path(self._active_id), "ab")  # noqa: SIM115
+
+    def _drop_segment(self, seg: int):
+        size = self._sizes.pop(seg)
+        try:
+            os.remove(self._path(seg))
+        except OSError:
+            pass
+        return size
+
+    # ---- producers ----
+    def append(self, lines: list[str]) -> int:
+        if not lines:
+            return 0
+        blob = ("\n".join(lines) + "\n").encode("utf-8")
+        with self._lock:
+            if (
+                self._sizes[self._active_id]
+                and self._sizes[self._active_id] + len(blob) > self.segment_bytes
+            ):
+                self._rotate()
+            self._active.write(blob)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            self._sizes[self._active_id] += len(blob)
+            self._counters["appended"] += len(lines)
+            self._enforce_budget()
+        return len(lines)
+
+    def _enforce_budget(self):
+        # capped disk: sacrifice the oldest data rather than fill the SD card / VM disk
+        while sum(self._sizes.values()) > self.max_bytes and len(self._sizes) > 1:
+            oldest = min(self._sizes)
+            self._counters["dropped_bytes"] += self._drop_segment(oldest)
+            self._counters["dropped_segments"] += 1
+            print(f"[SPOOL] disk budget exceeded, dropped segment {oldest}")
+            nxt = min(self._sizes)
+            if self._ack[0] <= oldest:
+                self._ack = (nxt, 0)
+                self._store_ack()
+            if self._read[0] <= oldest:
+                self._read = (nxt, 0)
+
+    # ---- reader ----
+    def read(self, max_lines: int) -> tuple[list[str], Cursor]:
+        """Next batch after the read cursor; pass the returned cursor to ack() once it is stored."""
+        out: list[str] = []
+        with self._lock:
+            seg, off = self._read
+            while len(out) < max_lines:
+                if seg not in self._sizes:
+                    break
+                torn = False
+                with open(self._path(seg), "rb") as f:
+                    f.seek(off)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            torn = True  # unterminated tail: still being written, or cut by a crash
+                            break
+                        off += len(raw)
+                        ln = raw.decode("utf-8").rstrip("\n")
+                        if ln:
+                            out.append(ln)
+                        if len(out) >= max_lines:
+                            break
+                if (
+                    len(out) >= max_lines
+                    or seg == self._active_id
+                    or (off < self._sizes[seg] and not torn)
+                ):
+                    break
+                seg, off = seg + 1, 0
+            self._read = (seg, off)
+            return out, (seg, off)
+
+    def ack(self, cursor: Cursor, n_lines: int = 0):
+        """Everything before `cursor` is stored downstream; compact the segments it covers."""
+        with self._lock:
+            if cursor <= self._ack:
+                return
+            seg, off = cursor
+            for old in [s for s in self._sizes if s < seg]:
+                self._drop_segment(old)
+            done = seg in self._sizes and off >= self._sizes[seg]
+            if done and seg == self._active_id and off >= self.segment_bytes // 2:
+                self._rotate()  # a mostly full, fully acked active segment is worth compacting too
+            if done and seg != self._active_id:
+                self._drop_segment(seg)
+                seg, off = min(self._sizes), 0
+                if self._read[0] not in self._sizes:
+                    self._read = (seg, 0)
+            self._ack = (seg, off)
+            self._store_ack()
+            self._counters["acked"] += n_lines
+
+    def quarantine(self, lines: list[str]):
+        """Keep lines the sink refused for good (bad line protocol) out of replay, for inspection."""
+        with self._lock:
+            with open(os.path.join(self.directory, QUARANTINE_FILE), "ab") as f:
+                f.write(("\n".join(lines) + "\n").encode("utf-8"))
+            self._counters["quarantined"] += len(lines)
+
+    def rewind(self):
+        """Forget un-acked reads (e.g. the sink failed) so they are read again."""
+        with self._lock:
+            self._read = self._ack
+
+    def _pending(self) -> int:
+        seg, off = self._ack
+        return sum(size for s, size in self._sizes.items() if s >= seg) - off
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            return self._pending()
+
+    def close(self):
+        with self._lock:
+            self._active.close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            s = dict(self._counters)
+            s["segments"] = len(self._sizes)
+            s["bytes"] = sum(self._sizes.values())
+            s["pending_bytes"] = self._pending()
+            return s
+
+
+# ================= REPLAY =================
+class SpoolReplayer:
+    """
+    Background worker that drains a Spool into `sink(lines)` in large batches.
+    On sink errors it rewinds and backs off (doubling up to `max_backoff`), so an Influx outage
+    only grows the spool; producers keep appending at local-disk speed. A batch Influx rejects
+    as bad data (REJECT_STATUSES) is bisected: the bad lines are quarantined, the rest written.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        sink: Callable[[list[str]], None],
+        batch_size: int = 5000,
+        idle_interval: float = 0.5,
+        retry_delay: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.spool = spool
+        self.sink = sink
+        self.batch_size = int(batch_size)
+        self.idle_interval = idle_interval
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._drain = False
+        self._counters = {
+            "written": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "quarantined": 0,
+        }
+        self._lat_last_ms = 0.0
+        self._lat_sum_ms = 0.0
+        self._lat_max_ms = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name="spool-replay", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        backoff = self.retry_delay
+        while True:
+            if self._stop.is_set() and not self._drain:
+                return
+            lines, cursor = self.spool.read(self.batch_size)
+            if not lines:
+                if self._stop.is_set():
+                    return
+                self._stop.wait(self.idle_interval)
+                continue
+            t0 = time.perf_counter()
+            try:
+                bad = bisect_write(self.sink, lines)
+            except Exception as e:
+                self.spool.rewind()
+                self._counters["flush_errors"] += 1
+                print(
+                    f"[SPOOL][ERR] replay of {len(lines)} lines failed, retry in {backoff:.1f}s: {e}"
+                )
+                if self._stop.wait(backoff):
+                    return  # shutting down: the lines stay on disk for the next start
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            ms = (time.perf_counter() - t0) * 1000.0
+            if bad:
+                self.spool.quarantine(bad)
+                self._counters["quarantined"] += len(bad)
+                print(
+                    f"[SPOOL][ERR] Influx rejected {len(bad)} of {len(lines)} lines, quarantined: {bad[0][:200]}"
+                )
+            self.spool.ack(cursor, len(lines))
+            backoff = self.retry_delay
+            self._counters["written"] += len(lines) - len(bad)
+            self._counters["flushes"] += 1
+            self._lat_last_ms = ms
+            self._lat_sum_ms += ms
+            self._lat_max_ms = max(self._lat_max_ms, ms)
+
+    def close(self, timeout: float = 10.0, drain: bool = True):
+        """Stop the worker; with `drain` it first tries to empty the spool (bounded by `timeout`)."""
+        self._drain = drain
+        self._stop.set()
+        self._thread.join(timeout)
+        self._drain = False
+        self._thread.join(1.0)
+
+    def stats(self) -> dict[str, float]:
+        s: dict[str, float] = dict(self._counters)
+        s["flush_latency_last_ms"] = round(self._lat_last_ms, 3)
+        s["flush_latency_avg_ms"] = (
+            round(self._lat_sum_ms / s["flushes"], 3) if s["flushes"] else 0.0
+        )
+        s["flush_latency_max_ms"] = round(self._lat_max_ms, 3)
+        return s
@@ -0,0 +1,254 @@
+import asyncio
+import gzip
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-ins for benchmarking the proxy without Influx Cloud or a real broker:
+#   FakeInflux - HTTP server implementing POST /api/v2/write (line protocol), records per-line
+#                write latency from the line's ns timestamp to arrival
+#   FakeBroker - minimal MQTT 3.1.1 / 5 broker (QoS 0 delivery, QoS 1 publishes are PUBACKed,
+#                + / # wildcards, $share/<group>/ round-robin), enough for paho/aiomqtt clients;
+#                v5 properties are skipped on the way in and sent empty
+
+
+# ================= FAKE INFLUX =================
+class FakeInflux:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay_s: float = 0.0):
+        self.delay_s = delay_s  # simulated Influx Cloud round-trip
+        self.lines = 0
+        self.requests = 0
+        self.latencies_ms: list[float] = []
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding", "") == "gzip":
+                    body = gzip.decompress(body)
+                if outer.delay_s:
+                    time.sleep(outer.delay_s)
+                outer._record(body, time.time_ns())
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def _record(self, body: bytes, now_ns: int):
+        lat = []
+        for ln in body.splitlines():
+            ts = ln.rsplit(b" ", 1)[-1]
+            if ts.isdigit():
+                lat.append((now_ns - int(ts)) / 1e6)
+        with self._lock:
+            self.requests += 1
+            self.lines += len(lat)
+            self.latencies_ms.extend(lat)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def reset(self):
+        with self._lock:
+            self.lines = 0
+            self.requests = 0
+            self.latencies_ms = []
+
+    def stop(self):
+        self.server.shutdown()
+
+
+# ================= FAKE BROKER =================
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b, n = n % 128, n // 128
+        out.append(b | (0x80 if n else 0))
+        if not n:
+            return bytes(out)
+
+
+def _read_varint(buf: bytes, off: int):
+    mult, n = 1, 0
+    while True:
+        b = buf[off]
+        off += 1
+        n += (b & 0x7F) * mult
+        mult *= 128
+        if not b & 0x80:
+            return n, off
+
+
+def _skip_props(buf: bytes, off: int) -> int:
+    n, off = _read_varint(buf, off)
+    return off + n
+
+
+def _topic_matches(flt: str, topic: str) -> bool:
+    f, t = flt.split("/"), topic.split("/")
+    for i, part in enumerate(f):
+        if part == "#":
+            return True
+        if i >= len(t) or (part != "+" and part != t[i]):
+            return False
+    return len(f) == len(t)
+
+
+class FakeBroker:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host, self.port = host, port
+        self.published = 0
+        self._subs: dict[asyncio.StreamWriter, list[str]] = {}
+        # clients that connected with MQTT 5
+        self._v5: set[asyncio.StreamWriter] = set()
+        # "group|filter" -> members
+        self._shared: dict[str, list[asyncio.StreamWriter]] = {}
+        self._rr: dict[str, int] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._thread_obj: threading.Thread | None = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self._thread_obj = threading.Thread(target=self._thread, daemon=True)
+        self._thread_obj.start()
+        self._ready.wait(5)
+        return self
+
+    def _thread(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._client, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop.stop()
+
+    def stop(self):
+        # cancel client handlers on the broker loop so their writers close before the loop does
+        if self._loop and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread_obj.join(5)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                hdr = await reader.readexactly(1)
+                mult, length = 1, 0
+                while True:
+                    b = (await reader.readexactly(1))[0]
+                    length += (b & 0x7F) * mult
+                    mult *= 128
+                    if not b & 0x80:
+                        break
+                body = await reader.readexactly(length) if length else b""
+                ptype, flags = hdr[0] >> 4, hdr[0] & 0x0F
+                v5 = writer in self._v5
+                if ptype == 1:  # CONNECT
+                    level = body[
+                        2 + struct.unpack_from("!H", body)[0]
+                    ]  # after the protocol name
+                    if level == 5:
+                        self._v5.add(writer)
+                        writer.write(b"\x20\x03\x00\x00\x00")  # + empty properties
+                    else:
+                        writer.write(b"\x20\x02\x00\x00")
+                elif ptype == 3:  # PUBLISH
+                    tlen = struct.unpack_from("!H", body)[0]
+                    topic = body[2 : 2 + tlen].decode("utf-8")
+                    off = 2 + tlen
+                    qos = (flags >> 1) & 3
+                    if qos:
+                        # PUBACK (v5: reason code omitted = success)
+                        writer.write(b"\x40\x02" + body[off : off + 2])
+                        off += 2
+                    if v5:
+                        off = _skip_props(body, off)
+                    self._route(topic, body[off:])
+                elif ptype == 8:  # SUBSCRIBE
+                    pid, off, granted = body[:2], 2, bytearray()
+                    if v5:
+                        off = _skip_props(body, off)
+                    while off < len(body):
+                        flen = struct.unpack_from("!H", body, off)[0]
+                        self._subscribe(
+                            writer, body[off + 2 : off + 2 + flen].decode("utf-8")
+                        )
+                        off += 2 + flen + 1  # + options byte
+                        granted.append(0)
+                    props = b"\x00" if v5 else b""
+                    writer.write(
+                        b"\x90"
+                        + _varint(2 + len(props) + len(granted))
+                        + pid
+                        + props
+                        + bytes(granted)
+                    )
+                elif ptype == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif ptype == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subs.pop(writer, None)
+            self._v5.discard(writer)
+            for members in self._shared.values():
+                if writer in members:
+                    members.remove(writer)
+            writer.close()
+
+    def _subscribe(self, writer: asyncio.StreamWriter, flt: str):
+        if flt.startswith("$share/"):
+            _, group, real = flt.split("/", 2)
+            self._shared.setdefault(f"{group}|{real}", []).append(writer)
+        else:
+            self._subs.setdefault(writer, []).append(flt)
+
+    def _route(self, topic: str, payload: bytes):
+        self.published += 1
+        t = topic.encode("utf-8")
+        pkt = (
+            b"\x30"
+            + _varint(2 + len(t) + len(payload))
+            + struct.pack("!H", len(t))
+            + t
+            + payload
+        )
+        pkt5 = (
+            b"\x30"
+            + _varint(3 + len(t) + len(payload))
+            + struct.pack("!H", len(t))
+            + t
+            + b"\x00"
+            + payload
+        )
+        for w, filters in list(self._subs.items()):
+            if any(_topic_matches(f, topic) for f in filters):
+                w.write(pkt5 if w in self._v5 else pkt)
+        for key, members in self._shared.items():
+            if members and _topic_matches(key.split("|", 1)[1], topic):
+                i = self._rr.get(key, 0) % len(members)
+                self._rr[key] = i + 1
+                members[i].write(pkt5 if members[i] in self._v5 else pkt)
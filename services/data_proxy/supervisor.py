@@ -0,0 +1,226 @@
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import SHARD_MODE, STATS_INTERVAL_S, SUPERVISOR_PORT, WORKERS
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import REGISTRY
+
+# Supervisor mode: N ingest processes, each a full data_proxy_async instance with its own
+# batched writer/spool. MQTT load is split by shared subscriptions (or device hashing),
+# HTTP by SO_REUSEPORT on the shared port. The supervisor restarts dead workers and
+# aggregates their periodic stats reports; each report carries the worker's metrics too, so
+# one /metrics here covers the whole fleet.
+
+RESTART_DELAY_S = 2.0
+
+
+def _worker(idx: int, n: int, reports):
+    import data_proxy_async as proxy
+
+    def report(stats, metrics=None):
+        try:
+            reports.put_nowait((idx, time.time(), stats, metrics))
+        except queue.Full:
+            pass
+
+    try:
+        asyncio.run(proxy.main(idx, n, report=report))
+    except KeyboardInterrupt:
+        pass
+
+
+def _merge(total: dict, part: dict):
+    """Sum counters across workers; latencies and sizes take the max instead."""
+    for k, v in part.items():
+        if isinstance(v, dict):
+            _merge(total.setdefault(k, {}), v)
+        elif (
+            isinstance(v, (int, float))
+            and not isinstance(v, bool)
+            and k not in ("worker", "pid")
+        ):
+            if "latency" in k or k.endswith("_max"):
+                total[k] = max(total.get(k, 0), v)
+            else:
+                total[k] = total.get(k, 0) + v
+
+
+class Supervisor:
+    def __init__(self, n_workers: int):
+        self.n = n_workers
+        self.ctx = mp.get_context("spawn")
+        self.reports = self.ctx.Queue(maxsize=1000)
+        self.procs = {}
+        self.latest = {}  # idx -> (report time, stats, metrics dump)
+        # counters/histograms of workers that died, so totals never go back
+        self.retired = {}
+        self.restarts = {i: 0 for i in range(n_workers)}
+        self.rate = 0.0  # samples/s over the last report interval
+        self._last_total = None
+        self._lock = threading.Lock()
+
+    def _spawn(self, idx: int):
+        p = self.ctx.Process(
+            target=_worker, args=(idx, self.n, self.reports), name=f"ingest-{idx}"
+        )
+        p.start()
+        self.procs[idx] = p
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total: dict = {}
+            for _, s, _ in self.latest.values():
+                _merge(total, s)
+            now = time.time()
+            workers = [
+                {
+                    "worker": i,
+                    "pid": p.pid,
+                    "alive": p.is_alive(),
+                    "restarts": self.restarts[i],
+                    "last_report_s": (
+                        round(now - self.latest[i][0], 1) if i in self.latest else None
+                    ),
+                }
+                for i, p in sorted(self.procs.items())
+            ]
+            healthy = all(
+                w["alive"]
+                and w["last_report_s"] is not None
+                and w["last_report_s"] < 3 * STATS_INTERVAL_S
+                for w in workers
+            )
+            return {
+                "ok": healthy,
+                "workers": workers,
+                "shard_mode": SHARD_MODE,
+                "samples_per_s": round(self.rate, 1),
+                "total": total,
+            }
+
+    def render_metrics(self) -> str:
+        with self._lock:
+            dumps = [self.retired] + [m for _, _, m in self.latest.values()]
+        return REGISTRY.render(REGISTRY.merge(dumps))
+
+    def _retire(self, idx: int):
+        # the replacement starts counting from 0: keep what the dead one counted
+        with self._lock:
+            if idx in self.latest:
+                ts, stats, dumped = self.latest[idx]
+                self.retired = REGISTRY.merge(
+                    [self.retired, dumped], cumulative_only=True
+                )
+                self.latest[idx] = (ts, stats, None)
+
+    def _drain_reports(self, timeout: float):
+        try:
+            idx, ts, stats, dumped = self.reports.get(timeout=timeout)
+        except queue.Empty:
+            return
+        with self._lock:
+            self.latest[idx] = (ts, stats, dumped)
+            while True:
+                try:
+                    idx, ts, stats, dumped = self.reports.get_nowait()
+                except queue.Empty:
+                    break
+                self.latest[idx] = (ts, stats, dumped)
+
+    def run(self):
+        for i in range(self.n):
+            self._spawn(i)
+        _serve_stats(self)
+        print(
+            f"[SUPERVISOR] {self.n} workers, shard_mode={SHARD_MODE}, stats on :{SUPERVISOR_PORT}/stats, /metrics"
+        )
+        next_log = time.time() + STATS_INTERVAL_S
+        try:
+            while True:
+                self._drain_reports(timeout=1.0)
+                for i, p in list(self.procs.items()):
+                    if not p.is_alive():
+                        print(
+                            f"[SUPERVISOR] worker {i} exited (code {p.exitcode}), restarting"
+                        )
+                        self.restarts[i] += 1
+                        self._retire(i)
+                        time.sleep(RESTART_DELAY_S)
+                        self._spawn(i)
+                if time.time() >= next_log:
+                    self._log_throughput()
+                    next_log = time.time() + STATS_INTERVAL_S
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _log_throughput(self):
+        snap = self.snapshot()
+        samples = snap["total"].get("ingest", {}).get("samples", 0)
+        if self._last_total is not None:
+            t0, s0 = self._last_total
+            dt = time.time() - t0
+            with self._lock:
+                self.rate = (samples - s0) / dt if dt > 0 else 0.0
+        self._last_total = (time.time(), samples)
+        alive = sum(w["alive"] for w in snap["workers"])
+        print(
+            f"[SUPERVISOR] workers {alive}/{self.n}  samples={samples}  rate={self.rate:.0f}/s"
+        )
+
+    def stop(self, timeout: float = 15.0):
+        # workers got SIGINT/SIGTERM too: give them time to drain their writers
+        for p in self.procs.values():
+            if p.is_alive():
+                p.terminate()
+        deadline = time.time() + timeout
+        for p in self.procs.values():
+            p.join(max(0.1, deadline - time.time()))
+            if p.is_alive():
+                p.kill()
+
+
+def _serve_stats(sup: Supervisor):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(
+                    200, sup.render_metrics().encode("utf-8"), METRICS_CONTENT_TYPE
+                )
+                return
+            if self.path not in ("/stats", "/health"):
+                self.send_error(404)
+                return
+            snap = sup.snapshot()
+            body = json.dumps(
+                snap if self.path == "/stats" else {"ok": snap["ok"]}
+            ).encode("utf-8")
+            self._send(
+                200 if snap["ok"] or self.path == "/stats" else 503,
+                body,
+                "application/json",
+            )
+
+        def _send(self, code: int, body: bytes, ctype: str):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("0.0.0.0", SUPERVISOR_PORT), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+
+if __name__ == "__main__":
+    Supervisor(WORKERS or os.cpu_count() or 1).run()
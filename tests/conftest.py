@@ -0,0 +1,16 @@
+import os
+import sys
+
+# The services / bots are script-style directories (modules import their siblings by name),
+# so put each one on sys.path the way running it from its own directory would.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for d in (
+    "common",
+    "services/data_proxy",
+    "bots/telegram_feedback_bot",
+    "algorithms/user_engagement",
+    "visuals",
+):
+    p = os.path.join(ROOT, d)
+    if p not in sys.path:
+        sys.path.insert(0, p)
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import columnar
+import ingest
+from dedup import UptimeClock
+
+NOW_NS = 1_760_000_000_000_000_000
+
+
+def records():
+    out = []
+    for i in range(90):
+        dev = ("wall-1", "wall 2,a=b", "wall-ü")[i % 3]
+        rec = {
+            "device_id": dev,
+            "temp": 20 + i / 7,
+            "hum": 40.5,
+            "light": 100 + i + 0.9,
+            "motion": i % 2,
+        }
+        if i % 5 == 0:
+            rec["ts_ms"] = 1_750_000_000_000 + i  # epoch
+        elif i % 5 != 1:
+            # uptime, batch spans more than max_lag_ms
+            rec["ts_ms"] = 100_000 + 2000 * i
+        out.append(rec)  # i % 5 == 1: no timestamp
+    out[7] = {"device_id": "wall-1", "hum": 1, "light": 1, "motion": 0}  # missing temp
+    out[11]["light"] = "n/a"
+    out[13]["device_id"] = 42
+    out[17]["ts_ms"] = "soon"
+    return out
+
+
+def test_columnar_matches_scalar(monkeypatch):
+    monkeypatch.setattr(time, "time_ns", lambda: NOW_NS)
+    monkeypatch.setattr(ingest, "clock", UptimeClock(max_lag_ms=10_000))
+    monkeypatch.setattr(ingest, "columnar", None)
+    scalar_lines, scalar_errors = ingest.encode_records(records())
+    col_lines, col_errors = columnar.encode_records_columnar(
+        records(), UptimeClock(max_lag_ms=10_000)
+    )
+    assert col_lines == scalar_lines
+    assert (
+        [e["index"] for e in col_errors]
+        == [e["index"] for e in scalar_errors]
+        == [7, 11]
+    )
+
+
+def test_encode_records_picks_columnar_for_big_batches(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        columnar,
+        "encode_records_columnar",
+        lambda recs, clock: calls.append(len(recs)) or ([], []),
+    )
+    ingest.encode_records(records()[: columnar.COLUMNAR_MIN_BATCH - 1])
+    ingest.encode_records(records()[: columnar.COLUMNAR_MIN_BATCH])
+    assert calls == [columnar.COLUMNAR_MIN_BATCH]
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+from dedup import Deduper, ReorderBuffer, UptimeClock
+from influx_writer import AsyncBatchWriter, BatchWriter
+
+
+def line(i, ts):
+    return f"smartart,device_id=d{i} temp=1.0 {ts}"
+
+
+# ================= Deduper =================
+def test_fresh_does_not_record_until_remembered():
+    d = Deduper()
+    batch = [line(1, 10), line(2, 10)]
+    assert d.fresh(batch) == batch
+    assert d.fresh(batch) == batch  # refused by the write path: a re-send goes through
+    d.remember(batch[:1])
+    assert d.fresh(batch) == batch[1:]
+    assert d.dropped == 1
+
+
+def test_fresh_drops_duplicates_within_a_batch():
+    d = Deduper()
+    assert d.fresh([line(1, 10), line(1, 10), line(2, 10)]) == [
+        line(1, 10),
+        line(2, 10),
+    ]
+
+
+def test_ring_forgets_oldest():
+    d = Deduper(capacity=2)
+    d.remember([line(1, 1), line(2, 1), line(3, 1)])
+    assert d.fresh([line(1, 1), line(3, 1)]) == [line(1, 1)]
+
+
+def test_block_writer_accepts_a_prefix():
+    gate, written = threading.Event(), []
+
+    def sink(batch):
+        written.extend(batch)
+        gate.wait(5.0)  # Influx stalled: the queue stays full
+
+    w = BatchWriter(
+        sink, batch_size=2, flush_interval=10.0, max_queue=2, put_timeout=0.05
+    )
+    lines = [line(i, 1) for i in range(8)]
+    accepted = w.put_many(lines)
+    gate.set()
+    w.close()
+    assert 0 < accepted < len(lines)
+    assert written == lines[:accepted]
+    assert w.stats()["dropped"] == len(lines) - accepted
+
+
+def test_block_put_timeout_bounds_the_whole_call():
+    # a slow Influx frees a slot every 50 ms: each wait would succeed, but the call must
+    # still give up once put_timeout has passed
+    def sink(batch):
+        time.sleep(0.05)
+
+    w = BatchWriter(
+        sink, batch_size=1, flush_interval=10.0, max_queue=1, put_timeout=0.2
+    )
+    t0 = time.monotonic()
+    accepted = w.put_many([line(i, 1) for i in range(40)])
+    elapsed = time.monotonic() - t0
+    w.close()
+    assert elapsed < 0.35
+    assert 0 < accepted < 40
+
+
+def test_async_block_put_timeout_bounds_the_whole_call():
+    async def sink(batch):
+        await asyncio.sleep(0.05)
+
+    async def main():
+        w = AsyncBatchWriter(
+            sink, batch_size=1, flush_interval=10.0, max_queue=1, put_timeout=0.2
+        )
+        w.start()
+        t0 = time.monotonic()
+        accepted = await w.put_many([line(i, 1) for i in range(40)])
+        elapsed = time.monotonic() - t0
+        await w.close()
+        return accepted, elapsed
+
+    accepted, elapsed = asyncio.run(main())
+    assert elapsed < 0.35
+    assert 0 < accepted < 40
+
+
+# ================= ReorderBuffer =================
+def test_reorder_releases_due_lines_in_timestamp_order():
+    rb = ReorderBuffer(window_s=1.0)
+    now = 10_000_000_000
+    assert (
+        rb.push(
+            [line(1, now - 1_500_000_000), line(2, now - 3_000_000_000), line(3, now)],
+            now_ns=now,
+        )
+        == []
+    )
+    assert rb.pop_due(now_ns=now) == [
+        line(2, now - 3_000_000_000),
+        line(1, now - 1_500_000_000),
+    ]
+    assert len(rb) == 1
+    assert rb.pop_due(now_ns=now, everything=True) == [line(3, now)]
+
+
+def test_reorder_caps_future_timestamps_and_size():
+    rb = ReorderBuffer(window_s=1.0, max_lines=2)
+    now = 10_000_000_000
+    # device clock an hour ahead: due like one stamped now
+    ahead = line(1, now + 3_600_000_000_000)
+    assert rb.push([ahead], now_ns=now) == []
+    assert rb.pop_due(now_ns=now + 1_000_000_000) == [ahead]
+    assert rb.push([line(1, 3), line(2, 2), line(3, 1)], now_ns=now) == [line(3, 1)]
+
+
+# ================= UptimeClock =================
+def test_uptime_clock_keeps_offset_for_late_samples():
+    c = UptimeClock(max_lag_ms=10_000)
+    assert c.to_wall_ms("d", 5_000, now_ms=1_000_000) == 1_000_000
+    assert c.to_wall_ms("d", 6_000, now_ms=1_001_000) == 1_001_000
+    # retried sample keeps its time
+    assert c.to_wall_ms("d", 4_000, now_ms=1_002_000) == 999_000
+    assert c.reanchors == 0
+
+
+def test_uptime_clock_reanchors_after_reboot_and_drift():
+    c = UptimeClock(max_ahead_ms=1000, max_lag_ms=10_000)
+    c.offset("d", 100_000, now_ms=1_000_000)
+    # uptime went back: reboot
+    assert c.to_wall_ms("d", 1_000, now_ms=2_000_000) == 2_000_000
+    # would land in the future
+    assert c.to_wall_ms("d", 60_000, now_ms=2_001_000) == 2_001_000
+    assert c.reanchors == 2
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+
+from feedback_aggregate import FeedbackAggregate
+
+
+def make_db(path, ratings=()):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, rating INTEGER)"
+    )
+    add(conn, ratings)
+    return conn
+
+
+def add(conn, ratings):
+    conn.executemany(
+        "INSERT INTO feedback (rating) VALUES (?)", [(r,) for r in ratings]
+    )
+    conn.commit()
+
+
+def test_window_of_newest_ratings(tmp_path):
+    db = str(tmp_path / "feedback.db")
+    make_db(db, [1, 2, 3, 4, 5]).close()
+    agg = FeedbackAggregate(db, window=3)
+    assert agg.refresh() == ((5.0, 4.0, 3.0), 4.0, None)
+    assert agg.snapshot() == agg.refresh()
+    agg.close()
+
+
+def test_incremental_refresh_slides_window(tmp_path):
+    db = str(tmp_path / "feedback.db")
+    conn = make_db(db, [5, 5])
+    agg = FeedbackAggregate(db, window=3)
+    agg.refresh()
+    add(conn, [2, None, 0])  # NULL ratings are skipped
+    ratings, avg, err = agg.refresh()
+    assert ratings == (0.0, 2.0, 5.0) and avg == 7 / 3 and err is None
+    conn.close()
+    agg.close()
+
+
+def test_deleted_rows_start_over(tmp_path):
+    db = str(tmp_path / "feedback.db")
+    conn = make_db(db, [1, 2, 3])
+    agg = FeedbackAggregate(db, window=5)
+    agg.refresh()
+    conn.execute("DELETE FROM feedback WHERE id > 1")
+    conn.commit()
+    assert agg.refresh() == ((1.0,), 1.0, None)
+    conn.close()
+    agg.close()
+
+
+def test_replaced_db_file_is_reopened(tmp_path):
+    db = str(tmp_path / "feedback.db")
+    make_db(db, [1, 1]).close()
+    agg = FeedbackAggregate(db, window=5)
+    agg.refresh()
+    new = str(tmp_path / "new.db")
+    make_db(new, [4]).close()
+    os.replace(new, db)
+    assert agg.refresh() == ((4.0,), 4.0, None)
+    agg.close()
+
+
+def test_missing_db_and_table_are_reported(tmp_path):
+    db = str(tmp_path / "feedback.db")
+    agg = FeedbackAggregate(db)
+    assert agg.refresh()[2].startswith("DB file not found")
+    sqlite3.connect(db).close()
+    assert agg.refresh() == ((), None, "Table 'feedback' not found")
+    agg.close()
@@ -0,0 +1,64 @@
+import asyncio
+import sqlite3
+
+import pytest
+from feedback_db import FeedbackDB
+
+
+def create(conn):
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT NOT NULL)")
+
+
+def insert(conn, i, v):
+    conn.execute("INSERT INTO t (id, v) VALUES (?, ?)", (i, v))
+    return i
+
+
+def count(conn):
+    return conn.execute("SELECT count(*) FROM t").fetchone()[0]
+
+
+@pytest.fixture
+def db(tmp_path):
+    d = FeedbackDB(str(tmp_path / "f.db")).start()
+    d._submit(True, create, ()).result()
+    yield d
+    d.close()
+
+
+def test_concurrent_writes_share_commits(db):
+    async def main():
+        return await asyncio.gather(*(db.write(insert, i, "x") for i in range(200)))
+
+    commits = db.commits
+    assert asyncio.run(main()) == list(range(200))
+    assert db.commits - commits < 200
+    assert db.writes == 201
+    assert db._submit(False, count, ()).result() == 200
+
+
+def test_failing_write_only_fails_its_caller(db):
+    async def main():
+        return await asyncio.gather(
+            db.write(insert, 1, "a"),
+            db.write(insert, 1, "dup"),
+            db.write(insert, 2, None),
+            db.write(insert, 3, "c"),
+            return_exceptions=True,
+        )
+
+    res = asyncio.run(main())
+    assert res[0] == 1 and res[3] == 3
+    assert isinstance(res[1], sqlite3.IntegrityError) and isinstance(
+        res[2], sqlite3.IntegrityError
+    )
+    assert db._submit(False, count, ()).result() == 2
+
+
+def test_reads_see_writes_queued_before_them(db):
+    async def main():
+        w = db.write(insert, 1, "a")
+        r = db.read(count)
+        return await asyncio.gather(w, r)
+
+    assert asyncio.run(main()) == [1, 1]
@@ -0,0 +1,95 @@
+import csv
+import gzip
+import io
+import sqlite3
+from contextlib import closing
+
+import feedback_export
+import pytest
+from feedback_export import COLUMNS, export_feedback
+
+N = 2500  # more than one fetchmany batch
+
+
+def expected(n=N):
+    return [
+        (
+            i,
+            100 + i % 7,
+            f"user{i % 7}" if i % 5 else None,
+            i % 6,
+            'a, "quoted"\nline — ✓' if i % 3 == 0 else None,
+            "2025-01-01 00:00:00",
+            1_000_000 + i,
+            "warm" if i % 2 else None,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "feedback.db")
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute(
+            "CREATE TABLE feedback (id INTEGER PRIMARY KEY, user_id INTEGER, username TEXT, rating INTEGER, "
+            "comment TEXT, created_at TEXT, created_ts INTEGER, palette TEXT)"
+        )
+        conn.executemany(
+            f"INSERT INTO feedback ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            expected(),
+        )
+    return path
+
+
+def csv_rows(data: bytes):
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8"), newline="")))
+    assert rows[0] == COLUMNS
+    return rows[1:]
+
+
+def as_csv(rows):
+    return [["" if v is None else str(v) for v in r] for r in rows]
+
+
+def test_csv(db_path):
+    out, name, n, last_id = export_feedback(db_path, "csv")
+    assert name.endswith(".csv") and (n, last_id) == (N, N)
+    assert csv_rows(out.read()) == as_csv(expected())
+
+
+def test_csv_gz_matches_csv(db_path):
+    plain = export_feedback(db_path, "csv")[0].read()
+    out, name, n, _ = export_feedback(db_path, "csv.gz")
+    assert name.endswith(".csv.gz") and n == N
+    assert gzip.decompress(out.read()) == plain
+
+
+def test_parquet(db_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out, name, n, last_id = export_feedback(db_path, "parquet")
+    assert name.endswith(".parquet") and (n, last_id) == (N, N)
+    table = pq.read_table(out)
+    assert table.column_names == COLUMNS
+    assert [tuple(r.values()) for r in table.to_pylist()] == expected()
+
+
+def test_filters(db_path):
+    out, _, n, last_id = export_feedback(
+        db_path, "csv", since_ts=1_000_010, until_ts=1_000_020, after_id=12
+    )
+    assert (n, last_id) == (7, 19)
+    assert [r[0] for r in csv_rows(out.read())] == [str(i) for i in range(13, 20)]
+    _, _, n, last_id = export_feedback(db_path, "csv", after_id=N)
+    assert (n, last_id) == (0, 0)
+
+
+def test_large_export_spools_to_disk(db_path, monkeypatch):
+    monkeypatch.setattr(feedback_export, "SPOOL_MAX", 1024)
+    out, _, n, _ = export_feedback(db_path, "csv")
+    assert out._rolled and n == N
+
+
+def test_unknown_format(db_path):
+    with pytest.raises(ValueError):
+        export_feedback(db_path, "xlsx")
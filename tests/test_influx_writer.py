@@ -0,0 +1,98 @@
+import threading
+import time
+
+from influx_writer import BatchWriter
+from spool import Spool
+
+
+def lines(n, start=0):
+    return [f"m,d=a v={i}i {i}" for i in range(start, start + n)]
+
+
+class GatedSink:
+    """Records batches; holds the first one in flight until release() so the queue can fill up."""
+
+    def __init__(self):
+        self.written = []
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, batch):
+        self.entered.set()
+        assert self.gate.wait(5.0)
+        self.written.extend(batch)
+
+    def release(self):
+        self.gate.set()
+
+
+def fill_while_blocked(w, sink, n):
+    w.put_many(lines(2))  # one full batch goes in flight...
+    assert sink.entered.wait(5.0)
+    return w.put_many(lines(n, 2))  # ...while the queue overflows
+
+
+# ================= backpressure =================
+def test_drop_oldest_evicts_the_oldest_queued_lines():
+    sink = GatedSink()
+    w = BatchWriter(
+        sink, batch_size=2, flush_interval=5.0, max_queue=4, backpressure="drop_oldest"
+    )
+    assert fill_while_blocked(w, sink, 8) == 8
+    assert list(w._q) == lines(4, 6)
+    sink.release()
+    assert w.flush(timeout=5.0)
+    w.close()
+    assert sink.written == lines(2) + lines(4, 6)
+    s = w.stats()
+    assert (s["enqueued"], s["dropped"], s["written"]) == (10, 4, 6)
+
+
+def test_spill_keeps_overflow_and_replays_it_in_order(tmp_path):
+    sink = GatedSink()
+    sp = Spool(str(tmp_path))
+    w = BatchWriter(
+        sink,
+        batch_size=2,
+        flush_interval=5.0,
+        max_queue=4,
+        backpressure="spill",
+        spill=sp,
+    )
+    assert fill_while_blocked(w, sink, 8) == 8
+    assert list(w._q) == lines(4, 2)
+    assert sp.pending_bytes() > 0
+    sink.release()
+    assert w.flush(timeout=5.0)
+    w.close()
+    spilled = lines(4, 6)
+    assert sorted(sink.written) == sorted(lines(10))
+    assert [ln for ln in sink.written if ln in spilled] == spilled
+    assert [ln for ln in sink.written if ln not in spilled] == lines(6)
+    s = w.stats()
+    assert (s["spilled"], s["written"], s["dropped"], s["spill_pending_bytes"]) == (
+        4,
+        10,
+        0,
+        0,
+    )
+
+
+# ================= stats =================
+def test_stats_flush_latency():
+    delays = [0.02, 0.06]
+
+    def sink(batch):
+        time.sleep(delays.pop(0))
+
+    w = BatchWriter(sink, batch_size=10, flush_interval=5.0)
+    assert w.stats()["flush_latency_avg_ms"] == 0.0
+    for i in range(2):
+        w.put_many(lines(3, 3 * i))
+        assert w.flush(timeout=5.0)
+    w.close()
+    s = w.stats()
+    assert s["flushes"] == 2 and s["written"] == 6
+    assert 60 <= s["flush_latency_last_ms"] == s["flush_latency_max_ms"] < 1000
+    assert 40 <= s["flush_latency_avg_ms"] < s["flush_latency_max_ms"]
+    assert s["queue_depth"] == 0 and s["queue_max"] == 20000
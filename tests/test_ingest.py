@@ -0,0 +1,83 @@
+import itertools
+import json
+
+import ingest
+import pytest
+import telemetry_codec as codec
+from dedup import UptimeClock
+from ingest import encode_records, peek_device
+
+
+@pytest.mark.parametrize(
+    "rec",
+    [
+        {
+            "device_id": "esp32-smartart-01",
+            "temp": 21.5,
+            "hum": 40,
+            "light": 1,
+            "motion": 0,
+        },
+        {"temp": 21.5, "device_id": "wall 2", "ts_ms": 5},
+        {"device_id": "", "temp": 1},
+    ],
+)
+def test_peek_device_matches_json(rec):
+    for payload in (
+        json.dumps(rec),
+        json.dumps(rec, separators=(",", ":")),
+        json.dumps(rec, indent=2),
+    ):
+        assert peek_device(payload.encode()) == rec["device_id"]
+
+
+def test_peek_device_non_ascii():
+    rec = {"device_id": "ünï", "temp": 1}
+    assert peek_device(json.dumps(rec, ensure_ascii=False).encode()) == "ünï"
+    assert peek_device(json.dumps(rec).encode()) is None  # \u escapes: decode instead
+
+
+def test_peek_device_without_id_is_unknown():
+    assert peek_device(b'{"temp": 1, "hum": 2}') == "unknown"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b'{"device_id": "a\\"b"}',  # escape: can't be read by the scan
+        b'{"device_id": 7}',  # non-string id
+        b'{"device_id": "a", "device_id": "b"}',  # repeated key (json keeps the last)
+    ],
+)
+def test_peek_device_falls_back_to_decode(payload):
+    assert peek_device(payload) is None
+
+
+def test_frame_device_reads_header_only():
+    frame = codec.encode_frame(
+        "wall-7", [{"temp": 20, "hum": 50, "light": 3, "motion": 0}] * 3
+    )
+    assert codec.frame_device(frame) == "wall-7"
+
+
+def test_uptime_batch_keeps_sample_spacing(monkeypatch):
+    # firmware HTTP batch: 10 samples 2 s apart, spanning more than max_lag_ms
+    clock = UptimeClock(max_lag_ms=10_000)
+    monkeypatch.setattr(ingest, "clock", clock)
+    monkeypatch.setattr(ingest, "columnar", None)
+    records = [
+        {
+            "device_id": "wall",
+            "temp": 21.0,
+            "hum": 40.0,
+            "light": 1,
+            "motion": 0,
+            "ts_ms": 100_000 + 2000 * i,
+        }
+        for i in range(10)
+    ]
+    lines, errors = encode_records(records)
+    assert not errors
+    ts = [int(ln.rsplit(" ", 1)[1]) for ln in lines]
+    assert [b - a for a, b in itertools.pairwise(ts)] == [2_000_000_000] * 9
+    assert clock.reanchors == 0
@@ -0,0 +1,75 @@
+from metrics import Registry
+
+
+def make_registry():
+    reg = Registry()
+    msgs = reg.counter("t_messages_total", "Messages", ["transport"])
+    depth = reg.gauge("t_queue_depth", "Queue depth")
+    lat = reg.histogram("t_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    return reg, msgs, depth, lat
+
+
+def test_render_from_dump_matches_live():
+    reg, msgs, depth, lat = make_registry()
+    msgs.labels(transport="mqtt").inc(3)
+    depth.set(7)
+    lat.observe(0.05)
+    lat.observe(5.0)
+    assert reg.render(reg.dump()) == reg.render()
+
+
+def test_merge_sums_workers():
+    reg, msgs, depth, lat = make_registry()
+    msgs.labels(transport="mqtt").inc(2)
+    depth.set(4)
+    lat.observe(0.5)
+    a = reg.dump()
+    reg2, msgs2, depth2, lat2 = make_registry()
+    msgs2.labels(transport="mqtt").inc(5)
+    msgs2.labels(transport="http").inc(1)
+    depth2.set(1)
+    lat2.observe(0.5)
+    text = reg.render(reg.merge([a, reg2.dump()]))
+    assert 't_messages_total{transport="mqtt"} 7' in text
+    assert 't_messages_total{transport="http"} 1' in text
+    assert "t_queue_depth 5" in text
+    assert 't_latency_seconds_bucket{le="1"} 2' in text
+    assert "t_latency_seconds_count 2" in text
+
+
+def test_merge_cumulative_only_drops_gauges():
+    reg, msgs, depth, _ = make_registry()
+    msgs.labels(transport="mqtt").inc()
+    depth.set(9)
+    merged = reg.merge([reg.dump()], cumulative_only=True)
+    assert "t_queue_depth" not in merged
+    assert 't_messages_total{transport="mqtt"} 1' in reg.render(merged)
+
+
+def test_gauge_fn_sampled_into_dump():
+    reg = Registry()
+    reg.gauge("t_pending", "Pending", fn=lambda: 42)
+    assert "t_pending 42" in reg.render(reg.merge([reg.dump()]))
+
+
+def test_supervisor_keeps_counts_of_restarted_workers():
+    import supervisor
+    from metrics import MESSAGES, REGISTRY
+
+    sup = supervisor.Supervisor(2)
+    child = MESSAGES.labels(transport="mqtt")
+    saved, child.value = child.value, 0.0
+    try:
+        child.inc(10)
+        sup.latest[0] = (0.0, {}, REGISTRY.dump())
+        sup._retire(0)
+        child.value = 0.0  # the replacement worker starts from scratch
+        child.inc(1)
+        sup.latest[0] = (1.0, {}, REGISTRY.dump())
+        sup.latest[1] = (1.0, {}, REGISTRY.dump())
+        assert (
+            'smartart_messages_total{transport="mqtt"} 12'
+            in sup.render_metrics().splitlines()
+        )
+    finally:
+        child.value = saved
@@ -0,0 +1,129 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+import Telegrambot as bot
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "feedback.db")
+    monkeypatch.setattr(bot, "DB_PATH", path)
+    return path
+
+
+def query(path, sql, args=()):
+    with closing(sqlite3.connect(path)) as conn:
+        return conn.execute(sql, args).fetchall()
+
+
+def columns(path, table):
+    return {r[1] for r in query(path, f"PRAGMA table_info({table})")}
+
+
+def rollup_matches_feedback(path, table, secs):
+    got = query(
+        path, f"SELECT bucket, palette, n, total FROM {table} WHERE n > 0 ORDER BY 1, 2"
+    )
+    want = query(
+        path,
+        f"SELECT created_ts / {secs} * {secs}, IFNULL(palette, ''), COUNT(*), SUM(rating) "
+        "FROM feedback WHERE rating IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2",
+    )
+    return got == want
+
+
+def test_fresh_db_reaches_latest_version_and_is_idempotent(db_path):
+    bot.ensure_db()
+    bot.migrate_schema()
+    bot.migrate_schema()
+    assert query(db_path, "PRAGMA user_version")[0][0] == max(bot.MIGRATIONS)
+    assert {"created_ts", "palette", "comment"} <= columns(db_path, "feedback")
+    indexes = {r[1] for r in query(db_path, "PRAGMA index_list(feedback)")}
+    assert {"idx_feedback_created_ts", "idx_feedback_user_ts"} <= indexes
+    assert query(db_path, "SELECT name FROM sqlite_master WHERE name = 'export_state'")
+
+
+def test_first_release_db_is_upgraded(db_path):
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY)")
+        conn.execute(
+            "CREATE TABLE feedback (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, rating INTEGER)"
+        )
+        conn.execute("INSERT INTO users VALUES (1)")
+        conn.execute("INSERT INTO feedback (user_id, rating) VALUES (1, 4)")
+    bot.ensure_db()
+    bot.migrate_schema()
+    assert {"username", "first_name", "last_name", "updated_at"} <= columns(
+        db_path, "users"
+    )
+    # the old row has no created_at to backfill from; new rows get created_ts from the trigger
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.execute("INSERT INTO feedback (user_id, rating) VALUES (1, 2)")
+    ts = [r[0] for r in query(db_path, "SELECT created_ts FROM feedback ORDER BY id")]
+    assert ts[0] is None and ts[1] is not None
+
+
+def test_v2_backfills_created_ts_and_rollups(db_path):
+    bot.ensure_db()
+    with closing(bot.get_db_connection()) as conn, conn:
+        conn.execute("INSERT INTO users (user_id) VALUES (1)")
+        conn.executemany(
+            "INSERT INTO feedback (user_id, rating, created_at) VALUES (1, ?, ?)",
+            [
+                (5, "2025-01-01 00:00:10"),
+                (3, "2025-01-01 00:00:50"),
+                (1, "2025-01-01 01:30:00"),
+            ],
+        )
+        conn.execute("PRAGMA user_version = 1")
+    bot.migrate_schema()
+    assert [
+        r[0] for r in query(db_path, "SELECT created_ts FROM feedback ORDER BY id")
+    ] == [1735689610, 1735689650, 1735695000]
+    assert query(
+        db_path, "SELECT bucket, n, total FROM feedback_rollup_hour ORDER BY 1"
+    ) == [(1735689600, 2, 8), (1735693200, 1, 1)]
+    for table, secs in bot.ROLLUPS.items():
+        assert rollup_matches_feedback(db_path, table, secs)
+
+
+def test_rollup_triggers_follow_inserts_updates_deletes(db_path):
+    bot.ensure_db()
+    bot.migrate_schema()
+    with closing(bot.get_db_connection()) as conn, conn:
+        conn.execute("INSERT INTO users (user_id) VALUES (1)")
+        conn.executemany(
+            "INSERT INTO feedback (user_id, rating, created_ts, palette) VALUES (1, ?, ?, ?)",
+            [
+                (4, 1_000_000, "warm"),
+                (2, 1_000_030, "warm"),
+                (5, 1_000_100, None),
+                (0, 1_004_000, "cool"),
+            ],
+        )
+        # created_ts from 'now'
+        conn.execute("INSERT INTO feedback (user_id, rating) VALUES (1, 3)")
+        conn.execute("UPDATE feedback SET rating = 1 WHERE id = 1")
+        conn.execute(
+            "UPDATE feedback SET palette = 'cool', created_ts = 1000200 WHERE id = 2"
+        )
+        conn.execute("DELETE FROM feedback WHERE id = 3")
+    for table, secs in bot.ROLLUPS.items():
+        assert rollup_matches_feedback(db_path, table, secs)
+
+
+def test_failed_step_rolls_back(db_path, monkeypatch):
+    bot.ensure_db()
+    bot.migrate_schema()
+    latest = max(bot.MIGRATIONS)
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (x)")
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(bot.MIGRATIONS, latest + 1, broken)
+    with pytest.raises(RuntimeError):
+        bot.migrate_schema()
+    assert query(db_path, "PRAGMA user_version")[0][0] == latest
+    assert not query(db_path, "SELECT name FROM sqlite_master WHERE name = 'half_done'")
@@ -0,0 +1,78 @@
+import pacing
+import pytest
+from pacing import FramePacer
+
+
+class FakeTime:
+    """Stands in for the time module inside pacing.py."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def process_time(self):
+        return self.now / 10  # 10% CPU
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(pacing, "time", fake)
+    return fake
+
+
+def settle(p, clock, dt, temp=22.0, hum=45.0, light=2000, motion=0):
+    clock.now += dt
+    p.observe(temp, hum, light, motion, now=clock.now)
+
+
+def test_goes_idle_after_quiet_period_and_wakes_on_motion(clock):
+    p = FramePacer(active_fps=60, idle_fps=5, idle_after_s=120.0, log_every_s=0)
+    settle(p, clock, 0)  # first sample only sets the references
+    settle(p, clock, 119.0)
+    assert not p.idle and p.fps() == 60
+    settle(p, clock, 1.0)
+    assert p.idle and p.fps() == 5
+    settle(p, clock, 1.0, motion=1)
+    assert not p.idle and p.fps() == 60
+
+
+def test_sensor_deltas_count_as_activity_small_drift_does_not(clock):
+    p = FramePacer(idle_after_s=10.0, temp_delta=0.3, log_every_s=0)
+    settle(p, clock, 0)
+    for _ in range(10):
+        settle(p, clock, 1.0, temp=22.1)  # below temp_delta
+    assert p.idle
+    settle(p, clock, 1.0, temp=22.4)
+    assert not p.idle
+    settle(p, clock, 10.0, temp=22.4)
+    assert p.idle
+
+
+def test_poke_wakes_and_pause_when_idle_stops_animation(clock):
+    p = FramePacer(idle_after_s=5.0, pause_when_idle=True, log_every_s=0)
+    settle(p, clock, 0)
+    settle(p, clock, 5.0)
+    assert p.idle and not p.animate()
+    p.poke()
+    assert not p.idle and p.animate()
+    settle(p, clock, 4.0)
+    assert not p.idle
+
+
+def test_accounting_is_split_by_mode(clock):
+    p = FramePacer(active_fps=60, idle_fps=5, idle_after_s=1.0, log_every_s=0)
+    settle(p, clock, 0)
+    for _ in range(4):
+        clock.now += 0.25
+        assert p.mark() == pytest.approx(1 / 60)
+    settle(p, clock, 0)  # 1 s quiet -> idle
+    for _ in range(2):
+        clock.now += 0.5
+        assert p.mark() == pytest.approx(1 / 5)
+    s = p.stats()
+    assert (s["active"]["frames"], s["active"]["seconds"]) == (4, 1.0)
+    assert (s["idle"]["frames"], s["idle"]["seconds"]) == (2, 1.0)
+    assert s["idle"]["fps"] == 2.0 and s["idle"]["cpu_pct"] == 10.0
@@ -0,0 +1,92 @@
+import asyncio
+import sqlite3
+from contextlib import closing
+
+import pytest
+import Telegrambot as bot
+from feedback_db import FeedbackDB
+
+
+def row(user_id, rating=4, comment="ok"):
+    return (
+        user_id,
+        f"user{user_id}",
+        rating,
+        comment,
+        "2025-01-01 00:00:00",
+        1735689600,
+    )
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "DB_PATH", str(tmp_path / "feedback.db"))
+    bot.ensure_db()
+    bot.migrate_schema()
+    with closing(bot.get_db_connection()) as conn, conn:
+        conn.executemany(
+            "INSERT INTO users (user_id, username) VALUES (?, ?)",
+            [(1, "user1"), (2, "user2")],
+        )
+    d = FeedbackDB(bot.DB_PATH).start()
+    monkeypatch.setattr(bot, "db", d)
+    yield d
+    d.close()
+
+
+def saved(db):
+    return db._submit(
+        False,
+        lambda c: c.execute(
+            "SELECT user_id, rating FROM feedback ORDER BY id"
+        ).fetchall(),
+        (),
+    ).result()
+
+
+def test_hold_finalize_and_flush(db):
+    buf = bot.RatingBuffer()
+    buf.hold(1, "user1", 3)
+    buf.hold(1, "user1", 5)  # the earlier rating is finalized without a comment
+    assert buf.finalize(1, "nice") == 5
+    assert buf.finalize(1) is None
+    asyncio.run(buf.flush())
+    assert saved(db) == [(1, 3), (1, 5)]
+    assert buf.ready == []
+
+
+def test_bad_rows_are_dropped_good_rows_saved(db):
+    buf = bot.RatingBuffer()
+    buf.ready = [
+        row(1),
+        row(999),
+        row(2, rating=9),
+        row(2, rating=0),
+    ]  # unknown user, rating out of range
+    asyncio.run(buf.flush())
+    assert saved(db) == [(1, 4), (2, 0)]
+    assert buf.ready == [] and buf.dropped == 2
+    buf.ready = [row(1, rating=1)]  # the buffer is not wedged
+    asyncio.run(buf.flush())
+    assert saved(db)[-1] == (1, 1)
+
+
+def test_transient_failures_retry_then_drop(db, monkeypatch):
+    real = bot.save_ratings
+
+    def flaky(conn, rows):
+        if any(r[0] == 2 for r in rows):
+            raise sqlite3.OperationalError("database is locked")
+        real(conn, rows)
+
+    monkeypatch.setattr(bot, "save_ratings", flaky)
+    monkeypatch.setattr(bot, "SAVE_RETRIES", 3)
+    buf = bot.RatingBuffer()
+    buf.ready = [row(1), row(2)]
+    asyncio.run(buf.flush())
+    assert saved(db) == [(1, 4)]
+    assert buf.ready == [row(2)] and buf.dropped == 0
+    asyncio.run(buf.flush())
+    assert buf.ready == [row(2)]
+    asyncio.run(buf.flush())
+    assert buf.ready == [] and buf.dropped == 1 and buf.failures == {}
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from renderer import Mode0Renderer, mode0_scene
+
+W, H = 640, 480
+
+
+@pytest.fixture(scope="module")
+def font():
+    pygame.font.init()
+    return pygame.font.Font(None, 20)
+
+
+def scene(t, temp=22.0, hum=45.0, light=2000, flash=False, hud="HUD"):
+    return mode0_scene(t, temp, hum, light, flash, hud)
+
+
+def fresh(s, font):
+    surf = pygame.Surface((W, H))
+    Mode0Renderer(surf, font).render(s)
+    return surf
+
+
+def same_pixels(a, b):
+    return pygame.image.tobytes(a, "RGB") == pygame.image.tobytes(b, "RGB")
+
+
+# ================= dirty rects =================
+def test_first_frame_is_full_and_unchanged_scene_draws_nothing(font):
+    surf = pygame.Surface((W, H))
+    r = Mode0Renderer(surf, font)
+    assert r.render(scene(0)) == [surf.get_rect()]
+    before = surf.copy()
+    assert r.render(scene(0)) == []
+    assert same_pixels(surf, before)
+
+
+def test_animation_redraws_only_the_band_and_matches_a_full_redraw(font):
+    surf = pygame.Surface((W, H))
+    r = Mode0Renderer(surf, font)
+    r.render(scene(0))
+    for t in range(1, 40):
+        before = surf.copy()
+        rects = r.render(scene(t, hum=45.0 + t))
+        assert rects and all(rect != surf.get_rect() for rect in rects)
+        # nothing outside the returned rects moved
+        outside = surf.copy()
+        for rect in rects:
+            outside.blit(before, rect, rect)
+        assert same_pixels(outside, before)
+        assert same_pixels(surf, fresh(scene(t, hum=45.0 + t), font))
+
+
+def test_bg_flash_and_invalidate_force_a_full_frame(font):
+    surf = pygame.Surface((W, H))
+    r = Mode0Renderer(surf, font)
+    full = [surf.get_rect()]
+    r.render(scene(0))
+    assert r.render(scene(1, light=3000)) == full  # new background
+    assert r.render(scene(2, light=3000, flash=True)) == full
+    assert r.render(scene(3, light=3000)) == full  # flash gone
+    assert r.render(scene(4, light=3000)) != full
+    r.invalidate()
+    assert r.render(scene(4, light=3000)) == full
+
+
+def test_hud_change_is_its_own_rect(font):
+    surf = pygame.Surface((W, H))
+    r = Mode0Renderer(surf, font)
+    r.render(scene(0))
+    rects = r.render(scene(0, hud="other text"))
+    assert len(rects) == 2 and rects[1].topleft == (10, 10)
+    assert same_pixels(surf, fresh(scene(0, hud="other text"), font))
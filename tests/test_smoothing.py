@@ -0,0 +1,81 @@
+import math
+
+import pytest
+from smoothing import Channel, Smoother
+
+
+# ================= Smoother =================
+def test_median_rejects_a_single_spike_then_ema_follows_a_step():
+    ch = Channel(tau_s=1.5, median_of=3)
+    assert [
+        ch.update(x, now) for now, x in enumerate((100, 100, 100, 4000, 100, 100))
+    ] == [100] * 6
+    assert ch.rate == 0.0
+    assert ch.update(200, 6.0) == 100  # median of (100, 100, 200)
+    a = 1 - math.exp(-1 / 1.5)
+    assert ch.update(200, 7.0) == pytest.approx(100 + a * 100)
+    assert ch.rate == pytest.approx(a * 100 * a)
+
+
+def test_ema_weight_follows_the_gap_between_samples():
+    fast, slow = Channel(tau_s=3.0), Channel(tau_s=3.0)
+    fast.update(20.0, 0.0)
+    slow.update(20.0, 0.0)
+    for now in (1.0, 2.0, 3.0):
+        fast.update(26.0, now)
+    slow.update(26.0, 3.0)
+    # three 1 s steps towards a constant target land where one 3 s step does
+    assert (
+        fast.value
+        == pytest.approx(slow.value)
+        == pytest.approx(20 + 6 * (1 - math.exp(-1)))
+    )
+    assert slow.update(99.0, 3.0) == slow.value  # no time passed: ignored
+
+
+def test_smoother_uses_fallback_until_a_channel_has_data():
+    sm = Smoother(temp_tau_s=3.0)
+    smooth, rate = sm.update({"temp": 20.0}, (20.0, 55.0, 1234.0), now=0.0)
+    assert smooth == (20.0, 55.0, 1234.0) and rate == (0.0, 0.0, 0.0)
+    smooth, rate = sm.update({"temp": 26.0, "hum": 60.0}, (26.0, 60.0, 1234.0), now=3.0)
+    a = 1 - math.exp(-1)
+    assert smooth[0] == pytest.approx(20 + 6 * a) and smooth[1:] == (60.0, 1234.0)
+    assert rate[0] == pytest.approx(a * 6 * a / 3) and rate[1:] == (0.0, 0.0)
+
+
+# ================= Mode0Levels =================
+def test_levels_hold_until_a_margin_past_the_boundary():
+    pytest.importorskip("pygame")
+    from renderer import Mode0Levels, mode0_levels
+
+    lv = Mode0Levels(margin=0.3)
+    # wave amplitude 8 + hum/3
+    assert lv(22.0, 36.0, 0)[1] == 20  # 20.0
+    assert lv(22.0, 39.5, 0)[1] == 20  # 21.17 < 21.3: held
+    assert lv(22.0, 40.0, 0)[1] == 21  # 21.33
+    assert lv(22.0, 38.5, 0)[1] == 21  # 20.83 >= 20.7: held on the way back
+    assert lv(22.0, 38.0, 0)[1] == 20  # 20.67
+    # rings 3 + (temp - 15)/5, clamped to 1..10
+    assert lv(22.0, 38.0, 0)[0] == 4  # 4.4
+    assert lv(26.4, 38.0, 0)[0] == 4  # 5.28 < 5.3: held
+    assert lv(26.6, 38.0, 0)[0] == 5  # 5.32
+    assert lv(90.0, 38.0, 0)[0] == 10
+    # light level 0..255 from the 12-bit ADC
+    assert lv(90.0, 38.0, 2000)[2] == mode0_levels(0, 0, 2000)[2] == 124
+    assert lv(90.0, 38.0, 2010)[2] == 124  # 125.16: held
+    assert lv(90.0, 38.0, 2015)[2] == 125  # 125.48
+    assert lv(90.0, 38.0, 4095)[2] == 255
+
+
+def test_levels_without_margin_match_the_direct_mapping():
+    pytest.importorskip("pygame")
+    from renderer import Mode0Levels, mode0_levels
+
+    lv = Mode0Levels(margin=0.0)
+    for temp, hum, light in (
+        (14.0, 0.0, 0),
+        (22.3, 47.0, 1999),
+        (40.0, 99.0, 4095),
+        (21.0, 40.0, 2048),
+    ):
+        assert lv(temp, hum, light) == mode0_levels(temp, hum, light)
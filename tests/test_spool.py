@@ -0,0 +1,163 @@
+import os
+
+import pytest
+from spool import QUARANTINE_FILE, Spool, SpoolReplayer, bisect_write
+
+
+class Rejected(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def lines(n, start=0):
+    return [f"m,d=a v={i}i {i}" for i in range(start, start + n)]
+
+
+def test_append_read_ack_roundtrip(tmp_path):
+    sp = Spool(str(tmp_path), segment_bytes=1 << 20)
+    assert sp.append(lines(5)) == 5
+    got, cur = sp.read(3)
+    assert got == lines(3)
+    sp.ack(cur, len(got))
+    got, cur = sp.read(100)
+    assert got == lines(2, 3)
+    sp.ack(cur, len(got))
+    assert sp.pending_bytes() == 0
+    assert sp.stats()["acked"] == 5
+
+
+def test_unacked_lines_replay_after_restart(tmp_path):
+    sp = Spool(str(tmp_path))
+    sp.append(lines(4))
+    _, cur = sp.read(2)
+    sp.ack(cur, 2)
+    sp.read(2)  # read but never acked
+    sp.close()
+    sp = Spool(str(tmp_path))
+    assert sp.read(100)[0] == lines(2, 2)
+
+
+def test_rewind_rereads(tmp_path):
+    sp = Spool(str(tmp_path))
+    sp.append(lines(3))
+    first, _ = sp.read(10)
+    sp.rewind()
+    assert sp.read(10)[0] == first
+
+
+def test_rotation_and_compaction(tmp_path):
+    sp = Spool(str(tmp_path), segment_bytes=64)
+    for i in range(10):
+        sp.append(lines(2, 2 * i))
+    assert sp.stats()["segments"] > 1
+    out = []
+    while True:
+        got, cur = sp.read(3)
+        if not got:
+            break
+        out += got
+        sp.ack(cur, len(got))
+    assert out == lines(20)
+    assert sp.stats()["segments"] == 1
+
+
+def test_disk_budget_drops_oldest(tmp_path):
+    sp = Spool(str(tmp_path), segment_bytes=64, max_bytes=128)
+    for i in range(20):
+        sp.append(lines(2, 2 * i))
+    st = sp.stats()
+    assert st["dropped_segments"] > 0
+    assert st["bytes"] <= 128 + 64
+    got, _ = sp.read(1000)
+    assert got and got[-1] == lines(1, 39)[0]
+    assert got[0] != lines(1)[0]
+
+
+def test_torn_tail_is_cut_on_open(tmp_path):
+    sp = Spool(str(tmp_path))
+    sp.append(lines(2))
+    sp.close()
+    seg = next(n for n in os.listdir(tmp_path) if n.startswith("seg-"))
+    with open(tmp_path / seg, "ab") as f:
+        f.write(b"m,d=a v=99i 9")  # crash in the middle of an append
+    sp = Spool(str(tmp_path))
+    sp.append(lines(1, 2))
+    assert sp.read(100)[0] == lines(3)
+
+
+def test_torn_only_line_is_cut(tmp_path):
+    (tmp_path / "seg-00000001.lp").write_bytes(b"partial line without newline")
+    sp = Spool(str(tmp_path))
+    sp.append(["m v=1i 1"])
+    assert sp.read(10)[0] == ["m v=1i 1"]
+
+
+def test_bisect_write_isolates_rejected_lines():
+    written = []
+
+    def sink(batch):
+        if any("bad" in ln for ln in batch):
+            raise Rejected(400)
+        written.extend(batch)
+
+    batch = lines(3) + ["bad line"] + lines(4, 3) + ["also bad"]
+    assert bisect_write(sink, batch) == ["bad line", "also bad"]
+    assert sorted(written) == sorted(lines(7))
+
+
+def test_bisect_write_propagates_outages():
+    def sink(batch):
+        raise Rejected(503)
+
+    with pytest.raises(Rejected):
+        bisect_write(sink, lines(4))
+
+
+def test_replayer_quarantines_rejected_batch_and_moves_on(tmp_path):
+    sp = Spool(str(tmp_path))
+    sp.append(lines(2) + ["garbage"] + lines(2, 2))
+    written = []
+
+    def sink(batch):
+        if "garbage" in batch:
+            raise Rejected(400)
+        written.extend(batch)
+
+    rp = SpoolReplayer(sp, sink, batch_size=100, idle_interval=0.01)
+    rp.close(timeout=5.0)
+    assert written == lines(4)
+    assert sp.pending_bytes() == 0
+    assert rp.stats()["quarantined"] == 1
+    assert (tmp_path / QUARANTINE_FILE).read_text() == "garbage\n"
+
+
+def test_replayer_keeps_lines_on_outage(tmp_path):
+    sp = Spool(str(tmp_path))
+    sp.append(lines(3))
+
+    def sink(batch):
+        raise Rejected(500)
+
+    rp = SpoolReplayer(sp, sink, batch_size=100, idle_interval=0.01, retry_delay=0.01)
+    rp.close(timeout=0.2, drain=False)
+    assert sp.pending_bytes() > 0
+    assert rp.stats()["quarantined"] == 0
+
+
+def test_batch_writer_drops_rejected_lines_and_keeps_going():
+    from influx_writer import BatchWriter
+
+    written = []
+
+    def sink(batch):
+        if "bad" in batch:
+            raise Rejected(400)
+        written.extend(batch)
+
+    w = BatchWriter(sink, batch_size=10, flush_interval=0.01, retry_delay=0.01)
+    w.put_many(lines(3) + ["bad"] + lines(3, 3))
+    assert w.flush(timeout=5.0)
+    w.close()
+    assert written == lines(6)
+    assert w.stats()["rejected"] == 1
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+aiomqtt = pytest.importorskip("aiomqtt")
+
+from standins import FakeBroker
+
+V5, V311 = aiomqtt.ProtocolVersion.V5, aiomqtt.ProtocolVersion.V311
+
+
+async def collect(client, n, out, timeout=5.0):
+    async def run():
+        async for msg in client.messages:
+            out.append((msg.topic.value, msg.payload))
+            if len(out) == n:
+                return
+
+    try:
+        await asyncio.wait_for(run(), timeout)
+    except TimeoutError:
+        pass
+
+
+def test_v5_shared_subscription_round_robin_and_v311_alongside():
+    broker = FakeBroker().start()
+
+    async def main():
+        def client(name, protocol):
+            return aiomqtt.Client(
+                "127.0.0.1", broker.port, identifier=name, protocol=protocol
+            )
+
+        async with client("w0", V5) as w0, client("w1", V5) as w1, client(
+            "plain", V311
+        ) as plain, client("pub", V5) as pub:
+            await w0.subscribe([("$share/g/art/+/data", 0)])
+            await w1.subscribe([("$share/g/art/+/data", 0)])
+            await plain.subscribe("art/#")
+            got0, got1, got_plain = [], [], []
+            tasks = [
+                asyncio.create_task(collect(w0, 2, got0)),
+                asyncio.create_task(collect(w1, 2, got1)),
+                asyncio.create_task(collect(plain, 4, got_plain)),
+            ]
+            for i in range(4):
+                # QoS 1 gets a v5 PUBACK
+                await pub.publish(f"art/d{i}/data", f"m{i}".encode(), qos=i % 2)
+            await asyncio.gather(*tasks)
+            return got0, got1, got_plain
+
+    try:
+        got0, got1, got_plain = asyncio.run(main())
+    finally:
+        broker.stop()
+    assert len(got0) == len(got1) == 2
+    assert sorted(got0 + got1) == [
+        (f"art/d{i}/data", f"m{i}".encode()) for i in range(4)
+    ]
+    assert got_plain == [(f"art/d{i}/data", f"m{i}".encode()) for i in range(4)]
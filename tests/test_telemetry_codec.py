@@ -0,0 +1,98 @@
+import pytest
+import telemetry_codec as codec
+
+SAMPLES = [
+    {
+        "device_id": "wall-ü",
+        "ts_ms": 1_726_000_000_123,
+        "temp": 21.37,
+        "hum": 48.5,
+        "light": 812,
+        "motion": 1,
+    },
+    {
+        "device_id": "wall-ü",
+        "temp": -5.25,
+        "hum": 0.0,
+        "light": 0,
+        "motion": 0,
+    },  # no timestamp
+    {
+        "device_id": "wall-ü",
+        "ts_ms": 123_456,
+        "temp": 327.67,
+        "hum": 100.0,
+        "light": 65535,
+        "motion": 255,
+    },
+]
+
+
+def test_roundtrip():
+    buf = codec.encode_frame("wall-ü", SAMPLES)
+    assert codec.looks_binary(buf)
+    assert (
+        len(buf)
+        == codec.HEADER.size + len("wall-ü".encode()) + len(SAMPLES) * codec.SAMPLE.size
+    )
+    assert codec.decode_frame(buf) == SAMPLES
+    assert codec.decode_last(buf) == SAMPLES[-1]
+
+
+def test_values_are_rounded_to_centi_units():
+    buf = codec.encode_frame(
+        "d", [{"temp": 21.004, "hum": 40.006, "light": 1, "motion": 0}]
+    )
+    rec = codec.decode_frame(buf)[0]
+    assert (rec["temp"], rec["hum"]) == (21.0, 40.01)
+
+
+def test_empty_frame():
+    buf = codec.encode_frame("d", [])
+    assert codec.decode_frame(buf) == [] and codec.decode_last(buf) == {}
+
+
+def test_columns_match_samples():
+    np = pytest.importorskip("numpy")
+    device, cols = codec.decode_frame_columns(codec.encode_frame("wall-ü", SAMPLES))
+    assert device == "wall-ü"
+    assert cols["ts_ms"].tolist() == [s.get("ts_ms", 0) for s in SAMPLES]
+    assert np.allclose(cols["temp"] / 100.0, [s["temp"] for s in SAMPLES])
+    assert cols["light"].tolist() == [s["light"] for s in SAMPLES]
+
+
+@pytest.mark.parametrize(
+    "buf, err",
+    [
+        (b"SA", "shorter than header"),
+        (b"XX" + codec.encode_frame("d", [])[2:], "magic"),
+        (
+            codec.encode_frame("d", [])[:2] + b"\x02" + codec.encode_frame("d", [])[3:],
+            "version",
+        ),
+        (codec.encode_frame("d", SAMPLES[:1])[:-1], "does not match"),
+        (
+            codec.HEADER.pack(codec.MAGIC, codec.VERSION, 0, 3, 1)
+            + codec.encode_frame("d", SAMPLES[:2])[codec.HEADER.size :],
+            "does not match 3 samples",
+        ),
+    ],
+)
+def test_malformed_frames_are_rejected(buf, err):
+    with pytest.raises(ValueError, match=err):
+        codec.decode_frame(buf)
+
+
+def test_encode_limits():
+    with pytest.raises(ValueError):
+        codec.encode_frame("x" * 256, [])
+    with pytest.raises(ValueError):
+        codec.encode_frame("d", [SAMPLES[1]] * (codec.MAX_SAMPLES + 1))
+
+
+def test_negotiation():
+    assert codec.is_binary_topic("smartart/telemetry" + codec.TOPIC_SUFFIX)
+    assert not codec.is_binary_topic("smartart/telemetry")
+    assert codec.is_binary_content_type(codec.CONTENT_TYPE + "; charset=binary")
+    assert codec.is_binary_content_type("Application/Octet-Stream")
+    assert not codec.is_binary_content_type("application/json")
@@ -0,0 +1,81 @@
+import threading
+
+from telemetry_state import TelemetryState
+
+N = 20000
+
+
+def payload(i):
+    return {"temp": i, "hum": 2 * i, "light": 3 * i, "motion": i % 2}
+
+
+def consistent(snap):
+    return (
+        snap.hum == 2 * snap.temp
+        and snap.light == 3 * snap.temp
+        and snap.motion == int(snap.temp) % 2
+    )
+
+
+# ================= concurrent writer =================
+def test_reader_never_sees_a_torn_snapshot_or_history():
+    st = TelemetryState(temp=0, hum=0, light=0, history=8)
+    done = threading.Event()
+
+    def writer():
+        for i in range(1, N + 1):
+            st.publish(payload(i), "mqtt")
+        done.set()
+
+    t = threading.Thread(target=writer)
+    t.start()
+    last_seq, reads = 0, 0
+    while not done.is_set() or reads == 0:
+        snap = st.latest()
+        assert consistent(snap)
+        assert snap.seq >= last_seq and snap.seq == int(snap.temp)
+        last_seq = snap.seq
+        hist = st.samples()
+        assert 1 <= len(hist) <= 8
+        assert [s.seq for s in hist] == list(
+            range(hist[0].seq, hist[0].seq - len(hist), -1)
+        )
+        assert all(consistent(s) for s in hist)
+        reads += 1
+    t.join()
+    assert st.latest().seq == N
+
+
+def test_two_writers_do_not_lose_updates():
+    st = TelemetryState(history=4)
+
+    def writer():
+        for _ in range(5000):
+            st.publish({"light": 1}, "mqtt")
+
+    threads = [threading.Thread(target=writer) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert st.latest().seq == 10000
+
+
+# ================= publish / interpolation =================
+def test_inactive_source_and_junk_are_ignored():
+    st = TelemetryState(source="mqtt")
+    assert st.publish({"temp": 30}, "http") is None
+    assert st.publish({"temp": "n/a"}, "mqtt") is None
+    assert st.set_source("HTTP") and st.source == "http"
+    assert not st.set_source("serial")
+    snap = st.publish({"temp": 30, "motion": "1"}, "http", now=st.latest().at + 1.0)
+    assert (snap.temp, snap.hum, snap.motion, snap.seq) == (30.0, 50.0, 1, 1)
+
+
+def test_interpolated_blends_over_the_inter_arrival_time():
+    st = TelemetryState(temp=20, hum=40, light=1000, max_blend_s=2.0)
+    t0 = st.latest().at
+    st.publish({"temp": 30, "hum": 60, "light": 2000}, "mqtt", now=t0 + 1.0)
+    assert st.interpolated(t0 + 1.0) == (20.0, 40.0, 1000.0)
+    assert st.interpolated(t0 + 1.5) == (25.0, 50.0, 1500.0)
+    assert st.interpolated(t0 + 9.0) == (30.0, 60.0, 2000.0)
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import UTC, datetime
+
+from telegram import Chat, Message, Update, User
+from update_processor import PerUserUpdateProcessor
+
+
+def update(uid: int, n: int) -> Update:
+    msg = Message(
+        message_id=n,
+        date=datetime.now(UTC),
+        chat=Chat(id=uid, type="private"),
+        from_user=User(id=uid, first_name="u", is_bot=False),
+        text=str(n),
+    )
+    return Update(update_id=n, message=msg)
+
+
+def run(updates, delay=0.02):
+    proc = PerUserUpdateProcessor(16)
+    log, running = [], {}
+
+    async def handle(u: Update):
+        uid = u.effective_user.id
+        running[uid] = running.get(uid, 0) + 1
+        log.append(("start", uid, u.update_id, sum(running.values()), running[uid]))
+        await asyncio.sleep(delay)
+        running[uid] -= 1
+
+    async def main():
+        # like Application: one task per update, in arrival order
+        await asyncio.gather(
+            *(asyncio.create_task(proc.process_update(u, handle(u))) for u in updates)
+        )
+        return proc
+
+    return asyncio.run(main()), log
+
+
+def test_one_user_runs_in_order_one_at_a_time():
+    proc, log = run([update(7, n) for n in range(1, 6)])
+    assert [e[2] for e in log] == [1, 2, 3, 4, 5]
+    assert max(e[4] for e in log) == 1
+    assert proc._locks == {}  # locks of idle users are dropped
+
+
+def test_different_users_run_in_parallel():
+    _, log = run([update(uid, uid) for uid in range(1, 6)])
+    assert max(e[3] for e in log) == 5
+
+
+def test_updates_without_user_are_not_serialized():
+    proc = PerUserUpdateProcessor(4)
+    done = []
+
+    async def main():
+        await asyncio.gather(
+            proc.process_update(object(), asyncio.sleep(0.01, done.append(1))),
+            proc.process_update(object(), asyncio.sleep(0.01, done.append(2))),
+        )
+
+    asyncio.run(main())
+    assert sorted(done) == [1, 2] and proc._locks == {}
@@ -0,0 +1,67 @@
+from user_cache import TokenBucket, UserCache
+
+PROFILE = ("ana", "Ana", None)
+
+
+# ================= UserCache =================
+def test_profile_changed_until_remembered():
+    c = UserCache()
+    assert c.profile_changed(1, PROFILE)
+    c.remember_profile(1, PROFILE)
+    assert not c.profile_changed(1, PROFILE)
+    assert c.profile_changed(1, ("ana", "Ana", "B"))
+
+
+def test_recent_hits_misses_and_limit():
+    c = UserCache()
+    assert c.recent(1, 10) is None
+    c.remember_recent(1, 10, [(5, "", "t")], c.gen)
+    assert c.recent(1, 10) == [(5, "", "t")]
+    assert c.recent(1, 5) is None  # cached for another limit
+    assert (c.hits, c.misses) == (1, 2)
+
+
+def test_invalidation_drops_rows_and_stale_reads():
+    c = UserCache()
+    c.remember_profile(1, PROFILE)
+    c.remember_recent(1, 10, [(5, "", "t")], c.gen)
+    gen = c.gen  # read issued...
+    c.invalidate_recent(1)  # ...a write lands before it returns
+    assert c.recent(1, 10) is None
+    c.remember_recent(1, 10, [(5, "", "t")], gen)
+    assert c.recent(1, 10) is None
+    assert not c.profile_changed(1, PROFILE)  # the profile survives
+
+
+def test_lru_evicts_least_recently_used():
+    c = UserCache(max_users=2)
+    c.remember_profile(1, PROFILE)
+    c.remember_profile(2, PROFILE)
+    assert not c.profile_changed(1, PROFILE)  # touches 1
+    c.remember_profile(3, PROFILE)
+    assert c.profile_changed(2, PROFILE)
+    assert not c.profile_changed(1, PROFILE) and not c.profile_changed(3, PROFILE)
+
+
+# ================= TokenBucket =================
+def test_burst_then_rate():
+    b = TokenBucket(rate=2.0, burst=3)
+    assert [b.allow(1, now=0.0) for _ in range(4)] == [True, True, True, False]
+    assert b.allow(1, now=0.5)  # one token back after 1/rate
+    assert not b.allow(1, now=0.5)
+    assert b.allow(2, now=0.5)  # other users have their own bucket
+    assert b.limited == 2
+
+
+def test_refill_caps_at_burst():
+    b = TokenBucket(rate=1.0, burst=2)
+    b.allow(1, now=0.0)
+    assert [b.allow(1, now=100.0) for _ in range(3)] == [True, True, False]
+
+
+def test_buckets_are_bounded():
+    b = TokenBucket(rate=1.0, burst=1, max_users=2)
+    for uid in (1, 2, 3):
+        b.allow(uid, now=0.0)
+    assert list(b._b) == [2, 3]
+    assert b.allow(1, now=0.0)  # evicted user starts with a full bucket
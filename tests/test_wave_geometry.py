@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from wave_geometry import WaveGeometry
+
+W, H = 1024, 600
+
+
+# the per-point loops Visualart.py / Feedback_Visual.py ran before WaveGeometry
+def loop_radii(rings, t):
+    return [int(40 + i * 26 + 12 * math.sin((t / 30) + i * 0.6)) for i in range(rings)]
+
+
+def loop_waves(amp, t):
+    return [
+        [(x, y + int(amp * math.sin((x + t * 2) / 80.0))) for x in range(0, W, 18)]
+        for y in range(120, H - 120, 30)
+    ]
+
+
+def as_tuples(rows):
+    return [[tuple(p) for p in row] for row in rows]
+
+
+def test_waves_match_the_per_point_loop():
+    g = WaveGeometry(W, H)
+    for amp in (8, 21, 41):
+        for t in range(0, 3000, 7):
+            assert as_tuples(g.waves(amp, t)) == loop_waves(amp, t)
+
+
+def test_ring_radii_match_the_per_point_loop():
+    g = WaveGeometry(W, H)
+    for rings in range(1, 11):
+        for t in range(0, 3000, 11):
+            assert g.ring_radii(rings, t) == loop_radii(rings, t)
+
+
+def test_cached_rows_are_reused_and_bounded():
+    g = WaveGeometry(W, H, cache_size=2)
+    first = g.waves(10, 1)
+    assert g.waves(10, 1) is first
+    g.waves(10, 2)
+    g.waves(10, 3)
+    assert list(g._cache) == [(10, 2), (10, 3)]
+    assert as_tuples(g.waves(10, 1)) == loop_waves(10, 1)
@@ -1,67 +1,68 @@
-import json, math, threading
-from typing import Dict
+import json
+import os
+import sys
+import threading
 
-import pygame
 import paho.mqtt.client as mqtt
-from flask import Flask, request, jsonify
+import pygame
+from flask import Flask, jsonify, request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import telemetry_codec as codec
+from pacing import FramePacer
+from renderer import Mode0Levels, Mode0Renderer, mode0_scene
+from smoothing import Smoother
+from telemetry_state import TelemetryState
 
 # ================= USER CONFIG =================
 MQTT_HOST = "host ip"
 MQTT_PORT = 1883
 
 TOPIC_DATA = "smartart/sensordata"
+TOPIC_DATA_BIN = TOPIC_DATA + codec.TOPIC_SUFFIX   # binary frames, see common/telemetry_codec.py
 TOPIC_MODE = "smartart/cmd/mode"
 
 HTTP_HOST = "0.0.0.0"
 HTTP_PORT = 8080          
 HTTP_DEBUG_LOG = False
+
+# ---- Frame pacing (pacing.py) ----
+FPS_ACTIVE = 60           # motion, sensor changes, transitions
+FPS_IDLE = 5              # nobody around and nothing changing
+IDLE_AFTER_S = 120        # seconds without motion / sensor change before going idle
+IDLE_PAUSE = False        # True: freeze the animation while idle (no redraws at all)
 # ===============================================
 
 # ---- Shared state ----
-data_lock = threading.Lock()
-data: Dict[str, float] = {"temp": 25.0, "hum": 50.0, "light": 2000, "motion": 0}
-update_source = "mqtt"  # authoritative source for applying updates
-last_motion_flash = 0
+# network threads publish snapshots, the render loop reads them without locking (telemetry_state.py)
+state = TelemetryState(source="mqtt", smoother=Smoother())   # authoritative source for applying updates
 FLASH_MS = 2500           # Duration of the flash effect (milliseconds).
 
 def set_update_source(src: str):
-    global update_source
-    src_l = str(src).strip().lower()
-    if src_l in ("mqtt", "http"):
-        update_source = src_l
-        print(f"[MODE] Updated authoritative source -> {update_source.upper()}")
+    if state.set_source(src):
+        print(f"[MODE] Updated authoritative source -> {state.source.upper()}")
     else:
         print(f"[MODE] Ignored invalid mode '{src}' (expect 'mqtt' or 'http')")
 
 def get_update_source() -> str:
-    return update_source
+    return state.source
 
 # ================= MQTT =================
 def on_connect(client, userdata, flags, rc):
     print(f"[MQTT] Connected rc={rc}; subscribing to topics")
-    client.subscribe([(TOPIC_DATA, 0), (TOPIC_MODE, 0)])
+    client.subscribe([(TOPIC_DATA, 0), (TOPIC_DATA_BIN, 0), (TOPIC_MODE, 0)])
 
 def _apply_payload(payload: dict, origin: str):
-    global last_motion_flash
-    if get_update_source() != origin:
-        if HTTP_DEBUG_LOG:
-            print(f"[{origin.upper()}] Ignored payload (active source is {get_update_source().upper()})")
-        return
-
-    accepted = {k: payload[k] for k in ("temp", "hum", "light", "motion") if k in payload}
-    if not accepted:
-        return
-    with data_lock:
-        data.update(accepted)
-        try:
-            if int(float(data.get("motion", 0))) == 1:
-                last_motion_flash = pygame.time.get_ticks()
-        except Exception:
-            pass
+    if state.publish(payload, origin) is None and HTTP_DEBUG_LOG and get_update_source() != origin:
+        print(f"[{origin.upper()}] Ignored payload (active source is {get_update_source().upper()})")
 
 def on_message(client, userdata, msg):
     try:
         topic = msg.topic
+        if topic == TOPIC_DATA_BIN:
+            # only the newest sample of a frame matters for the display
+            _apply_payload(codec.decode_last(msg.payload), origin="mqtt")
+            return
         payload_str = msg.payload.decode("utf-8").strip()
         if topic == TOPIC_MODE:
             set_update_source(payload_str)
@@ -101,7 +102,10 @@ def health():
 @app.route("/ingest", methods=["POST"])
 def ingest():
     try:
-        payload = request.get_json(force=True, silent=False)
+        if codec.is_binary_content_type(request.content_type):
+            payload = codec.decode_last(request.get_data())
+        else:
+            payload = request.get_json(force=True, silent=False)
         if HTTP_DEBUG_LOG: print("[HTTP] payload:", payload)
         if not isinstance(payload, dict):
             return jsonify({"ok": False, "err": "JSON object required"}), 400
@@ -123,7 +127,6 @@ def map01(x, lo, hi):
     return clamp((x - lo) / float(hi - lo), 0.0, 1.0)
 
 def main():
-    global last_motion_flash
     start_mqtt()
     threading.Thread(target=run_http_server, daemon=True).start()
     print(f"[HTTP] Listening on http://{HTTP_HOST}:{HTTP_PORT}/ingest (and /update)")
@@ -136,6 +139,9 @@ def main():
     pygame.display.set_caption("SmartArt – Mode 0 Only")
     clock = pygame.time.Clock()
     font = pygame.font.SysFont(None, 20)
+    renderer = Mode0Renderer(screen, font)
+    pacer = FramePacer(FPS_ACTIVE, FPS_IDLE, IDLE_AFTER_S, pause_when_idle=IDLE_PAUSE)
+    levels = Mode0Levels()    # rings / amplitude / bg only change past a boundary (hysteresis)
 
     t = 0
     running = True
@@ -145,49 +151,30 @@ def main():
             if e.type == pygame.QUIT:
                 running = False
             elif e.type == pygame.KEYDOWN:
+                pacer.poke()
                 if e.key == pygame.K_ESCAPE: 
                     running = False
-
-        t += 1
-        with data_lock:
-            temp  = float(data.get("temp",25.0))
-            hum   = float(data.get("hum",50.0))
-            light = int(float(data.get("light",2000)))
-            motion= int(float(data.get("motion",0)))
-
-        # Background from light
-        bg = int(map01(light, 0, 4095) * 255)
-        screen.fill((bg//3, bg//2, bg))
-
-        # === Mode 0: rings (temperature) + waves (humidity) ===
-        rings = int(clamp(3 + (temp - 15)/5, 1, 10))
-        for i in range(rings):
-            r = 40 + i*26 + 12*math.sin((t/30) + i*0.6)
-            col = (100 + i*15, 40 + i*12, 220 - i*18)
-            pygame.draw.circle(screen, col, (W//2, H//2), int(r), 2)
-
-        amp = int(8 + hum/3)
-        step_y = 30
-        for y in range(120, H-120, step_y):
-            pts = []
-            for x in range(0, W, 18):
-                yy = y + int(amp * math.sin((x + t*2)/80.0))
-                pts.append((x, yy))
-            pygame.draw.lines(screen, (30,200,150), False, pts, 2)
-
-        # Motion flash overlay
-        if pygame.time.get_ticks() - last_motion_flash < FLASH_MS:
-            overlay = pygame.Surface((W,H), pygame.SRCALPHA)
-            overlay.fill((255,255,255,120))
-            screen.blit(overlay, (0,0))
-
-        # HUD
+            elif e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
+
+        if pacer.animate():
+            t += 1
+        # lock-free: smoothed values blend towards the newest sample, flash timed from its arrival
+        temp, hum, light = state.interpolated()
+        light = int(light)
+        motion = state.latest().motion
+        pacer.observe(temp, hum, light, motion)
+
+        # === Mode 0: background (light) + rings (temperature) + waves (humidity) + motion flash + HUD ===
+        flash = state.flash_active(FLASH_MS)
         hud = f"T={temp:.1f}C  H={hum:.1f}%  L={light}  M={'YES' if motion else 'NO'}   Source:{get_update_source().upper()}"
-        txt = font.render(hud, True, (255,255,255))
-        screen.blit(txt, (10, 10))
+        scene = mode0_scene(t, temp, hum, light, flash, hud, levels=levels(temp, hum, light))
 
-        pygame.display.flip()
-        clock.tick(60)
+        # only the changed region reaches the display; an unchanged scene is skipped
+        rects = renderer.render(scene)
+        if rects:
+            pygame.display.update(rects)
+        pacer.tick(clock)
 
     try:
         m.loop_stop(); m.disconnect()
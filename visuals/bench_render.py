@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # no window needed: CI / server boxes
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+from renderer import STAGES, Mode0Levels, Mode0Renderer, compile_palette, mode0_scene
+from smoothing import Smoother
+from telemetry_state import TelemetryState
+
+# Headless Mode 0 benchmark: replays a telemetry trace through the same renderer the wall
+# uses, on an offscreen Surface, with a fixed simulated frame clock so runs are reproducible.
+# Reports FPS and per-stage frame time (clear, rings, waves, overlay, hud), optionally dumps frames.
+#   python bench_render.py                                   # synthetic 60 s trace
+#   mosquitto_sub -t smartart/sensordata > trace.jsonl       # record one from a wall...
+#   python bench_render.py --trace trace.jsonl --full        # ...replay it, full redraw every frame
+#   python bench_render.py --dump frames/ --dump-every 30
+#   python bench_render.py --palette                         # Feedback_Visual colours (compiled palette)
+#   python bench_render.py --state smooth                    # values as the wall sees them (see --state)
+# Trace: one JSON object per line (the MQTT/HTTP payload). Sample times come from ts_ms
+# (relative to the first sample) or, without it, are spaced by --sample-interval.
+
+FLASH_MS = 2500  # Visualart.py
+BENCH_PALETTE = {
+    "bg": (24, 10, 18),
+    "circle": (255, 210, 90),
+    "wave": (255, 80, 140),
+}  # Feedback_Visual.PALETTES[0]
+
+
+def synth_trace(seconds: float, seed: int = 7, interval: float = 1.0):
+    """Slow drift in temp/hum/light with occasional bursts of motion."""
+    rnd = random.Random(seed)
+    temp, hum, light, out = 22.0, 45.0, 1800, []
+    for i in range(int(seconds / interval)):
+        temp = min(40, max(10, temp + rnd.gauss(0, 0.3)))
+        hum = min(95, max(5, hum + rnd.gauss(0, 1.0)))
+        light = min(4095, max(0, light + int(rnd.gauss(0, 80))))
+        out.append(
+            {
+                "ts_ms": int(i * interval * 1000),
+                "temp": round(temp, 1),
+                "hum": round(hum, 1),
+                "light": light,
+                "motion": int(rnd.random() < 0.05),
+            }
+        )
+    return out
+
+
+def load_trace(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(ln) for ln in f if ln.strip().startswith("{")]
+
+
+def sample_times_ms(trace, interval: float):
+    ts = [s.get("ts_ms") for s in trace]
+    if all(isinstance(v, (int, float)) for v in ts) and ts:
+        return [v - ts[0] for v in ts]
+    return [i * interval * 1000 for i in range(len(trace))]
+
+
+def _pct(vals, p):
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, round(p / 100.0 * (len(s) - 1)))]
+
+
+def run(
+    trace,
+    times_ms,
+    size=(1000, 700),
+    fps=60,
+    frames=None,
+    full=False,
+    dump=None,
+    dump_every=0,
+    palette=None,
+    state_mode="raw",
+):
+    pygame.font.init()
+    font = pygame.font.Font(None, 20)  # bundled font, same on every box
+    target = pygame.Surface(size)
+    renderer = Mode0Renderer(target, font, timings=True)
+    frame_ms = 1000.0 / fps
+    n_frames = frames or int(times_ms[-1] / frame_ms) + 1
+    if dump:
+        os.makedirs(dump, exist_ok=True)
+
+    state = {"temp": 25.0, "hum": 50.0, "light": 2000, "motion": 0}
+    ts = (
+        None
+        if state_mode == "raw"
+        else TelemetryState(smoother=Smoother() if state_mode == "smooth" else None)
+    )
+    levels = Mode0Levels() if state_mode == "smooth" else None
+    nxt, last_flash, drawn, updated_px, full_redraws = 0, -(10**9), 0, 0, 0
+    frame_times, scene_times = [], []
+    for k in range(n_frames):
+        now = k * frame_ms
+        while nxt < len(trace) and times_ms[nxt] <= now:
+            if ts is not None:
+                ts.publish(trace[nxt], "mqtt", now=times_ms[nxt] / 1000.0)
+            else:
+                state.update(
+                    {key: trace[nxt][key] for key in state if key in trace[nxt]}
+                )
+                if int(float(state["motion"])) == 1:
+                    last_flash = times_ms[nxt]
+            nxt += 1
+        if ts is not None:
+            temp, hum, light = ts.interpolated(now / 1000.0)
+            light, motion = int(light), ts.latest().motion
+            flash = ts.flash_active(FLASH_MS, now / 1000.0)
+        else:
+            temp, hum = float(state["temp"]), float(state["hum"])
+            light, motion = int(float(state["light"])), int(float(state["motion"]))
+            flash = now - last_flash < FLASH_MS
+        hud = f"T={temp:.1f}C  H={hum:.1f}%  L={light}  M={'YES' if motion else 'NO'}   Source:MQTT"
+        t0 = time.perf_counter()
+        lv = levels(temp, hum, light) if levels is not None else None
+        if palette is not None:
+            scene = palette.scene(k + 1, temp, hum, light, flash, hud, levels=lv)
+        else:
+            scene = mode0_scene(k + 1, temp, hum, light, flash, hud, levels=lv)
+        scene_times.append(time.perf_counter() - t0)
+        if full:
+            renderer.invalidate()
+        t0 = time.perf_counter()
+        rects = renderer.render(scene)
+        frame_times.append(time.perf_counter() - t0)
+        if rects:
+            drawn += 1
+            updated_px += sum(r.w * r.h for r in rects)
+            full_redraws += rects[0] == renderer.full_rect
+        if dump and dump_every and k % dump_every == 0:
+            pygame.image.save(target, os.path.join(dump, f"frame_{k:06d}.png"))
+
+    total = sum(frame_times)
+    ms = lambda v: round(v * 1000.0, 3)
+    stages = {
+        st: {"mean_ms": ms(sum(v) / len(v)) if v else 0.0, "p99_ms": ms(_pct(v, 99))}
+        for st, v in renderer.timings.items()
+    }
+    return {
+        "frames": n_frames,
+        "drawn": drawn,
+        "full_redraws": full_redraws,
+        "state": state_mode,
+        "size": f"{size[0]}x{size[1]}",
+        "full_redraw": full,
+        "fps": round(n_frames / total, 1) if total else 0.0,
+        "frame_mean_ms": ms(total / n_frames),
+        "frame_p50_ms": ms(_pct(frame_times, 50)),
+        "frame_p99_ms": ms(_pct(frame_times, 99)),
+        "scene_mean_us": round(sum(scene_times) / n_frames * 1e6, 2),
+        "updated_px_fraction": round(updated_px / (n_frames * size[0] * size[1]), 3),
+        "stages": stages,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trace", help="JSONL telemetry trace (default: synthetic)")
+    ap.add_argument(
+        "--seconds", type=float, default=60.0, help="length of the synthetic trace"
+    )
+    ap.add_argument(
+        "--sample-interval",
+        type=float,
+        default=1.0,
+        help="seconds between samples without ts_ms",
+    )
+    ap.add_argument(
+        "--frames", type=int, help="stop after N frames (default: whole trace)"
+    )
+    ap.add_argument("--fps", type=int, default=60, help="simulated frame clock")
+    ap.add_argument("--size", default="1000x700")
+    ap.add_argument(
+        "--full", action="store_true", help="full redraw every frame (no dirty rects)"
+    )
+    ap.add_argument("--dump", help="directory for PNG frames")
+    ap.add_argument("--dump-every", type=int, default=0)
+    ap.add_argument(
+        "--palette",
+        action="store_true",
+        help="Feedback_Visual colours via compile_palette()",
+    )
+    ap.add_argument(
+        "--state",
+        choices=("raw", "interp", "smooth"),
+        default="raw",
+        help="raw: step to each sample | interp: TelemetryState blending | smooth: plus Smoother + Mode0Levels",
+    )
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    trace = (
+        load_trace(args.trace)
+        if args.trace
+        else synth_trace(args.seconds, interval=args.sample_interval)
+    )
+    if not trace:
+        sys.exit("empty trace")
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    res = run(
+        trace,
+        sample_times_ms(trace, args.sample_interval),
+        (w, h),
+        args.fps,
+        args.frames,
+        args.full,
+        args.dump,
+        args.dump_every if args.dump else 0,
+        compile_palette(**BENCH_PALETTE) if args.palette else None,
+        args.state,
+    )
+    if args.json:
+        print(json.dumps(res, indent=2))
+        return
+    print(
+        f"{res['frames']} frames ({res['drawn']} drawn, {res['full_redraws']} full) at {res['size']}, "
+        f"state={res['state']} full_redraw={res['full_redraw']}: "
+        f"{res['fps']} fps  mean {res['frame_mean_ms']} ms  p50 {res['frame_p50_ms']} ms  "
+        f"p99 {res['frame_p99_ms']} ms  updated {res['updated_px_fraction'] * 100:.0f}% of pixels  "
+        f"scene {res['scene_mean_us']} us"
+    )
+    print(f"{'stage':>8} {'mean ms':>9} {'p99 ms':>9}")
+    for st in STAGES:
+        print(
+            f"{st:>8} {res['stages'][st]['mean_ms']:>9.3f} {res['stages'][st]['p99_ms']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
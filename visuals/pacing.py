@@ -0,0 +1,118 @@
+import time
+
+# Adaptive frame pacing for the wall visuals: full frame rate while someone is in the room or
+# the scene is changing, a few FPS (or frozen animation) once nothing has happened for a while.
+# The loop keeps ticking at the idle rate so events, new sensor data and the source switch are
+# still picked up; the first motion sample or visible change brings it back to full rate.
+
+
+class FramePacer:
+    """
+    active  - motion, a sensor moved past its threshold, or poke() within the last `idle_after_s`
+    idle    - otherwise; runs at `idle_fps`, and with `pause_when_idle` animate() returns False so
+              the scene stops changing and the renderer has nothing to redraw
+    """
+
+    def __init__(
+        self,
+        active_fps: int = 60,
+        idle_fps: int = 5,
+        idle_after_s: float = 120.0,
+        pause_when_idle: bool = False,
+        temp_delta: float = 0.3,
+        hum_delta: float = 1.0,
+        light_delta: int = 60,
+        log_every_s: float = 60.0,
+    ):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after_s = idle_after_s
+        self.pause_when_idle = pause_when_idle
+        self.deltas = {"temp": temp_delta, "hum": hum_delta, "light": light_delta}
+        self.log_every_s = log_every_s
+        self._ref: dict[str, float] = {}  # values at the last counted change
+        self._last_activity = time.monotonic()
+        self._idle = False
+        # CPU accounting per mode, to report what idle actually saves
+        self._acct = {
+            "active": [0.0, 0.0, 0],
+            "idle": [0.0, 0.0, 0],
+        }  # wall s, cpu s, frames
+        self._mark = (time.monotonic(), time.process_time())
+        self._next_log = self._mark[0] + log_every_s
+
+    @property
+    def idle(self) -> bool:
+        return self._idle
+
+    def poke(self):
+        """Something visible changed outside the sensors (palette switch, source change, key)."""
+        self._last_activity = time.monotonic()
+        self._idle = False
+
+    def observe(
+        self,
+        temp: float,
+        hum: float,
+        light: float,
+        motion: int,
+        now: float | None = None,
+    ):
+        now = time.monotonic() if now is None else now
+        active = bool(motion)
+        for k, v in (("temp", temp), ("hum", hum), ("light", light)):
+            ref = self._ref.get(k)
+            if ref is None or abs(v - ref) >= self.deltas[k]:
+                self._ref[k] = v
+                active = active or ref is not None
+        if active:
+            self._last_activity = now
+        self._idle = now - self._last_activity >= self.idle_after_s
+
+    def animate(self) -> bool:
+        """Advance the animation this frame?"""
+        return not (self._idle and self.pause_when_idle)
+
+    def fps(self) -> int:
+        return self.idle_fps if self._idle else self.active_fps
+
+    def tick(self, clock) -> int:
+        """clock.tick() at the current rate, with per-mode CPU accounting; returns ms since last tick."""
+        ms = clock.tick(self.fps())
+        self._account()
+        return ms
+
+    def mark(self) -> float:
+        """Account one frame without sleeping (caller schedules frames); returns the frame interval in s."""
+        self._account()
+        return 1.0 / self.fps()
+
+    def _account(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        acct = self._acct["idle" if self._idle else "active"]
+        acct[0] += wall - self._mark[0]
+        acct[1] += cpu - self._mark[1]
+        acct[2] += 1
+        self._mark = (wall, cpu)
+        if self.log_every_s and wall >= self._next_log:
+            self._next_log = wall + self.log_every_s
+            print(f"[PACE] {self.summary()}")
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        out = {}
+        for mode, (wall, cpu, frames) in self._acct.items():
+            out[mode] = {
+                "seconds": round(wall, 1),
+                "frames": frames,
+                "fps": round(frames / wall, 1) if wall else 0.0,
+                "cpu_pct": round(100.0 * cpu / wall, 1) if wall else 0.0,
+            }
+        return out
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (
+            f"mode={'idle' if self._idle else 'active'}  "
+            f"active: {s['active']['fps']}fps cpu={s['active']['cpu_pct']}%  "
+            f"idle: {s['idle']['fps']}fps cpu={s['idle']['cpu_pct']}% ({s['idle']['seconds']}s)"
+        )
@@ -0,0 +1,295 @@
+import math
+import time
+from typing import NamedTuple
+
+import pygame
+
+try:
+    from wave_geometry import WaveGeometry  # NumPy geometry path, optional
+except ImportError:
+    WaveGeometry = None
+
+# Mode 0 renderer shared by visuals/Visualart.py and algorithms/user_engagement/Feedback_Visual.py.
+# Keeps its layers (flash overlay, HUD text) across frames and returns the dirty rects of
+# each frame: only the animated band is cleared and redrawn while background, palette and
+# flash are unchanged, and an unchanged scene draws nothing at all. Works on any Surface, so
+# bench_render.py can drive it offscreen.
+
+Color = tuple[int, int, int]
+STAGES = ("clear", "rings", "waves", "overlay", "hud")
+
+RING_COLORS = tuple((100 + i * 15, 40 + i * 12, 220 - i * 18) for i in range(10))
+WAVE_COLOR = (30, 200, 150)
+
+# Light (0..4095 ADC) only reaches the background as one of 256 levels, so backgrounds are
+# tabulated per level instead of being computed every frame.
+LIGHT_LEVELS = 256
+# default (no palette)
+LIGHT_BG = tuple((b // 3, b // 2, b) for b in range(LIGHT_LEVELS))
+
+
+def light_level(light: float) -> int:
+    return int(max(0.0, min(1.0, light / 4095.0)) * (LIGHT_LEVELS - 1))
+
+
+class Scene(NamedTuple):
+    """Everything a Mode 0 frame depends on; equal scenes render identical frames."""
+
+    t: int
+    bg: Color
+    rings: int
+    ring_colors: tuple[Color, ...]  # at least `rings` entries
+    amp: int
+    wave_color: Color
+    flash: bool
+    hud: str
+
+
+class _LoopGeometry:
+    """Per-point math.sin fallback with the WaveGeometry interface (no NumPy)."""
+
+    def __init__(self, W: int, H: int):
+        self.W, self.H = W, H
+        self.ys = list(range(120, H - 120, 30))
+
+    def ring_radii(self, rings: int, t: int) -> list[int]:
+        return [
+            int(40 + i * 26 + 12 * math.sin((t / 30) + i * 0.6)) for i in range(rings)
+        ]
+
+    def waves(self, amp: int, t: int):
+        return [
+            [
+                (x, y + int(amp * math.sin((x + t * 2) / 80.0)))
+                for x in range(0, self.W, 18)
+            ]
+            for y in self.ys
+        ]
+
+
+def mode0_levels(temp: float, hum: float, light: float) -> tuple[int, int, int]:
+    """Sensor values -> (rings, wave amplitude, light level), the only parts of them a frame uses."""
+    return (
+        int(max(1, min(10, 3 + (temp - 15) / 5))),
+        int(8 + hum / 3),
+        light_level(light),
+    )
+
+
+class Mode0Levels:
+    """
+    mode0_levels() with hysteresis: a level only changes once its value is `margin` of a step
+    past the boundary, so a reading sitting on a boundary doesn't flip rings / amplitude /
+    background (a background change is a full redraw) every frame.
+    """
+
+    def __init__(self, margin: float = 0.3):
+        self.margin = margin
+        self._last = (None, None, None)
+
+    def _hold(self, prev: int | None, x: float) -> int:
+        if prev is not None and prev - self.margin <= x < prev + 1 + self.margin:
+            return prev
+        return int(x)
+
+    def __call__(self, temp: float, hum: float, light: float) -> tuple[int, int, int]:
+        r, a, l = self._last
+        self._last = (
+            self._hold(r, max(1, min(10, 3 + (temp - 15) / 5))),
+            self._hold(a, 8 + hum / 3),
+            self._hold(l, max(0.0, min(1.0, light / 4095.0)) * (LIGHT_LEVELS - 1)),
+        )
+        return self._last
+
+
+def mode0_scene(
+    t: int,
+    temp: float,
+    hum: float,
+    light: int,
+    flash: bool,
+    hud: str,
+    bg: Color | None = None,
+    ring_colors=RING_COLORS,
+    wave_color: Color = WAVE_COLOR,
+    levels=None,
+) -> Scene:
+    """
+    Sensor values -> Scene: rings from temperature, wave amplitude from humidity, bg from light.
+    `levels` (rings, amp, light level) from a Mode0Levels overrides the direct mapping.
+    """
+    rings, amp, lvl = levels or mode0_levels(temp, hum, light)
+    if bg is None:
+        bg = LIGHT_BG[lvl]
+    return Scene(t, bg, rings, ring_colors, amp, wave_color, flash, hud)
+
+
+def _c8(x) -> int:
+    return max(0, min(255, int(x)))
+
+
+class Palette(NamedTuple):
+    """A palette compiled for the frame loop: per-ring colours and one background per light level."""
+
+    ring_colors: tuple[Color, ...]
+    wave_color: Color
+    bg_by_level: tuple[Color, ...]  # LIGHT_LEVELS entries
+
+    def scene(
+        self,
+        t: int,
+        temp: float,
+        hum: float,
+        light: int,
+        flash: bool,
+        hud: str,
+        levels=None,
+    ) -> Scene:
+        levels = levels or mode0_levels(temp, hum, light)
+        return mode0_scene(
+            t,
+            temp,
+            hum,
+            light,
+            flash,
+            hud,
+            bg=self.bg_by_level[levels[2]],
+            ring_colors=self.ring_colors,
+            wave_color=self.wave_color,
+            levels=levels,
+        )
+
+
+def compile_palette(
+    bg: Color,
+    circle: Color,
+    wave: Color,
+    ambient: float = 0.35,
+    ring_step=(8, 6, -6),
+    rings: int = 10,
+) -> Palette:
+    """
+    Run once per palette change (Feedback_Visual.py): ring i is `circle + i*ring_step`, the
+    background mixes the palette bg with the ambient light colour (n*85, n*128, n*255) at `ambient`.
+    """
+    ring_colors = tuple(
+        tuple(_c8(c + i * d) for c, d in zip(circle, ring_step)) for i in range(rings)
+    )
+    bg_by_level = []
+    for lvl in range(LIGHT_LEVELS):
+        n = lvl / (LIGHT_LEVELS - 1)
+        env = (int(n * 85), int(n * 128), int(n * 255))
+        bg_by_level.append(
+            tuple(_c8(b * (1 - ambient) + e * ambient) for b, e in zip(bg, env))
+        )
+    return Palette(ring_colors, tuple(wave), tuple(bg_by_level))
+
+
+def make_geometry(W: int, H: int):
+    return WaveGeometry(W, H) if WaveGeometry is not None else _LoopGeometry(W, H)
+
+
+class Mode0Renderer:
+    def __init__(
+        self,
+        target: pygame.Surface,
+        font: pygame.font.Font,
+        flash_rgba=(255, 255, 255, 120),
+        timings: bool = False,
+    ):
+        self.target = target
+        self.font = font
+        self.W, self.H = target.get_size()
+        self.geom = make_geometry(self.W, self.H)
+        self.full_rect = target.get_rect()
+        self.overlay = pygame.Surface((self.W, self.H), pygame.SRCALPHA)
+        self.overlay.fill(flash_rgba)
+        self._y_top, self._y_bottom = min(self.geom.ys), max(self.geom.ys)
+        self._last: Scene | None = None
+        self._last_region: pygame.Rect | None = None
+        self._hud_text: str | None = None
+        self._hud_surf: pygame.Surface | None = None
+        self._hud_rect: pygame.Rect | None = None
+        # per-stage seconds of every drawn frame (bench_render.py); None = not measured
+        self.timings: dict[str, list[float]] | None = (
+            {k: [] for k in STAGES} if timings else None
+        )
+        self._t = 0.0
+
+    def _lap(self, stage: str):
+        now = time.perf_counter()
+        self.timings[stage].append(now - self._t)
+        self._t = now
+
+    def invalidate(self):
+        """Force a full redraw next frame (window exposed / resized, target reused)."""
+        self._last = None
+
+    def _region(self, s: Scene) -> pygame.Rect:
+        # everything rings + waves can touch for this scene (line width 2 -> 2px slack)
+        r = 40 + (s.rings - 1) * 26 + 12 + 2
+        rings = pygame.Rect(self.W // 2 - r, self.H // 2 - r, 2 * r, 2 * r)
+        band = pygame.Rect(
+            0,
+            self._y_top - s.amp - 2,
+            self.W,
+            self._y_bottom - self._y_top + 2 * s.amp + 5,
+        )
+        return rings.union(band)
+
+    def _hud(self, text: str) -> pygame.Surface:
+        if text != self._hud_text:
+            self._hud_text, self._hud_surf = text, self.font.render(
+                text, True, (255, 255, 255)
+            )
+        return self._hud_surf
+
+    def render(self, s: Scene) -> list[pygame.Rect]:
+        """Draw `s`; returns the rects to push to the display ([] = nothing changed)."""
+        last = self._last
+        if s == last:
+            return []
+        tm = self.timings is not None
+        if tm:
+            self._t = time.perf_counter()
+        screen = self.target
+        region = self._region(s)
+        hud = self._hud(s.hud)
+        hud_rect = hud.get_rect(topleft=(10, 10))
+
+        # clear first, then draw everything that can intersect the cleared rects; the HUD is
+        # only re-blitted where it was cleared (antialiased text must not be blended twice)
+        full = last is None or s.bg != last.bg or s.flash or last.flash
+        if full:
+            screen.fill(s.bg)
+            rects = [self.full_rect]
+        else:
+            rects = [region.union(self._last_region)]
+            if s.hud != last.hud or hud_rect.colliderect(rects[0]):
+                rects.append(hud_rect.union(self._hud_rect))
+            for r in rects:
+                screen.fill(s.bg, r)
+        if tm:
+            self._lap("clear")
+
+        for i, r in enumerate(self.geom.ring_radii(s.rings, s.t)):
+            pygame.draw.circle(
+                screen, s.ring_colors[i], (self.W // 2, self.H // 2), r, 2
+            )
+        if tm:
+            self._lap("rings")
+        for pts in self.geom.waves(s.amp, s.t):
+            pygame.draw.lines(screen, s.wave_color, False, pts, 2)
+        if tm:
+            self._lap("waves")
+        if s.flash:
+            screen.blit(self.overlay, (0, 0))
+        if tm:
+            self._lap("overlay")
+        if full or len(rects) > 1:
+            screen.blit(hud, hud_rect)
+        if tm:
+            self._lap("hud")
+
+        self._last, self._last_region, self._hud_rect = s, region, hud_rect
+        return rects
@@ -0,0 +1,68 @@
+import math
+from collections import deque
+
+# Incremental smoothing of the sensor channels between ingest and render, O(1) per sample.
+# Each channel: optional median-of-N (rejects single-sample LDR spikes), then an EMA whose
+# weight follows the time since the previous sample, so irregular arrival rates smooth the same.
+# The rate of change (units per second) is the EMA of the smoothed value's slope.
+
+CHANNELS = ("temp", "hum", "light")
+
+
+class Channel:
+    def __init__(self, tau_s: float, median_of: int = 1):
+        self.tau_s = tau_s
+        self._win = deque(maxlen=median_of) if median_of > 1 else None
+        self.value: float | None = None
+        self.rate = 0.0
+        self._at = 0.0
+
+    def update(self, x: float, now: float) -> float:
+        if self._win is not None:
+            self._win.append(x)
+            x = sorted(self._win)[len(self._win) // 2]
+        if self.value is None:
+            self.value, self._at = x, now
+            return x
+        dt = now - self._at
+        if dt <= 0:
+            return self.value
+        a = 1.0 - math.exp(-dt / self.tau_s) if self.tau_s > 0 else 1.0
+        prev = self.value
+        self.value = prev + a * (x - prev)
+        self.rate += a * ((self.value - prev) / dt - self.rate)
+        self._at = now
+        return self.value
+
+
+class Smoother:
+    """temp / hum / light smoothing for TelemetryState; call update() with each accepted sample."""
+
+    def __init__(
+        self,
+        temp_tau_s: float = 3.0,
+        hum_tau_s: float = 3.0,
+        light_tau_s: float = 1.5,
+        light_median_of: int = 3,
+    ):
+        self.ch: dict[str, Channel] = {
+            "temp": Channel(temp_tau_s),
+            "hum": Channel(hum_tau_s),
+            "light": Channel(light_tau_s, light_median_of),
+        }
+
+    def update(
+        self, vals: dict[str, float], fallback: tuple[float, float, float], now: float
+    ) -> tuple[tuple[float, float, float], tuple[float, float, float]]:
+        """
+        Feed the channels present in `vals`; returns ((temp, hum, light) smoothed, rates per second).
+        `fallback` stands in for channels that have never had a sample.
+        """
+        for k in CHANNELS:
+            if k in vals:
+                self.ch[k].update(vals[k], now)
+        smooth = tuple(
+            self.ch[k].value if self.ch[k].value is not None else fb
+            for k, fb in zip(CHANNELS, fallback)
+        )
+        return smooth, tuple(self.ch[k].rate for k in CHANNELS)
@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import NamedTuple
+
+# Telemetry handoff between the network threads (MQTT, Flask) and the render loop.
+# Writers publish immutable snapshots; the latest snapshot and a short history are swapped in
+# with a single reference assignment, so the render loop reads them without taking any lock
+# and can blend towards each new sample instead of stepping.
+# Writers serialize among themselves (read-modify-write of the latest values, source check);
+# the reader never touches that lock. With a Smoother (smoothing.py) the displayed values are
+# the smoothed ones; the raw values stay in temp / hum / light.
+
+
+class Snapshot(NamedTuple):
+    temp: float
+    hum: float
+    light: float
+    motion: int
+    at: float  # time.monotonic() when the sample was applied
+    motion_at: float  # time.monotonic() of the last motion == 1 sample (-inf = never)
+    seq: int
+    start: tuple[
+        float, float, float
+    ]  # displayed (temp, hum, light) when this sample arrived
+    blend_s: float  # how long the display takes to reach this sample
+    smooth: tuple[
+        float, float, float
+    ]  # display target: smoothed (temp, hum, light), raw without a smoother
+    rate: tuple[
+        float, float, float
+    ]  # smoothed change per second (zeros without a smoother)
+
+
+FIELDS = ("temp", "hum", "light", "motion")
+
+
+class TelemetryState:
+    def __init__(
+        self,
+        temp: float = 25.0,
+        hum: float = 50.0,
+        light: float = 2000,
+        motion: int = 0,
+        source: str = "mqtt",
+        history: int = 8,
+        max_blend_s: float = 2.0,
+        smoother=None,
+    ):
+        vals = (float(temp), float(hum), float(light))
+        first = Snapshot(
+            *vals,
+            int(motion),
+            time.monotonic(),
+            float("-inf"),
+            0,
+            vals,
+            0.0,
+            vals,
+            (0.0, 0.0, 0.0)
+        )
+        self._hist: tuple[Snapshot, ...] = (first,)  # newest first, replaced as a whole
+        self._source = source
+        self.history = history
+        self.max_blend_s = max_blend_s
+        self.smoother = smoother
+        self._wlock = threading.Lock()
+
+    # ---- writers (network threads) ----
+    @property
+    def source(self) -> str:
+        return self._source
+
+    def set_source(self, src: str) -> bool:
+        s = str(src).strip().lower()
+        if s not in ("mqtt", "http"):
+            return False
+        with self._wlock:
+            self._source = s
+        return True
+
+    def publish(
+        self, payload: dict, origin: str, now: float | None = None
+    ) -> Snapshot | None:
+        """
+        Apply the known fields of `payload` if `origin` is the active source. Returns the new
+        snapshot, or None when the payload was ignored (inactive source / no usable field).
+        """
+        vals = {}
+        for k in FIELDS:
+            if k in payload:
+                try:
+                    vals[k] = (
+                        int(float(payload[k])) if k == "motion" else float(payload[k])
+                    )
+                except (TypeError, ValueError):
+                    pass
+        if not vals:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._wlock:
+            if origin != self._source:
+                return None
+            cur = self._hist[0]
+            motion = vals.get("motion", cur.motion)
+            raw = (
+                vals.get("temp", cur.temp),
+                vals.get("hum", cur.hum),
+                vals.get("light", cur.light),
+            )
+            if self.smoother is not None:
+                smooth, rate = self.smoother.update(vals, raw, now)
+            else:
+                smooth, rate = raw, (0.0, 0.0, 0.0)
+            # blend from whatever is on screen right now over the inter-arrival time
+            snap = Snapshot(
+                *raw,
+                motion,
+                now,
+                now if motion == 1 else cur.motion_at,
+                cur.seq + 1,
+                self.interpolated(now),
+                min(now - cur.at, self.max_blend_s),
+                smooth,
+                rate
+            )
+            self._hist = (snap,) + self._hist[: self.history - 1]
+        return snap
+
+    # ---- reader (render loop), lock-free ----
+    def latest(self) -> Snapshot:
+        return self._hist[0]
+
+    def samples(self) -> tuple[Snapshot, ...]:
+        """Recent snapshots, newest first."""
+        return self._hist
+
+    def interpolated(self, now: float | None = None) -> tuple[float, float, float]:
+        """
+        (temp, hum, light) moving linearly from what was displayed when the newest sample
+        arrived to that sample (smoothed), over the inter-arrival time (capped at `max_blend_s`).
+        """
+        cur = self._hist[0]
+        now = time.monotonic() if now is None else now
+        a = 1.0 if cur.blend_s <= 0 else (now - cur.at) / cur.blend_s
+        if a >= 1.0:
+            return cur.smooth
+        (t0, h0, l0), (t1, h1, l1) = cur.start, cur.smooth
+        return t0 + (t1 - t0) * a, h0 + (h1 - h0) * a, l0 + (l1 - l0) * a
+
+    def flash_active(self, flash_ms: float, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return (now - self._hist[0].motion_at) * 1000.0 < flash_ms
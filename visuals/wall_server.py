@@ -0,0 +1,418 @@
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paho.mqtt.client as mqtt
+import pygame
+from flask import Flask, Response, jsonify, request
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+import telemetry_codec as codec
+from pacing import FramePacer
+from renderer import Mode0Levels, Mode0Renderer, mode0_scene
+from smoothing import Smoother
+from telemetry_state import TelemetryState
+
+# Multi-wall rendering server: one process, one broker connection and one HTTP server for all
+# walls, instead of one Visualart.py per wall. Telemetry is demultiplexed by device_id into
+# per-wall state (telemetry_state.py); every wall has its own offscreen surface, renderer and
+# frame pacer, and the walls that are due each tick are rendered on a shared thread pool.
+# Outputs: HTTP frame stream per wall (/walls/<id>/stream, MJPEG; /walls/<id>/frame.jpg) and,
+# with OUTPUT = "window", a tiled preview window of the first WINDOW_COLS x WINDOW_ROWS walls.
+#   python wall_server.py
+#   ffplay http://<host>:8080/walls/esp32-smartart-001/stream
+
+# ================= USER CONFIG =================
+MQTT_HOST = "host ip"
+MQTT_PORT = 1883
+
+TOPIC_DATA = "smartart/sensordata"
+# binary frames, see common/telemetry_codec.py
+TOPIC_DATA_BIN = TOPIC_DATA + codec.TOPIC_SUFFIX
+TOPIC_MODE = "smartart/cmd/mode"  # all walls; TOPIC_MODE + "/<device_id>" for one wall
+
+HTTP_HOST = "0.0.0.0"
+HTTP_PORT = 8080
+HTTP_DEBUG_LOG = False
+
+OUTPUT = "headless"  # headless: HTTP streams only | window: plus a tiled preview window
+WALL_SIZE = (1000, 700)
+# device_ids created at start; others are added on their first sample
+WALLS: list[str] = []
+MAX_WALLS = 64  # samples from further devices are dropped
+WORKERS = 4  # shared render pool
+WINDOW_COLS, WINDOW_ROWS = 3, 2
+
+STREAM_FPS = 15  # max JPEG encodes per second per watched wall
+STREAM_IDLE_S = 2.0  # stop encoding a wall this long after its last viewer
+
+# ---- Frame pacing (pacing.py), per wall ----
+FPS_ACTIVE = 60
+FPS_IDLE = 5
+IDLE_AFTER_S = 120
+IDLE_PAUSE = False
+FLASH_MS = 2500
+# ===============================================
+
+
+class Wall:
+    """Per-device state; rendering resources are attached by the render loop (attach())."""
+
+    def __init__(self, device: str):
+        self.device = device
+        self.state = TelemetryState(source=default_source, smoother=Smoother())
+        self.levels = Mode0Levels()
+        self.pacer = FramePacer(
+            FPS_ACTIVE,
+            FPS_IDLE,
+            IDLE_AFTER_S,
+            pause_when_idle=IDLE_PAUSE,
+            log_every_s=0,
+        )
+        self.surface: pygame.Surface | None = None
+        self.renderer: Mode0Renderer | None = None
+        self.tile: tuple | None = None  # top-left in the preview window, if shown
+        self.t = 0
+        self.frames = 0
+        self.next_at = 0.0
+        # stream output: (frame seq, jpeg bytes), swapped as a whole
+        self.jpeg = (-1, b"")
+        self.watched_until = 0.0
+        self._force_encode = False
+        self._next_encode = 0.0
+
+    def attach(self, tile=None):
+        self.surface = pygame.Surface(WALL_SIZE)
+        self.renderer = Mode0Renderer(self.surface, pygame.font.Font(None, 20))
+        self.tile = tile
+
+    def watch(self):
+        now = time.monotonic()
+        if now >= self.watched_until:
+            self._force_encode = (
+                True  # unchanged scenes don't render; encode once anyway
+            )
+        self.watched_until = now + STREAM_IDLE_S
+
+    def render(self, now: float) -> list[pygame.Rect]:
+        """One frame (pool worker); returns the dirty rects of the wall surface."""
+        if self.pacer.animate():
+            self.t += 1
+        temp, hum, light = self.state.interpolated(now)
+        light = int(light)
+        motion = self.state.latest().motion
+        self.pacer.observe(temp, hum, light, motion, now)
+        hud = (
+            f"{self.device}  T={temp:.1f}C  H={hum:.1f}%  L={light}  M={'YES' if motion else 'NO'}"
+            f"   Source:{self.state.source.upper()}"
+        )
+        rects = self.renderer.render(
+            mode0_scene(
+                self.t,
+                temp,
+                hum,
+                light,
+                self.state.flash_active(FLASH_MS, now),
+                hud,
+                levels=self.levels(temp, hum, light),
+            )
+        )
+        if rects:
+            self.frames += 1
+        if now < self.watched_until and (
+            (rects and now >= self._next_encode) or self._force_encode
+        ):
+            buf = io.BytesIO()
+            pygame.image.save(self.surface, buf, "frame.jpg")
+            self.jpeg = (self.frames, buf.getvalue())
+            self._force_encode = False
+            self._next_encode = now + 1.0 / STREAM_FPS
+        self.next_at = max(self.next_at + self.pacer.mark(), now)
+        return rects
+
+
+# ---- Shared state ----
+walls: dict[str, Wall] = {}
+# creation only; lookups and the render loop don't take it
+walls_lock = threading.Lock()
+default_source = "mqtt"
+_dropped_devices = set()
+
+
+def get_wall(device: str) -> Wall | None:
+    w = walls.get(device)
+    if w is not None:
+        return w
+    with walls_lock:
+        w = walls.get(device)
+        if w is None:
+            if len(walls) >= MAX_WALLS:
+                if device not in _dropped_devices:
+                    _dropped_devices.add(device)
+                    print(
+                        f"[WALL] MAX_WALLS={MAX_WALLS} reached; ignoring device '{device}'"
+                    )
+                return None
+            w = Wall(device)
+            walls[device] = w
+            print(f"[WALL] New wall '{device}' ({len(walls)}/{MAX_WALLS})")
+    return w
+
+
+def set_update_source(src: str, device: str | None = None):
+    global default_source
+    s = str(src).strip().lower()
+    if s not in ("mqtt", "http"):
+        print(f"[MODE] Ignored invalid mode '{src}' (expect 'mqtt' or 'http')")
+        return
+    if device is None:
+        default_source = s
+        for w in list(walls.values()):
+            w.state.set_source(s)
+        print(f"[MODE] Authoritative source for all walls -> {s.upper()}")
+    else:
+        w = get_wall(device)
+        if w is not None:
+            w.state.set_source(s)
+            print(f"[MODE] Authoritative source for '{device}' -> {s.upper()}")
+
+
+def _apply_payload(payload: dict, origin: str) -> bool:
+    w = get_wall(str(payload.get("device_id", "unknown")))
+    if w is None:
+        return False
+    applied = w.state.publish(payload, origin) is not None
+    if not applied and HTTP_DEBUG_LOG:
+        print(
+            f"[{origin.upper()}] Ignored payload for '{w.device}' (active source is {w.state.source.upper()})"
+        )
+    return applied
+
+
+# ================= MQTT =================
+def on_connect(client, userdata, flags, rc):
+    print(f"[MQTT] Connected rc={rc}; subscribing to topics")
+    client.subscribe(
+        [(TOPIC_DATA, 0), (TOPIC_DATA_BIN, 0), (TOPIC_MODE, 0), (TOPIC_MODE + "/+", 0)]
+    )
+
+
+def on_message(client, userdata, msg):
+    try:
+        topic = msg.topic
+        if topic == TOPIC_DATA_BIN:
+            _apply_payload(codec.decode_last(msg.payload), origin="mqtt")
+            return
+        payload_str = msg.payload.decode("utf-8").strip()
+        if topic == TOPIC_MODE:
+            set_update_source(payload_str)
+        elif topic.startswith(TOPIC_MODE + "/"):
+            set_update_source(payload_str, device=topic[len(TOPIC_MODE) + 1 :])
+        elif topic == TOPIC_DATA:
+            payload = json.loads(payload_str)
+            if not isinstance(payload, dict):
+                raise ValueError("Telemetry must be a JSON object")
+            _apply_payload(payload, origin="mqtt")
+    except Exception as e:
+        print("[MQTT] Error:", e)
+
+
+m = mqtt.Client()
+m.on_connect = on_connect
+m.on_message = on_message
+m.reconnect_delay_set(min_delay=1, max_delay=5)
+
+
+def start_mqtt():
+    try:
+        print(f"[MQTT] Connecting to {MQTT_HOST}:{MQTT_PORT} ...")
+        m.connect(MQTT_HOST, MQTT_PORT, 30)
+        m.loop_start()
+    except Exception as e:
+        print("[MQTT] Connection error:", e)
+
+
+# ================= HTTP SERVER =================
+app = Flask(__name__)
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({"ok": True, "mode": default_source, "walls": len(walls)})
+
+
+@app.route("/walls", methods=["GET"])
+def list_walls():
+    out = {}
+    for w in list(walls.values()):
+        snap = w.state.latest()
+        out[w.device] = {
+            "source": w.state.source,
+            "samples": snap.seq,
+            "frames": w.frames,
+            "idle": w.pacer.idle,
+            "fps": w.pacer.fps(),
+            "shown": w.tile is not None,
+            "temp": snap.temp,
+            "hum": snap.hum,
+            "light": snap.light,
+            "motion": snap.motion,
+            "smooth": dict(zip(("temp", "hum", "light"), snap.smooth)),
+            "rate_per_s": dict(zip(("temp", "hum", "light"), snap.rate)),
+        }
+    return jsonify(out)
+
+
+@app.route("/update", methods=["POST"])
+@app.route("/ingest", methods=["POST"])
+def ingest():
+    try:
+        if codec.is_binary_content_type(request.content_type):
+            payload = codec.decode_last(request.get_data())
+        else:
+            payload = request.get_json(force=True, silent=False)
+        if HTTP_DEBUG_LOG:
+            print("[HTTP] payload:", payload)
+        if not isinstance(payload, dict):
+            return jsonify({"ok": False, "err": "JSON object required"}), 400
+        applied = _apply_payload(payload, origin="http")
+        return jsonify(
+            {
+                "ok": True,
+                "device_id": str(payload.get("device_id", "unknown")),
+                "applied": applied,
+            }
+        )
+    except Exception as e:
+        return jsonify({"ok": False, "err": str(e)}), 400
+
+
+def _wait_frame(w: Wall, after: int, timeout: float):
+    end = time.monotonic() + timeout
+    while w.jpeg[0] == after and time.monotonic() < end:
+        time.sleep(1.0 / STREAM_FPS / 2)
+    return w.jpeg
+
+
+@app.route("/walls/<device>/frame.jpg", methods=["GET"])
+def frame(device):
+    w = walls.get(device)
+    if w is None:
+        return jsonify({"ok": False, "err": "unknown wall"}), 404
+    w.watch()
+    seq, jpg = w.jpeg if w.jpeg[0] >= 0 else _wait_frame(w, -1, 2.0)
+    if seq < 0:
+        return jsonify({"ok": False, "err": "no frame yet"}), 503
+    return Response(jpg, mimetype="image/jpeg")
+
+
+@app.route("/walls/<device>/stream", methods=["GET"])
+def stream(device):
+    w = walls.get(device)
+    if w is None:
+        return jsonify({"ok": False, "err": "unknown wall"}), 404
+
+    def frames():
+        last = -1
+        while True:
+            w.watch()
+            seq, jpg = _wait_frame(w, last, 1.0)
+            if seq != last:
+                last = seq
+                yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n"
+
+    return Response(frames(), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+
+def run_http_server():
+    app.run(
+        host=HTTP_HOST, port=HTTP_PORT, debug=False, threaded=True, use_reloader=False
+    )
+
+
+# ================= RENDER LOOP =================
+def main():
+    if OUTPUT != "window":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    for dev in WALLS:
+        get_wall(dev)
+    start_mqtt()
+    threading.Thread(target=run_http_server, daemon=True).start()
+    print(
+        f"[HTTP] Listening on http://{HTTP_HOST}:{HTTP_PORT}/ingest (and /update, /walls, /walls/<id>/stream)"
+    )
+    print(
+        f"[INFO] Mode follows '{TOPIC_MODE}' (all walls) and '{TOPIC_MODE}/<device_id>' (payload: mqtt/http)"
+    )
+
+    pygame.init()
+    screen = None
+    if OUTPUT == "window":
+        screen = pygame.display.set_mode(
+            (WALL_SIZE[0] * WINDOW_COLS, WALL_SIZE[1] * WINDOW_ROWS)
+        )
+        pygame.display.set_caption("SmartArt – walls")
+    pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="wall")
+    shown = 0
+    running = True
+    next_log = time.monotonic() + 60.0
+
+    while running:
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT or (
+                e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE
+            ):
+                running = False
+            elif e.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                for w in list(walls.values()):
+                    if w.renderer is not None:
+                        w.renderer.invalidate()
+
+        current = list(walls.values())
+        for w in current:
+            if w.renderer is None:
+                tile = None
+                if screen is not None and shown < WINDOW_COLS * WINDOW_ROWS:
+                    tile = (
+                        (shown % WINDOW_COLS) * WALL_SIZE[0],
+                        (shown // WINDOW_COLS) * WALL_SIZE[1],
+                    )
+                    shown += 1
+                w.attach(tile)
+
+        now = time.monotonic()
+        due = [w for w in current if w.next_at <= now]
+        # each wall draws only into its own surface, so walls render independently
+        for w, rects in zip(due, pool.map(lambda w, now=now: w.render(now), due)):
+            if rects and w.tile is not None:
+                for r in rects:
+                    screen.blit(w.surface, r.move(w.tile), r)
+                pygame.display.update([r.move(w.tile) for r in rects])
+
+        if now >= next_log:
+            next_log = now + 60.0
+            idle = sum(1 for w in current if w.pacer.idle)
+            print(
+                f"[WALL] {len(current)} walls ({idle} idle), {sum(w.frames for w in current)} frames drawn"
+            )
+
+        nxt = min((w.next_at for w in current), default=now + 0.1)
+        time.sleep(min(max(0.0, nxt - time.monotonic()), 0.1))
+
+    pool.shutdown()
+    try:
+        m.loop_stop()
+        m.disconnect()
+    except Exception:
+        pass
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Mode 0 geometry (humidity waves + temperature rings) computed in one NumPy pass per frame.
+# Shared by visuals/Visualart.py and algorithms/user_engagement/Feedback_Visual.py; the
+# numbers match the original per-point math.sin loops.
+
+Polyline = list[list[int]]  # [[x, y], ...], accepted by pygame.draw.lines as is
+
+
+class WaveGeometry:
+    """
+    Precomputes the x-grid, row offsets and ring phase table for a W x H wall.
+    Every wave row shares the same sine profile, so a frame is one np.sin over ~56 x-points;
+    finished polylines are cached by (amp, tick) so walls or layers rendering the same
+    frame reuse them.
+    """
+
+    def __init__(
+        self,
+        W: int,
+        H: int,
+        x_step: int = 18,
+        y_step: int = 30,
+        margin: int = 120,
+        wavelength: float = 80.0,
+        max_rings: int = 10,
+        cache_size: int = 64,
+    ):
+        self.W, self.H = W, H
+        self.xs = np.arange(0, W, x_step, dtype=np.float64)
+        self.ys = np.arange(margin, H - margin, y_step, dtype=np.int64)
+        self.wavelength = wavelength
+        idx = np.arange(max_rings, dtype=np.float64)
+        self._ring_base = 40 + idx * 26  # r = 40 + i*26 + 12*sin(t/30 + i*0.6)
+        self._ring_phase = idx * 0.6
+        self._pts = np.empty((len(self.ys), len(self.xs), 2), dtype=np.int64)
+        self._pts[..., 0] = self.xs.astype(np.int64)
+        self._cache: OrderedDict[tuple[int, int], list[Polyline]] = OrderedDict()
+        self.cache_size = cache_size
+
+    def wave_offsets(self, amp: int, t: int) -> np.ndarray:
+        """int(amp * sin((x + 2t) / wavelength)) for every x of the grid."""
+        return np.trunc(amp * np.sin((self.xs + t * 2) / self.wavelength)).astype(
+            np.int64
+        )
+
+    def waves(self, amp: int, t: int) -> list[Polyline]:
+        """One polyline per wave row, ready for pygame.draw.lines."""
+        key = (amp, t)
+        rows = self._cache.get(key)
+        if rows is not None:
+            self._cache.move_to_end(key)
+            return rows
+        self._pts[..., 1] = self.ys[:, None] + self.wave_offsets(amp, t)[None, :]
+        rows = self._pts.tolist()
+        self._cache[key] = rows
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return rows
+
+    def ring_radii(self, rings: int, t: int) -> list[int]:
+        r = self._ring_base[:rings] + 12 * np.sin(t / 30 + self._ring_phase[:rings])
+        return r.astype(np.int64).tolist()